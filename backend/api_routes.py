@@ -3,17 +3,23 @@ API Routes for CKCIAS Drought Monitor
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
-import os
-from datetime import datetime, timedelta
-
-import asyncio
+from datetime import datetime
 
 from weather_service import get_weather_data
 from drought_risk import calculate_drought_risk
-from chatbot import chat_with_claude
+from chatbot import chat_with_claude, stream_chat
 from logger_config import logger
+from response_formats import FastJSONResponse, check_series_format, series_response, sse_event
+from history_store import history_store, MAX_PAST_DAYS
+from services.news_aggregator import news_aggregator
+from chat_context import context_builder
+from risk_refresher import risk_refresher
+from narrative_producer import NARRATIVE_RETRY_AFTER_SECONDS, narrative_producer
+from stage_pipeline import Stage, StageError, run_stages
+from instrumentation import upstream_client
+from bottleneck_optimizer import get_optimizer
 
 router = APIRouter()
 
@@ -38,29 +44,8 @@ class DroughtRiskResponse(BaseModel):
 
 # Helper to get context for chat
 async def get_drought_context() -> str:
-    """Fetch current drought risk for key regions to provide context to the chatbot."""
-    regions = ["Northland", "Waikato", "Taranaki", "Hawke's Bay", "Canterbury", "Otago"]
-
-    async def fetch_region(region: str):
-        try:
-            data = await calculate_drought_risk(region)
-            line = f"- {region}: Risk {data['risk_score']}/100 ({data.get('risk_level', 'Unknown')})"
-            if 'factors' in data:
-                factors = data['factors']
-                line += f", Soil Moisture Index: {factors.get('soil_moisture_index', 'N/A')}"
-                line += f", Temp Anomaly: {factors.get('temperature_anomaly', 'N/A')}C"
-            return line
-        except Exception as exc:
-            logger.error(f"Error fetching context for {region}: {exc}")
-            return None
-
-    results = await asyncio.gather(*(fetch_region(region) for region in regions))
-    summary_lines = [line for line in results if line]
-
-    if not summary_lines:
-        return "Current Regional Drought Conditions:\n- Data unavailable"
-
-    return "Current Regional Drought Conditions:\n" + "\n".join(summary_lines)
+    """Regional drought summary for the chatbot, served from the shared risk cache."""
+    return await context_builder.get_context()
 
 # Chat endpoint
 @router.post("/chat", response_model=ChatResponse)
@@ -82,6 +67,35 @@ async def chat(request: ChatRequest):
         logger.error(f"Chat error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Chat error: {str(e)}")
 
+# Streaming chat endpoint
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Chat with the AI assistant, streaming the reply as Server-Sent Events.
+
+    Events: `token` ({"text"}) for each visible fragment, then `done`, or
+    `error` ({"detail"}) if the model call fails mid-stream.
+    """
+    if not request.message or not request.message.strip():
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    logger.info(f"BACKEND RECEIVED STREAMING MESSAGE ({len(request.message)} chars)")
+    context = await get_drought_context()
+
+    async def events():
+        try:
+            async for text in stream_chat(request.message, context=context):
+                yield sse_event("token", {"text": text})
+            yield sse_event("done", {})
+        except Exception as e:
+            logger.error(f"Chat stream error: {str(e)}", exc_info=True)
+            yield sse_event("error", {"detail": f"Chat error: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Weather endpoint
 @router.get("/weather", response_model=WeatherResponse)
 async def get_weather(location: str = "Christchurch"):
@@ -109,7 +123,7 @@ async def test_endpoint():
     return {
         "status": "success",
         "message": "CKCIAS API is operational",
-        "endpoints": ["/api/chat", "/api/weather", "/api/drought-risk"]
+        "endpoints": ["/api/chat", "/api/chat/stream", "/api/weather", "/api/drought-risk"]
     }
 
 # Public drought risk endpoint (with lat/lon and region params)
@@ -172,75 +186,30 @@ async def get_council_alerts():
 # News headlines endpoint
 @router.get("/public/news-headlines")
 async def get_news_headlines():
-    """Get farming and weather news headlines from RSS feeds"""
-    import feedparser
-    import httpx
-    from datetime import datetime, timedelta
-
-    headlines = []
-
-    # RSS Feed sources - Updated Nov 2025
-    feeds = [
-        {
-            "url": "https://feeds.feedburner.com/RuralNews",
-            "source": "Rural News Group"
-        },
-        {
-            "url": "https://www.farmersweekly.co.nz/feed/",
-            "source": "Farmers Weekly"
-        }
-    ]
-
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        for feed_config in feeds:
-            try:
-                # Fetch asynchronously to avoid blocking the event loop
-                response = await client.get(feed_config["url"])
-                response.raise_for_status()
-                
-                # Parse the content
-                feed = feedparser.parse(response.content)
-                
-                # Get first 5 entries from each feed
-                for entry in feed.entries[:5]:
-                    # Handle different date formats or missing dates
-                    published = entry.get("published", datetime.now().isoformat())
-                    
-                    headlines.append({
-                        "title": entry.title,
-                        "link": entry.get("link", ""),
-                        "source": feed_config["source"],
-                        "published": published
-                    })
-            except Exception as e:
-                logger.error(f"Error fetching {feed_config['source']}: {str(e)}")
-                continue
-
-    # If no RSS feeds work, return error (No Mocks)
-    if not headlines:
-        # Fallback to empty list rather than 502 if just one fails, 
-        # but if ALL fail, we might want to know. 
-        # For now, returning empty list is safer than crashing the frontend.
-        logger.warning("Warning: No news headlines could be fetched.")
-        return []
-
-    return headlines
+    """Get farming and weather news headlines from RSS feeds (cached, refreshed in the background)"""
+    # An empty list is safer than crashing the frontend if every feed fails
+    return await news_aggregator.get_headlines()
 
 # Forecast trend endpoint (Real Data via OpenWeatherMap)
-@router.get("/public/forecast-trend")
-async def get_forecast_trend(lat: float, lon: float):
-    """Get 5-day forecast trend for region using OpenWeatherMap"""
-    import httpx
+@router.get("/public/forecast-trend", response_class=FastJSONResponse)
+async def get_forecast_trend(lat: float, lon: float, format: str = "json"):
+    """
+    Get 5-day forecast trend for region using OpenWeatherMap.
+
+    `format=columnar` or `format=binary` returns parallel arrays instead of a list of points.
+    """
     import os
     from datetime import datetime
 
+    format = check_series_format(format)
+
     api_key = os.getenv('OPENWEATHER_API_KEY')
     if not api_key:
         logger.error("Server Configuration Error: Missing Weather API Key")
         raise HTTPException(status_code=500, detail="Server Configuration Error: Missing Weather API Key")
 
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with upstream_client("openweather", timeout=10.0) as client:
             # Using the 5-day/3-hour forecast API which is free and standard
             url = f"https://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={api_key}&units=metric"
             response = await client.get(url)
@@ -287,7 +256,9 @@ async def get_forecast_trend(lat: float, lon: float):
                     "temp": round(avg_temp, 1),
                     "rain_probability": round(max_rain_prob, 0)
                 })
-            
+
+            if format != "json":
+                return series_response(forecast_trend, format)
             return forecast_trend
 
     except Exception as e:
@@ -296,70 +267,48 @@ async def get_forecast_trend(lat: float, lon: float):
         raise HTTPException(status_code=502, detail="Weather Data Unavailable")
 
 # Historical Data Endpoint (Real Data via Open-Meteo)
-@router.get("/public/history")
-async def get_historical_data(lat: float, lon: float, days: int = 90):
+@router.get("/public/history", response_class=FastJSONResponse)
+async def get_historical_data(lat: float, lon: float, days: int = 90, format: str = "json"):
     """
     Get historical weather data for the past N days using Open-Meteo (Free, Real Data).
+
+    `format=columnar` or `format=binary` returns parallel arrays instead of a list of points.
     """
-    import httpx
-    from datetime import datetime, timedelta
+    format = check_series_format(format)
+    if days < 1 or days > MAX_PAST_DAYS:
+        raise HTTPException(status_code=400, detail=f"Days must be between 1 and {MAX_PAST_DAYS}")
 
-    # Calculate date range
-    # For recent history (last 90 days), the Forecast API with past_days is more reliable than Archive
-    
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            # Use Standard API which handles recent past better than Archive API
-            url = "https://api.open-meteo.com/v1/forecast"
-            params = {
-                "latitude": lat,
-                "longitude": lon,
-                "past_days": days,
-                "forecast_days": 1, # We only want history, but need 1 forecast day to make API happy
-                "daily": "temperature_2m_mean,precipitation_sum,soil_moisture_0_to_7cm_mean",
-                "timezone": "Pacific/Auckland"
-            }
-            
-            response = await client.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            daily = data.get("daily", {})
-            dates = daily.get("time", [])
-            temps = daily.get("temperature_2m_mean", [])
-            rain = daily.get("precipitation_sum", [])
-            soil = daily.get("soil_moisture_0_to_7cm_mean", [])
+        # Served from the per-cell store; only missing/unsettled days go upstream
+        daily_rows = await history_store.get_daily(lat, lon, days)
 
-            history_data = []
-            for i, date_str in enumerate(dates):
-                # Skip if temperature is missing (essential)
-                if temps[i] is None:
-                    continue
+        history_data = []
+        for formatted_date, t, r, s in daily_rows:
+            # Skip if temperature is missing (essential)
+            if t is None:
+                continue
 
-                # Parse date to something shorter like "Nov 20"
-                dt = datetime.strptime(date_str, "%Y-%m-%d")
-                formatted_date = dt.strftime("%d %b")
+            r = r if r is not None else 0
+            # Default soil moisture to 0.3 (moderate) if missing, to avoid breaking the graph
+            s = s if s is not None else 0.3
 
-                t = temps[i]
-                r = rain[i] if rain[i] is not None else 0
-                # Default soil moisture to 0.3 (moderate) if missing, to avoid breaking the graph
-                s = soil[i] if soil[i] is not None else 0.3
+            # Calculate Risk Score (Inverse of Soil Moisture roughly)
+            # Open-Meteo soil moisture is m³/m³ (0.0 to 0.5 usually)
+            # We map 0.0-0.4 to 0-100 Index
+            soil_index = min(100, max(0, s * 250)) 
+            risk_score = 100 - soil_index
 
-                # Calculate Risk Score (Inverse of Soil Moisture roughly)
-                # Open-Meteo soil moisture is m³/m³ (0.0 to 0.5 usually)
-                # We map 0.0-0.4 to 0-100 Index
-                soil_index = min(100, max(0, s * 250)) 
-                risk_score = 100 - soil_index
+            history_data.append({
+                "date": formatted_date,
+                "risk_score": round(risk_score, 1),
+                "soil_moisture": round(soil_index, 1),
+                "temp": round(t, 1),
+                "rain_probability": round(min(100, r * 10), 0) # Rough proxy: 10mm = 100% "impact"
+            })
 
-                history_data.append({
-                    "date": formatted_date,
-                    "risk_score": round(risk_score, 1),
-                    "soil_moisture": round(soil_index, 1),
-                    "temp": round(t, 1),
-                    "rain_probability": round(min(100, r * 10), 0) # Rough proxy: 10mm = 100% "impact"
-                })
-
-            return history_data
+        if format != "json":
+            return series_response(history_data, format)
+        return history_data
 
     except Exception as e:
         logger.error(f"Historical API Error: {str(e)}")
@@ -505,54 +454,116 @@ def calculate_trajectory(history: list) -> dict:
         'momentum': risk_change
     }
 
-async def generate_kaitiaki_wai_narrative(region: str = None) -> dict:
+def narrative_mode(risk_score: float) -> str:
+    """Narrative mode (risk band) for a 0-100 risk score."""
+    if risk_score <= 25:
+        return 'stability'
+    elif risk_score <= 50:
+        return 'tension'
+    elif risk_score <= 75:
+        return 'acceleration'
+    return 'crisis'
+
+# Per-stage deadlines (seconds) for narrative input gathering
+NARRATIVE_STAGE_DEADLINES = {
+    'headlines': 4.0,
+    'council_alerts': 2.0,
+    'risk': 12.0,
+    'history': 8.0
+}
+
+# Narrative input stages are recorded in the bottleneck optimizer as "narrative:<stage>"
+NARRATIVE_STAGE_LABEL = "narrative:{}"
+
+async def gather_narrative_inputs(region: str = None) -> dict:
     """
-    Generate the Kaitiaki Wai narrative for current conditions.
+    Collect everything the Kaitiaki Wai prompt is built from.
+
+    Runs as a dependency-aware pipeline (stage_pipeline.py): headlines,
+    council alerts and the risk calculation start together, and the history
+    fetch starts as soon as risk has supplied coordinates. Headlines, alerts
+    and history fall back to empty on error or deadline; risk is required.
+    Risk uses the background refresher's cached result when there is one.
     """
     
-    # Get existing context (headlines, alerts)
-    headlines = await get_news_headlines()
-    council_alerts = await get_council_alerts()
-    
     # Get drought data for region (or national summary)
     target_region = region or "New Zealand"
     
-    try:
+    async def fetch_risk():
         # Fetch real data using the drought risk calculation engine
-        risk_data = await calculate_drought_risk(target_region)
-        
-        # Map the 0-10 risk score to 0-100 scale for narrative logic
-        risk_score_100 = risk_data['risk_score'] * 10
-        
-        current_data = {
-            'region': risk_data['region'],
-            'risk_score': risk_score_100,
-            'soil_moisture_index': risk_data['factors'].get('soil_moisture_index', 50),
-            'humidity': risk_data['factors'].get('humidity', 50),
-            'temp_anomaly': risk_data['factors'].get('temperature_anomaly', 0),
-            'wind_speed': risk_data['extended_metrics'].get('wind_speed', 0),
-            'weather_condition': risk_data['extended_metrics'].get('weather_main', 'Unknown')
-        }
-        
+        return risk_refresher.get(target_region) or await calculate_drought_risk(target_region)
+    
+    async def fetch_history(risk):
         # Fetch real historical data for trajectory
-        history = []
-        if 'coordinates' in risk_data and 'lat' in risk_data['coordinates']:
-            lat = risk_data['coordinates']['lat']
-            lon = risk_data['coordinates']['lon']
-            try:
-                # Fetch last 14 days of history for robust trajectory calculation
-                history = await get_historical_data(lat, lon, days=14)
-            except Exception as hist_err:
-                logger.warning(f"Warning: Could not fetch history for narrative: {hist_err}")
-                history = []
-        
-    except Exception as e:
+        coordinates = risk.get('coordinates') or {}
+        if 'lat' not in coordinates:
+            return []
+        # Fetch last 14 days of history for robust trajectory calculation
+        return await get_historical_data(coordinates['lat'], coordinates['lon'], days=14)
+    
+    deadlines = NARRATIVE_STAGE_DEADLINES
+    try:
+        results, timings = await run_stages([
+            Stage('headlines', get_news_headlines, deadline=deadlines['headlines'], fallback=[]),
+            Stage('council_alerts', get_council_alerts, deadline=deadlines['council_alerts'], fallback=[]),
+            Stage('risk', fetch_risk, deadline=deadlines['risk']),
+            Stage('history', fetch_history, deps=('risk',), deadline=deadlines['history'], fallback=[])
+        ])
+    except StageError as e:
         logger.error(f"Error fetching real data for narrative: {e}")
         # If we can't get real data, we can't generate a truthful narrative
         raise HTTPException(status_code=502, detail=f"Unable to fetch real data for narrative: {str(e)}")
     
-    # Calculate trajectory
-    trajectory = calculate_trajectory(history)
+    optimizer = get_optimizer()
+    for name, timing in timings.items():
+        if timing['status'] != 'skipped':
+            optimizer.record_call(NARRATIVE_STAGE_LABEL.format(name), timing['ms'], timing['status'] == 'ok')
+    degraded = [name for name, timing in timings.items() if timing['status'] != 'ok']
+    if degraded:
+        logger.warning(f"Narrative inputs for {target_region} degraded: {', '.join(degraded)} used fallbacks")
+    logger.debug(f"Narrative input timings for {target_region}: {timings}")
+    
+    risk_data = results['risk']
+    # Map the 0-10 risk score to 0-100 scale for narrative logic
+    risk_score_100 = risk_data['risk_score'] * 10
+    
+    current_data = {
+        'region': risk_data['region'],
+        'risk_score': risk_score_100,
+        'soil_moisture_index': risk_data['factors'].get('soil_moisture_index', 50),
+        'humidity': risk_data['factors'].get('humidity', 50),
+        'temp_anomaly': risk_data['factors'].get('temperature_anomaly', 0),
+        'wind_speed': risk_data['extended_metrics'].get('wind_speed', 0),
+        'weather_condition': risk_data['extended_metrics'].get('weather_main', 'Unknown')
+    }
+    
+    return {
+        'region': region,
+        'headlines': results['headlines'],
+        'council_alerts': results['council_alerts'],
+        'current_data': current_data,
+        'history': results['history'],
+        # Calculate trajectory
+        'trajectory': calculate_trajectory(results['history']),
+        'timings': timings
+    }
+
+def narrative_signature(inputs: dict) -> str:
+    """
+    What a narrative's tone depends on: risk band and trajectory direction.
+
+    The narrative producer only regenerates when this changes (or the
+    stored narrative reaches its maximum age).
+    """
+    mode = narrative_mode(inputs['current_data'].get('risk_score', 50))
+    return f"{mode}:{inputs['trajectory']['direction']}"
+
+async def compose_narrative(inputs: dict) -> dict:
+    """Generate the Kaitiaki Wai narrative from gathered inputs."""
+    region = inputs['region']
+    current_data = inputs['current_data']
+    history = inputs['history']
+    trajectory = inputs['trajectory']
     
     # Build drought data summary for prompt
     drought_summary = format_drought_data(current_data)
@@ -565,12 +576,12 @@ async def generate_kaitiaki_wai_narrative(region: str = None) -> dict:
     )
     
     # Format headlines
-    headlines_text = "\n".join([f"- {h['title']}" for h in headlines[:5]])
+    headlines_text = "\n".join([f"- {h['title']}" for h in inputs['headlines'][:5]])
     
     # Format alerts
     alerts_text = "\n".join([
         f"- {a.get('region', 'Unknown')}: {a.get('message', 'Alert')} ({a.get('level', 'Info')})"
-        for a in council_alerts[:5]
+        for a in inputs['council_alerts'][:5]
     ])
     
     # Build prompt
@@ -583,65 +594,52 @@ async def generate_kaitiaki_wai_narrative(region: str = None) -> dict:
     )
     
     # Generate via Claude
-    narrative = await chat_with_claude(prompt)
-    
-    # Determine mode for frontend
-    risk = current_data.get('risk_score', 50)
-    if risk <= 25:
-        mode = 'stability'
-    elif risk <= 50:
-        mode = 'tension'
-    elif risk <= 75:
-        mode = 'acceleration'
-    else:
-        mode = 'crisis'
+    narrative = await chat_with_claude(prompt, feature="narrative")
     
     return {
         'title': f"Kaitiaki Wai{' - ' + region if region else ''}",
         'tagline': 'Stories of stewardship, told by the land',
         'narrative': narrative,
-        'mode': mode,
+        # Determine mode for frontend
+        'mode': narrative_mode(current_data.get('risk_score', 50)),
         'risk_score': current_data.get('risk_score', 50),
         'trajectory': trajectory['direction'],
         'updated_at': datetime.now().isoformat()
     }
 
-# Cache for weather narrative (regenerate every 30 minutes)
-_narrative_cache = {}
+async def generate_kaitiaki_wai_narrative(region: str = None) -> dict:
+    """
+    Generate the Kaitiaki Wai narrative for current conditions.
+    """
+    return await compose_narrative(await gather_narrative_inputs(region))
 
 @router.get("/public/weather-narrative")
 async def get_weather_narrative(region: str = None):
     """
     Get the Kaitiaki Wai narrative.
     
-    Optional region parameter for region-specific narrative.
-    Caches for 30 minutes.
+    Optional region parameter for region-specific narrative; only the
+    producer's regions are served (404 otherwise).
+    Narratives are pre-generated by the background narrative producer and
+    served from its persistent store; this endpoint never waits on Groq.
+    A region with no narrative yet returns 503 with Retry-After while one
+    is produced.
     """
     
-    cache_key = f"narrative_{region or 'national'}"
-    
-    # Check cache (30 min TTL)
-    if cache_key in _narrative_cache:
-        cached = _narrative_cache[cache_key]
-        if datetime.now() - cached['timestamp'] < timedelta(minutes=30):
-            return cached['data']
-    
-    # Generate fresh narrative
     try:
-        narrative_data = await generate_kaitiaki_wai_narrative(region)
-        
-        # Cache it
-        _narrative_cache[cache_key] = {
-            'data': narrative_data,
-            'timestamp': datetime.now()
-        }
-        
-        return narrative_data
-        
-    except Exception as e:
-        # No Fallback - Return Error
-        logger.error(f"Narrative Generation Error: {str(e)}")
-        raise HTTPException(status_code=502, detail="Narrative Generation Unavailable")
+        region = narrative_producer.resolve_region(region)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No narrative for region '{region}'")
+
+    narrative_data = narrative_producer.get(region)
+    if narrative_data is None:
+        narrative_producer.request(region)
+        raise HTTPException(
+            status_code=503,
+            detail="Narrative is being prepared",
+            headers={"Retry-After": str(NARRATIVE_RETRY_AFTER_SECONDS)}
+        )
+    return narrative_data
 
 # TRC Hilltop Server Integration
 
@@ -696,11 +694,10 @@ ALLOWED_TRC_SITES = {
 @router.get("/public/hilltop/sites")
 async def get_hilltop_sites():
     """Get monitoring sites from TRC Hilltop Server with coordinates"""
-    import httpx
     import xml.etree.ElementTree as ET
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with upstream_client("trc-hilltop", timeout=30.0) as client:
             response = await client.get(
                 "https://extranet.trc.govt.nz/getdata/merged.hts",
                 params={
@@ -747,11 +744,10 @@ async def get_hilltop_sites():
 @router.get("/public/hilltop/measurements")
 async def get_hilltop_measurements(site: str):
     """Get available measurements for a specific site"""
-    import httpx
     import xml.etree.ElementTree as ET
 
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with upstream_client("trc-hilltop", timeout=30.0) as client:
             response = await client.get(
                 "https://extranet.trc.govt.nz/getdata/merged.hts",
                 params={
@@ -803,13 +799,18 @@ async def get_hilltop_measurements(site: str):
     except Exception as e:
         raise HTTPException(status_code=502, detail="External data source unavailable")
 
-@router.get("/public/hilltop/data")
-async def get_hilltop_data(site: str, measurement: str, days: int = 7):
-    """Get actual data for a site/measurement combination using SOS service"""
-    import httpx
+@router.get("/public/hilltop/data", response_class=FastJSONResponse)
+async def get_hilltop_data(site: str, measurement: str, days: int = 7, format: str = "json"):
+    """
+    Get actual data for a site/measurement combination using SOS service.
+
+    `format=columnar` or `format=binary` returns parallel arrays instead of a list of points.
+    """
     import xml.etree.ElementTree as ET
     import urllib.parse
 
+    format = check_series_format(format)
+
     # Input validation - prevent DOS
     if days < 1 or days > 365:
         raise HTTPException(status_code=400, detail="Days must be between 1 and 365")
@@ -821,7 +822,7 @@ async def get_hilltop_data(site: str, measurement: str, days: int = 7):
         encoded_meas = urllib.parse.quote(measurement)
         url = f"{base_url}?Service=SOS&Request=GetObservation&FeatureOfInterest={encoded_site}&ObservedProperty={encoded_meas}&TemporalFilter=om:phenomenonTime,P{days}D"
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        async with upstream_client("trc-hilltop", timeout=60.0) as client:
             response = await client.get(url)
             response.raise_for_status()
 
@@ -853,6 +854,13 @@ async def get_hilltop_data(site: str, measurement: str, days: int = 7):
             if uom_elem is not None:
                 units = uom_elem.get('code', "")
 
+            if format != "json":
+                return series_response(data_points, format, meta={
+                    "site": site,
+                    "measurement": measurement,
+                    "units": units
+                })
+
             return {
                 "site": site,
                 "measurement": measurement,
@@ -0,0 +1,65 @@
+"""
+Realtime Audio Frame Fast Path for the Voice Relays
+Forward audio frames without a JSON round-trip
+
+Audio dominates relay traffic: dozens of input_audio_buffer.append frames a
+second from the browser and response.audio.delta frames back from OpenAI,
+each carrying kilobytes of base64 PCM16. The relays only need to know that
+a frame is audio, which a prefix check answers without parsing, so audio
+frames are forwarded as the original text. Everything else still goes
+through json.loads.
+
+Clients may also send raw PCM16 as binary WebSocket frames. These are
+base64-encoded once here, straight into an append frame.
+
+The prefix check only recognises "type" as the first key (as both the
+browser client and the Realtime API send it). Any other frame takes the
+ordinary JSON path, so a miss only costs speed.
+"""
+
+import base64
+from typing import Union
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+AUDIO_APPEND_TYPE = "input_audio_buffer.append"
+AUDIO_DELTA_TYPE = "response.audio.delta"
+
+
+def _prefixes(event_type: str):
+    return (f'{{"type":"{event_type}"', f'{{"type": "{event_type}"')
+
+
+_APPEND_PREFIXES = _prefixes(AUDIO_APPEND_TYPE)
+_DELTA_PREFIXES = _prefixes(AUDIO_DELTA_TYPE)
+
+
+def is_audio_append(frame: str) -> bool:
+    """True for an input_audio_buffer.append frame, without parsing it."""
+    return frame.startswith(_APPEND_PREFIXES)
+
+
+def is_audio_delta(frame: str) -> bool:
+    """True for a response.audio.delta frame, without parsing it."""
+    return frame.startswith(_DELTA_PREFIXES)
+
+
+def append_frame(pcm: bytes) -> str:
+    """input_audio_buffer.append frame for raw PCM16 bytes."""
+    return '{"type":"' + AUDIO_APPEND_TYPE + '","audio":"' + base64.b64encode(pcm).decode("ascii") + '"}'
+
+
+async def receive_frame(websocket: WebSocket) -> Union[str, bytes]:
+    """
+    Next text or binary frame from a client WebSocket.
+
+    Raises:
+        WebSocketDisconnect: when the client disconnects
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    text = message.get("text")
+    if text is not None:
+        return text
+    return message.get("bytes") or b""
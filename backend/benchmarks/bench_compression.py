@@ -0,0 +1,93 @@
+"""
+Benchmark: CPU cost versus bytes saved for response compression
+
+Representative payloads: 90-day history, a 7-day Hilltop series at 5-minute
+resolution, a trigger list and a narrative. Each coding is timed on a cold
+compress and on the compress-once cache hit that later requests take.
+
+Run from backend/: python benchmarks/bench_compression.py
+"""
+
+import hashlib
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_series_formats import make_history
+from response_compression import ENCODERS, CompressedBodyCache, available_codings
+from response_formats import encode_json
+
+REPEAT = 50
+
+
+def make_hilltop(days: int = 7) -> dict:
+    rng = random.Random(7)
+    start = datetime(2025, 11, 1)
+    points = [
+        {
+            "timestamp": (start + timedelta(minutes=5 * i)).isoformat() + "+13:00",
+            "value": round(2.0 + rng.gauss(0, 0.2), 3)
+        }
+        for i in range(days * 288)
+    ]
+    return {"site": "Patea at Skinner Rd", "measurement": "Flow", "units": "m3/sec",
+            "data": points, "count": len(points)}
+
+
+def make_triggers(count: int = 40) -> dict:
+    triggers = [
+        {
+            "id": i, "user_id": 2, "name": f"Taranaki Drought Alert {i}", "region": "Taranaki",
+            "is_active": True, "combination_rule": "any_2",
+            "created_at": "2025-11-20T10:00:00", "updated_at": "2025-11-20T10:00:00",
+            "conditions": [
+                {"indicator": "temp", "operator": ">", "threshold": 25.0},
+                {"indicator": "rainfall", "operator": "<", "threshold": 2.0},
+                {"indicator": "humidity", "operator": "<", "threshold": 60.0}
+            ]
+        }
+        for i in range(count)
+    ]
+    return {"triggers": triggers, "total": count}
+
+
+def make_narrative() -> dict:
+    text = ("The paddocks of south Taranaki hold their breath as day five of the anomaly "
+            "settles over the ring plain, the Patea running thin beneath Skinner Road. ") * 6
+    return {"title": "Kaitiaki Wai - Taranaki", "tagline": "Stories of stewardship, told by the land",
+            "narrative": text, "mode": "tension", "risk_score": 46.0, "trajectory": "worsening",
+            "updated_at": "2025-11-20T10:00:00"}
+
+
+def main() -> None:
+    payloads = {
+        "history (90 days)": encode_json(make_history(90)),
+        "hilltop (7 days @ 5 min)": encode_json(make_hilltop()),
+        "trigger list (40)": encode_json(make_triggers()),
+        "narrative": encode_json(make_narrative()),
+    }
+    print(f"{'payload':<26} {'coding':<6} {'raw':>9} {'encoded':>9} {'saved':>7} {'cold':>10} {'cached':>9}")
+    for label, body in payloads.items():
+        for coding in available_codings():
+            encoded = ENCODERS[coding](body)
+            cold = timeit.timeit(lambda: ENCODERS[coding](body), number=REPEAT) / REPEAT
+
+            cache = CompressedBodyCache()
+
+            def cached():
+                digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+                return cache.get_or_compress(digest, coding, body)
+
+            cached()
+            warm = timeit.timeit(cached, number=REPEAT * 20) / (REPEAT * 20)
+            saved = 100 * (1 - len(encoded) / len(body))
+            print(f"{label:<26} {coding:<6} {len(body):>9,} {len(encoded):>9,} {saved:>6.1f}% "
+                  f"{cold * 1e6:>8.0f}us {warm * 1e6:>7.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: encode time and bytes on the wire for a 365-day series
+
+Compares the default list-of-dicts JSON (stdlib and fast encoder) with the
+columnar and binary formats from response_formats.py, raw and gzipped.
+
+Run from backend/: python benchmarks/bench_series_formats.py
+"""
+
+import gzip
+import json
+import os
+import random
+import sys
+import timeit
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_formats import ORJSON_AVAILABLE, encode_binary, encode_json, to_columns
+
+DAYS = 365
+REPEAT = 200
+
+
+def make_history(days: int = DAYS) -> list:
+    """Synthetic /public/history payload with the production field layout."""
+    rng = random.Random(42)
+    start = date.today() - timedelta(days=days)
+    rows = []
+    for i in range(days):
+        soil_index = round(rng.uniform(20, 90), 1)
+        rows.append({
+            "date": (start + timedelta(days=i)).strftime("%d %b"),
+            "risk_score": round(100 - soil_index, 1),
+            "soil_moisture": soil_index,
+            "temp": round(rng.uniform(5, 28), 1),
+            "rain_probability": round(rng.uniform(0, 100), 0)
+        })
+    return rows
+
+
+def bench(label: str, encode) -> None:
+    payload = encode()
+    seconds = timeit.timeit(encode, number=REPEAT) / REPEAT
+    print(f"{label:<28} {seconds * 1e6:>10.1f} us {len(payload):>10,} B {len(gzip.compress(payload)):>10,} B")
+
+
+def main() -> None:
+    rows = make_history()
+    print(f"365-day series, {REPEAT} iterations (fast encoder: {'orjson' if ORJSON_AVAILABLE else 'stdlib'})")
+    print(f"{'format':<28} {'encode':>13} {'raw':>12} {'gzip':>12}")
+    bench("json (stdlib, default)", lambda: json.dumps(rows).encode("utf-8"))
+    bench("json (fast encoder)", lambda: encode_json(rows))
+    bench("columnar (fast encoder)", lambda: encode_json({"columns": to_columns(rows)}))
+    bench("binary (float32 LE)", lambda: encode_binary(to_columns(rows)))
+
+
+if __name__ == "__main__":
+    main()
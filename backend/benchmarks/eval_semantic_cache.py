@@ -0,0 +1,89 @@
+"""
+Offline evaluation: semantic chat cache threshold versus hit rate
+
+Replays a recorded question log through a fresh SemanticCache for each
+threshold. Every question is first looked up; a miss is then added as if it
+had been answered. When log lines carry an "intent" label, a hit whose
+cached question has a different intent counts as a false hit, so the sweep
+shows the hit rate each threshold buys and the wrong answers it costs.
+
+Log format (JSONL), one question per line:
+    {"question": "What is the drought risk in Taranaki?", "intent": "risk-taranaki"}
+
+A plain-text log with one question per line also works (no precision column).
+
+Run from backend/: python benchmarks/eval_semantic_cache.py [--log path] [--thresholds 0.5,0.6,0.7]
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_cache import SemanticCache
+
+DEFAULT_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "chat_questions_sample.jsonl")
+DEFAULT_THRESHOLDS = [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95]
+VERSION = "eval"
+
+
+def load_log(path: str) -> List[Dict[str, Optional[str]]]:
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                record = json.loads(line)
+                records.append({"question": record["question"], "intent": record.get("intent")})
+            else:
+                records.append({"question": line, "intent": None})
+    return records
+
+
+def replay(records: List[Dict[str, Optional[str]]], threshold: float) -> Dict[str, float]:
+    cache = SemanticCache(threshold=threshold, max_entries=len(records) + 1)
+    hits = false_hits = labelled_hits = 0
+    for record in records:
+        match = cache.best_match(record["question"], VERSION)
+        if match is not None and match[0] >= threshold:
+            hits += 1
+            # The "answer" stored for a question is its intent label
+            if record["intent"] is not None:
+                labelled_hits += 1
+                if match[2].answer != record["intent"]:
+                    false_hits += 1
+        else:
+            cache.add(record["question"], VERSION, record["intent"] or "")
+    return {
+        "threshold": threshold,
+        "hit_rate": hits / len(records) if records else 0.0,
+        "hits": hits,
+        "false_hits": false_hits,
+        "precision": (labelled_hits - false_hits) / labelled_hits if labelled_hits else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--log", default=DEFAULT_LOG, help="recorded question log (JSONL or plain text)")
+    parser.add_argument("--thresholds", default=None, help="comma-separated thresholds to sweep")
+    args = parser.parse_args()
+
+    thresholds = [float(t) for t in args.thresholds.split(",")] if args.thresholds else DEFAULT_THRESHOLDS
+    records = load_log(args.log)
+    print(f"{len(records)} questions from {args.log}\n")
+    print(f"{'threshold':>9} {'hit rate':>9} {'hits':>5} {'false':>6} {'precision':>10}")
+    for threshold in thresholds:
+        result = replay(records, threshold)
+        precision = "n/a" if result["precision"] is None else f"{result['precision']:.1%}"
+        print(f"{threshold:>9.2f} {result['hit_rate']:>9.1%} {result['hits']:>5} "
+              f"{result['false_hits']:>6} {precision:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""
+Load test: concurrent voice sessions per relay worker
+
+Starts a local fake of the OpenAI Realtime WebSocket and a fake Groq HTTP
+endpoint, runs the two relays (voice_relay and openai_relay) in a separate
+uvicorn worker pointed at them, and drives N simulated browser clients
+through each relay at once. Each client streams 20 ms PCM16 frames in real
+time, commits the utterance and waits for the spoken reply, for a few turns.
+
+The fake Realtime server follows a fixed script per utterance: it sends
+speech_started on the first audio frame, then speech_stopped, the
+transcript and an auto-response on commit. It streams audio deltas unless
+the relay cancels the auto-response, in which case it streams on the
+relay's own response.create.
+
+Reported per N:
+    latency     commit -> first audio delta at the client (p50 / p95 / max)
+    sidecar     commit -> Constitutional Validator update (openai_relay only)
+    relay CPU   worker CPU time over wall time, and per session-second
+    relay RSS   peak resident memory of the worker
+
+CPU and memory are read from /proc, so run this on Linux.
+
+Run from backend/: python benchmarks/relay_load_test.py [--sessions 1,10,50] [--relay voice,sidecar]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from fastapi import FastAPI, Request
+from websockets.asyncio.client import connect as ws_connect
+from websockets.asyncio.server import serve as ws_serve
+from websockets.exceptions import ConnectionClosed
+
+FRAME_MS = 20
+SAMPLE_RATE = 24000
+FRAME_BYTES = SAMPLE_RATE * FRAME_MS // 1000 * 2  # PCM16 mono
+UTTERANCE_FRAMES = 40        # 0.8 s of speech per turn
+REPLY_DELTAS = 50            # 1 s of reply audio
+AUTO_RESPONSE_GRACE = 0.05   # how long the fake waits for a response.cancel
+TURN_TIMEOUT = 20.0
+TURN_PAUSE = 0.3
+
+RELAY_PATHS = {"voice": "/api/ws/voice-relay", "sidecar": "/api/ws/openai-relay"}
+TRANSCRIPTS = [
+    "How is my portfolio doing today?",
+    "Should I buy more dairy stocks given the drought?",
+    "What is the chaos index right now?",
+    "Is it a good time to take some profit on Fonterra?"
+]
+
+
+def _event(event_type: str, **fields) -> str:
+    # "type" first, like the Realtime API, so the relay fast path applies
+    return json.dumps({"type": event_type, **fields}, separators=(",", ":"))
+
+
+_AUDIO_DELTA = _event("response.audio.delta", delta=base64.b64encode(bytes(FRAME_BYTES)).decode("ascii"))
+
+
+# -----------------------------------------------------------------------------
+# Fake OpenAI Realtime API
+# -----------------------------------------------------------------------------
+async def fake_realtime(ws) -> None:
+    speaking = False
+    turn = 0
+    cancelled = asyncio.Event()
+    requested = asyncio.Event()
+
+    async def stream_reply():
+        for _ in range(REPLY_DELTAS):
+            await ws.send(_AUDIO_DELTA)
+            await asyncio.sleep(0.002)
+        await ws.send(_event("response.audio_transcript.done", transcript="Here is a calm, measured answer."))
+        await ws.send(_event("response.done"))
+
+    async def respond():
+        # Auto-response unless the relay cancels it, then wait for its own response.create
+        try:
+            await asyncio.wait_for(cancelled.wait(), AUTO_RESPONSE_GRACE)
+        except asyncio.TimeoutError:
+            await stream_reply()
+            return
+        await requested.wait()
+        await stream_reply()
+
+    try:
+        async for message in ws:
+            event_type = json.loads(message).get("type")
+            if event_type == "input_audio_buffer.append":
+                if not speaking:
+                    speaking = True
+                    await ws.send(_event("input_audio_buffer.speech_started"))
+            elif event_type == "input_audio_buffer.commit":
+                speaking = False
+                cancelled.clear()
+                requested.clear()
+                await ws.send(_event("input_audio_buffer.speech_stopped"))
+                await ws.send(_event("conversation.item.input_audio_transcription.completed",
+                                     transcript=TRANSCRIPTS[turn % len(TRANSCRIPTS)]))
+                await ws.send(_event("response.created"))
+                turn += 1
+                asyncio.create_task(respond())
+            elif event_type == "response.cancel":
+                cancelled.set()
+            elif event_type == "response.create":
+                requested.set()
+    except ConnectionClosed:
+        pass
+
+
+# -----------------------------------------------------------------------------
+# Fake Groq chat completions
+# -----------------------------------------------------------------------------
+def build_fake_groq(latency: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/openai/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        await asyncio.sleep(random.uniform(0.5, 1.5) * latency)
+
+        if "EXPLORER" in prompt:
+            content = json.dumps(["Check water allocation risk", "Review dairy price history", "Consider position size"])
+        elif "Thoughts:" in prompt:
+            count = prompt.count('"""') // 2
+            content = json.dumps([round(random.uniform(0.4, 0.95), 2) for _ in range(count)])
+        elif "CONSTITUTIONAL VALIDATOR" in prompt:
+            content = "0.8"
+        elif "Synthesize" in prompt:
+            content = "Stay measured: the drought raises risk, so keep positions modest and review next week."
+        else:
+            content = json.dumps({"constitutionalScore": 0.82, "recommendation": "Hold; avoid FOMO."})
+
+        return {
+            "id": "chatcmpl-load", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4}
+        }
+
+    return app
+
+
+# -----------------------------------------------------------------------------
+# Relay worker under test
+# -----------------------------------------------------------------------------
+def serve_relay(port: int) -> None:
+    """Entry point of the relay worker subprocess."""
+    from voice_relay import router as voice_relay_router
+    from openai_relay import router as openai_relay_router
+
+    app = FastAPI()
+    app.include_router(voice_relay_router, prefix="/api")
+    app.include_router(openai_relay_router, prefix="/api")
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level=os.getenv("RELAY_LOG_LEVEL", "warning"), ws_max_size=1 << 24)
+
+
+class ProcessSampler:
+    """CPU seconds and peak RSS of a process, from /proc."""
+
+    _TICKS = os.sysconf("SC_CLK_TCK")
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.peak_rss_mb = 0.0
+
+    def cpu_seconds(self) -> float:
+        with open(f"/proc/{self.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / self._TICKS
+
+    def rss_mb(self) -> float:
+        with open(f"/proc/{self.pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+
+    async def watch(self, interval: float = 0.2) -> None:
+        while True:
+            self.peak_rss_mb = max(self.peak_rss_mb, self.rss_mb())
+            await asyncio.sleep(interval)
+
+
+# -----------------------------------------------------------------------------
+# Simulated clients
+# -----------------------------------------------------------------------------
+async def run_session(url: str, turns: int, results: Dict[str, List[float]], wait_for_sidecar: bool) -> None:
+    frame = json.dumps({"type": "input_audio_buffer.append",
+                        "audio": base64.b64encode(bytes(FRAME_BYTES)).decode("ascii")})
+    first_audio = asyncio.Event()
+    reply_done = asyncio.Event()
+    sidecar = asyncio.Event()
+
+    async with ws_connect(url, max_size=1 << 24) as ws:
+        async def receive():
+            async for message in ws:
+                if message.startswith('{"type":"response.audio.delta"'):
+                    first_audio.set()
+                    continue
+                event_type = json.loads(message).get("type")
+                if event_type == "response.done":
+                    reply_done.set()
+                elif event_type == "response.function_call_arguments.done":
+                    sidecar.set()
+
+        receiver = asyncio.create_task(receive())
+        try:
+            for _ in range(turns):
+                first_audio.clear()
+                reply_done.clear()
+                sidecar.clear()
+                next_frame = time.perf_counter()
+                for _ in range(UTTERANCE_FRAMES):
+                    await ws.send(frame)
+                    next_frame += FRAME_MS / 1000
+                    await asyncio.sleep(max(0.0, next_frame - time.perf_counter()))
+                committed = time.perf_counter()
+                await ws.send(json.dumps({"type": "input_audio_buffer.commit"}))
+
+                try:
+                    await asyncio.wait_for(first_audio.wait(), TURN_TIMEOUT)
+                    results["latency"].append(time.perf_counter() - committed)
+                    await asyncio.wait_for(reply_done.wait(), TURN_TIMEOUT)
+                except asyncio.TimeoutError:
+                    results["failed"].append(1)
+                    continue
+                if wait_for_sidecar:
+                    try:
+                        await asyncio.wait_for(sidecar.wait(), TURN_TIMEOUT)
+                        results["sidecar"].append(time.perf_counter() - committed)
+                    except asyncio.TimeoutError:
+                        results["failed"].append(1)
+                await asyncio.sleep(TURN_PAUSE)
+        finally:
+            receiver.cancel()
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _ms(values: List[float], pct: float) -> str:
+    value = _percentile(values, pct)
+    return "-" if value != value else f"{value * 1000:.0f}"
+
+
+async def run_level(relay: str, port: int, sessions: int, turns: int, sampler: ProcessSampler) -> Dict[str, float]:
+    url = f"ws://127.0.0.1:{port}{RELAY_PATHS[relay]}"
+    results: Dict[str, List[float]] = {"latency": [], "sidecar": [], "failed": []}
+    watcher = asyncio.create_task(sampler.watch())
+    cpu_start = sampler.cpu_seconds()
+    started = time.perf_counter()
+
+    outcomes = await asyncio.gather(*(run_session(url, turns, results, relay == "sidecar") for _ in range(sessions)),
+                                    return_exceptions=True)
+
+    wall = time.perf_counter() - started
+    cpu = sampler.cpu_seconds() - cpu_start
+    watcher.cancel()
+    errors = [o for o in outcomes if isinstance(o, BaseException)]
+    if errors:
+        print(f"  {len(errors)} session(s) failed, e.g. {errors[0]!r}")
+    return {
+        "relay": relay, "sessions": sessions, "turns": len(results["latency"]),
+        "failed": len(results["failed"]) + len(errors) * turns,
+        "p50": _ms(results["latency"], 50), "p95": _ms(results["latency"], 95), "max": _ms(results["latency"], 100),
+        "sidecar_p50": _ms(results["sidecar"], 50),
+        "cpu_pct": 100 * cpu / wall, "cpu_ms_per_session_s": 1000 * cpu / (wall * sessions),
+        "rss_mb": sampler.peak_rss_mb
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_for_port(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"relay worker did not listen on port {port}")
+            await asyncio.sleep(0.1)
+
+
+async def main_async(args) -> None:
+    realtime_port, groq_port, relay_port = _free_port(), _free_port(), _free_port()
+
+    realtime = await ws_serve(fake_realtime, "127.0.0.1", realtime_port, max_size=1 << 24)
+    groq = uvicorn.Server(uvicorn.Config(build_fake_groq(args.groq_latency), host="127.0.0.1",
+                                         port=groq_port, log_level="warning"))
+    groq_task = asyncio.create_task(groq.serve())
+
+    cache_dir = tempfile.mkdtemp(prefix="relay-load-")
+    env = dict(
+        os.environ,
+        OPENAI_REALTIME_URL=f"ws://127.0.0.1:{realtime_port}/v1/realtime",
+        OPENAI_API_KEY="load-test",
+        GROQ_API_KEY="load-test",
+        GROQ_BASE_URL=f"http://127.0.0.1:{groq_port}",
+        LLM_CACHE_PATH=os.path.join(cache_dir, "llm_cache.db")
+    )
+    worker = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve-relay", str(relay_port)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env,
+        stdout=None if args.verbose else subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL
+    )
+    try:
+        await _wait_for_port(relay_port)
+        sampler = ProcessSampler(worker.pid)
+        print(f"Relay worker pid {worker.pid}, idle RSS {sampler.rss_mb():.1f} MB, "
+              f"fake Groq latency {args.groq_latency * 1000:.0f} ms, {args.turns} turns per session\n")
+        print(f"{'relay':>8} {'N':>4} {'turns':>6} {'failed':>6} {'p50 ms':>7} {'p95 ms':>7} {'max ms':>7} "
+              f"{'sidecar':>8} {'CPU %':>6} {'CPU ms/s':>9} {'RSS MB':>7}")
+        for relay in args.relay:
+            for sessions in args.sessions:
+                row = await run_level(relay, relay_port, sessions, args.turns, sampler)
+                print(f"{row['relay']:>8} {row['sessions']:>4} {row['turns']:>6} {row['failed']:>6} "
+                      f"{row['p50']:>7} {row['p95']:>7} {row['max']:>7} {row['sidecar_p50']:>8} "
+                      f"{row['cpu_pct']:>6.1f} {row['cpu_ms_per_session_s']:>9.2f} {row['rss_mb']:>7.1f}")
+    finally:
+        worker.terminate()
+        # Wait off the event loop: the fake servers must keep answering the worker's close handshakes
+        try:
+            await asyncio.to_thread(worker.wait, 10)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+            worker.wait()
+        realtime.close()
+        groq.should_exit = True
+        await groq_task
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--serve-relay":
+        serve_relay(int(sys.argv[2]))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sessions", default="1,5,10,25,50", help="comma-separated concurrent session counts")
+    parser.add_argument("--relay", default="voice,sidecar", help="relays to load: voice, sidecar or both")
+    parser.add_argument("--turns", type=int, default=3, help="utterances per session")
+    parser.add_argument("--groq-latency", type=float, default=0.25, help="mean fake Groq latency in seconds")
+    parser.add_argument("--verbose", action="store_true", help="show relay worker logs")
+    args = parser.parse_args()
+    args.sessions = [int(n) for n in args.sessions.split(",")]
+    args.relay = [r.strip() for r in args.relay.split(",")]
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,10 +6,15 @@ Identifies slow endpoints and optimizes request routing
 import time
 import asyncio
 from collections import defaultdict
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import json
 
+from latency_histogram import EndpointLatency, WINDOWS
+
+# Window whose p95 feeds the Bellman score (the lifetime average covers the rest)
+SCORING_WINDOW = "1h"
+
 class BellmanBottleneckOptimizer:
     """
     Uses dynamic programming (Bellman-Ford inspired) to find optimal
@@ -22,25 +27,29 @@ class BellmanBottleneckOptimizer:
             'total_latency': 0.0,
             'failures': 0,
             'last_called': None,
-            'latency_history': []
+            'latency': EndpointLatency(),
+            'response_bytes': 0,
+            'status_counts': defaultdict(int)
         })
         self.dependency_graph = {}
         self.optimization_state = {}
 
-    def record_call(self, endpoint: str, latency: float, success: bool):
-        """Record an API call for analysis"""
+    def record_call(self, endpoint: str, latency: float, success: bool,
+                    status: Optional[int] = None, response_bytes: int = 0):
+        """Record an API call for analysis (latency in ms; status and size when known)"""
         metrics = self.endpoint_metrics[endpoint]
         metrics['call_count'] += 1
         metrics['total_latency'] += latency
         metrics['last_called'] = datetime.now()
+        metrics['response_bytes'] += response_bytes
+        if status is not None:
+            metrics['status_counts'][status] += 1
 
         if not success:
             metrics['failures'] += 1
 
-        # Keep last 100 latencies for percentile calculations
-        metrics['latency_history'].append(latency)
-        if len(metrics['latency_history']) > 100:
-            metrics['latency_history'] = metrics['latency_history'][-100:]
+        # Fixed-memory histograms (lifetime, 1m, 5m, 1h) for percentile calculations
+        metrics['latency'].record(latency)
 
     def get_avg_latency(self, endpoint: str) -> float:
         """Calculate average latency for an endpoint"""
@@ -49,15 +58,13 @@ class BellmanBottleneckOptimizer:
             return 0.0
         return metrics['total_latency'] / metrics['call_count']
 
-    def get_p95_latency(self, endpoint: str) -> float:
+    def get_percentiles(self, endpoint: str, window: Optional[str] = None) -> Dict[str, float]:
+        """Count, p50/p95/p99/p999 and max latency over a window ("1m", "5m", "1h"; None for lifetime)"""
+        return self.endpoint_metrics[endpoint]['latency'].percentiles(window)
+
+    def get_p95_latency(self, endpoint: str, window: Optional[str] = SCORING_WINDOW) -> float:
         """Calculate 95th percentile latency"""
-        metrics = self.endpoint_metrics[endpoint]
-        history = metrics['latency_history']
-        if not history:
-            return 0.0
-        sorted_latencies = sorted(history)
-        index = int(len(sorted_latencies) * 0.95)
-        return sorted_latencies[index]
+        return self.get_percentiles(endpoint, window)['p95']
 
     def get_failure_rate(self, endpoint: str) -> float:
         """Calculate failure rate as percentage"""
@@ -102,7 +109,10 @@ class BellmanBottleneckOptimizer:
                 'avg_latency_ms': round(avg_latency, 2),
                 'p95_latency_ms': round(p95_latency, 2),
                 'failure_rate_pct': round(failure_rate, 2),
+                'latency_ms': {window: self.get_percentiles(endpoint, window) for window in WINDOWS},
                 'call_count': metrics['call_count'],
+                'avg_response_bytes': round(metrics['response_bytes'] / metrics['call_count']),
+                'status_counts': {str(code): count for code, count in sorted(metrics['status_counts'].items())},
                 'bellman_score': round(bellman_score, 2),
                 'is_bottleneck': is_bottleneck,
                 'last_called': metrics['last_called'].isoformat() if metrics['last_called'] else None
@@ -138,6 +148,15 @@ class BellmanBottleneckOptimizer:
 
         return recommendations
 
+    def export_histograms(self) -> Dict[str, Dict]:
+        """Latency histograms per endpoint, for merging into another worker's optimizer"""
+        return {endpoint: metrics['latency'].to_dict() for endpoint, metrics in self.endpoint_metrics.items()}
+
+    def merge_histograms(self, histograms: Dict[str, Dict]):
+        """Add latency histograms exported by another worker (counts and averages are not merged)"""
+        for endpoint, data in histograms.items():
+            self.endpoint_metrics[endpoint]['latency'].merge(data)
+
     def export_state(self) -> Dict:
         """Export optimizer state for monitoring dashboard"""
         return {
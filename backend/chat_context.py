@@ -0,0 +1,98 @@
+"""
+Chat Context Builder for CKCIAS Drought Monitor
+Regional drought summary for the chatbot, rendered from the shared risk cache
+
+The summary is rendered once per risk-data generation (see risk_refresher.py)
+and the same string is reused by every chat request until the underlying data
+changes, so the chat path no longer waits on six OpenWeather round trips.
+Regions missing from the cache (cold start, or a failed refresh) are fetched
+live, at most once a minute, and fed back into the refresher.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from drought_risk import calculate_drought_risk
+from logger_config import logger
+from risk_refresher import RiskRefresher, risk_refresher
+
+CONTEXT_REGIONS = ["Northland", "Waikato", "Taranaki", "Hawke's Bay", "Canterbury", "Otago"]
+
+# Minimum gap between live fetches for regions the refresher has not cached yet
+FILL_RETRY_SECONDS = 60
+
+
+def render_region_line(region: str, data: Dict[str, Any]) -> str:
+    line = f"- {region}: Risk {data['risk_score']}/100 ({data.get('risk_level', 'Unknown')})"
+    if 'factors' in data:
+        factors = data['factors']
+        line += f", Soil Moisture Index: {factors.get('soil_moisture_index', 'N/A')}"
+        line += f", Temp Anomaly: {factors.get('temperature_anomaly', 'N/A')}C"
+    return line
+
+
+def render_context(results: Dict[str, Optional[Dict[str, Any]]], regions: List[str]) -> str:
+    """Render the summary block sent to the LLM."""
+    summary_lines = [render_region_line(region, results[region]) for region in regions if results.get(region)]
+    if not summary_lines:
+        return "Current Regional Drought Conditions:\n- Data unavailable"
+    return "Current Regional Drought Conditions:\n" + "\n".join(summary_lines)
+
+
+class DroughtContextBuilder:
+    """
+    Generation-versioned cache of the rendered chat context.
+
+    Usage:
+        context = await context_builder.get_context()
+    """
+
+    def __init__(self, refresher: RiskRefresher = risk_refresher, regions: List[str] = None, fetch=None):
+        self.refresher = refresher
+        self.regions = regions if regions is not None else CONTEXT_REGIONS
+        self._fetch = fetch or calculate_drought_risk
+        self._fill_lock = asyncio.Lock()
+        self._rendered: Optional[str] = None
+        self._generation = -1
+        self._last_fill = float("-inf")
+        self.hits = 0
+        self.renders = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "renders": self.renders, "generation": self._generation}
+
+    async def get_context(self) -> str:
+        missing = [region for region in self.regions if self.refresher.get(region) is None]
+        if missing and time.monotonic() - self._last_fill >= FILL_RETRY_SECONDS:
+            # Single flight: concurrent cold chats share one live fetch
+            async with self._fill_lock:
+                missing = [region for region in self.regions if self.refresher.get(region) is None]
+                if missing and time.monotonic() - self._last_fill >= FILL_RETRY_SECONDS:
+                    await self._fill(missing)
+                    self._last_fill = time.monotonic()
+
+        # The summary only depends on tracked risk fields, which bump the generation
+        generation = self.refresher.generation
+        if self._rendered is not None and self._generation == generation:
+            self.hits += 1
+            return self._rendered
+
+        results = {region: self.refresher.get(region) for region in self.regions}
+        self._rendered = render_context(results, self.regions)
+        self._generation = generation
+        self.renders += 1
+        return self._rendered
+
+    async def _fill(self, regions: List[str]) -> None:
+        async def fetch_region(region: str):
+            try:
+                self.refresher.update(region, await self._fetch(region))
+            except Exception as exc:
+                logger.error(f"Error fetching context for {region}: {exc}")
+
+        await asyncio.gather(*(fetch_region(region) for region in regions))
+
+
+# Global instance
+context_builder = DroughtContextBuilder()
@@ -6,9 +6,12 @@ Groq (Llama 3.3 70B) AI integration for drought-related queries
 import os
 import asyncio
 import re
-from groq import AsyncGroq
+from typing import AsyncIterator, List
 from dotenv import load_dotenv
 from logger_config import logger
+from llm_cache import cache_key, context_version, llm_cache
+from llm_gateway import llm_gateway
+from semantic_cache import semantic_cache
 
 # Load environment variables from ../.env
 env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
@@ -25,6 +28,11 @@ if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY environment variable is required")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
 
+CHAT_TEMPERATURE = 0.7
+
+# Longest allowed gap between streamed deltas (and before the first one)
+STREAM_IDLE_TIMEOUT = 30.0
+
 # System prompt for drought monitoring with Extended Thinking
 SYSTEM_PROMPT = """You are Kaitiaki Wai, a guardian of water and community resilience for the Taranaki region.
 
@@ -51,17 +59,116 @@ Keep responses practical, data-driven, and focused on New Zealand context, but d
 _client = None
 
 def _initialize_client():
-    """Initialize the Groq client if not already initialized"""
+    """Initialize the Groq client (a view of the shared LLM gateway) if not already initialized"""
     global _client
     if _client is None:
         if not GROQ_API_KEY:
             logger.critical("GROQ_API_KEY not found during client initialization")
             raise ValueError("GROQ_API_KEY not found in environment variables")
-        _client = AsyncGroq(api_key=GROQ_API_KEY)
+        _client = llm_gateway.client_for("chat")
         logger.info("Groq client initialized successfully")
     return _client
 
-async def chat_with_claude(message: str, context: str = None) -> str:
+def _build_messages(message: str, context: str = None) -> List[dict]:
+    """System prompt plus the user message, with context data prepended if available."""
+    full_message = message
+    if context:
+        full_message = f"""Context Data (Real-time System Metrics):
+{context}
+
+User Question:
+{message}"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": full_message}
+    ]
+
+
+class ThinkingFilter:
+    """
+    Incremental remover for <thinking>...</thinking> spans in streamed text.
+
+    Tags may be split across deltas, so a trailing fragment that could be the
+    start of a tag is held back until the next delta decides it. Suppressed
+    text is kept in `thinking` for debug logging. Leading whitespace of the
+    visible reply is dropped, matching the .strip() of the non-streaming path.
+
+    Usage:
+        f = ThinkingFilter()
+        for delta in deltas:
+            send(f.feed(delta))
+        send(f.flush())
+    """
+
+    OPEN = "<thinking>"
+    CLOSE = "</thinking>"
+
+    def __init__(self):
+        self.in_thinking = False
+        self.thinking = ""
+        self._buffer = ""
+        self._started = False
+
+    def feed(self, text: str) -> str:
+        self._buffer += text
+        visible: List[str] = []
+        while self._buffer:
+            tag = self.CLOSE if self.in_thinking else self.OPEN
+            index = self._buffer.find(tag)
+            if index >= 0:
+                self._emit(self._buffer[:index], visible)
+                self._buffer = self._buffer[index + len(tag):]
+                self.in_thinking = not self.in_thinking
+                continue
+
+            keep = _partial_tag_length(self._buffer, tag)
+            self._emit(self._buffer[:len(self._buffer) - keep], visible)
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            break
+        return "".join(visible)
+
+    def flush(self) -> str:
+        """Release held-back text at end of stream (an unclosed thinking block is dropped)."""
+        visible: List[str] = []
+        self._emit(self._buffer, visible)
+        self._buffer = ""
+        return "".join(visible)
+
+    def _emit(self, text: str, visible: List[str]) -> None:
+        if self.in_thinking:
+            self.thinking += text
+            return
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return
+            self._started = True
+        visible.append(text)
+
+
+def _partial_tag_length(text: str, tag: str) -> int:
+    """Length of the longest suffix of text that is a proper prefix of tag."""
+    for length in range(min(len(text), len(tag) - 1), 0, -1):
+        if text.endswith(tag[:length]):
+            return length
+    return 0
+
+def _response_cache_key(message: str, context: str = None) -> str:
+    return cache_key(SYSTEM_PROMPT, message, context_version(context), GROQ_MODEL, CHAT_TEMPERATURE)
+
+def _cached_reply(key: str, message: str, context: str = None):
+    """Exact-match cache first, then (if enabled) a paraphrase from the semantic cache."""
+    cached = llm_cache.get(key)
+    if cached is None and semantic_cache.enabled:
+        cached = semantic_cache.lookup(message, context_version(context))
+    return cached
+
+def _store_reply(key: str, message: str, context: str, reply: str) -> None:
+    llm_cache.put(key, reply)
+    if semantic_cache.enabled:
+        semantic_cache.add(message, context_version(context), reply)
+
+async def chat_with_claude(message: str, context: str = None, use_cache: bool = True, feature: str = "chat") -> str:
     """
     Chat with Llama 3.3 70B AI assistant about drought conditions and community resilience.
     Includes 'Extended Thinking' capability via Chain-of-Thought prompting.
@@ -69,6 +176,8 @@ async def chat_with_claude(message: str, context: str = None) -> str:
     Args:
         message: User's question or message
         context: Optional context data (e.g. current drought stats) to inform the response
+        use_cache: Serve and store the reply in the response caches (llm_cache.py, semantic_cache.py)
+        feature: LLM gateway feature the call is limited and metered under
 
     Returns:
         AI-generated response text (excluding thinking block by default, or including it if requested)
@@ -91,29 +200,25 @@ async def chat_with_claude(message: str, context: str = None) -> str:
             "has_context": bool(context)
         })
 
-        # Initialize client
-        client = _initialize_client()
-
-        # Construct message with context if available
-        full_message = message
-        if context:
-            full_message = f"""Context Data (Real-time System Metrics):
-{context}
+        # Same question against the same data: answer from the response cache
+        key = _response_cache_key(message, context) if use_cache else None
+        if key is not None:
+            cached = _cached_reply(key, message, context)
+            if cached is not None:
+                logger.info("Chat request served from cache", extra={"request_id": request_id})
+                return cached
 
-User Question:
-{message}"""
+        # Initialize client
+        client = _initialize_client() if feature == "chat" else llm_gateway.client_for(feature)
 
         # Make API call to Groq with timeout
         start_time = asyncio.get_event_loop().time()
         response = await asyncio.wait_for(
             client.chat.completions.create(
                 model=GROQ_MODEL,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": full_message}
-                ],
+                messages=_build_messages(message, context),
                 max_tokens=2048, # Increased for thinking block
-                temperature=0.7
+                temperature=CHAT_TEMPERATURE
             ),
             timeout=30.0  # Increased timeout for thinking
         )
@@ -143,6 +248,8 @@ User Question:
             "response_length": len(clean_content)
         })
 
+        if key is not None and clean_content:
+            _store_reply(key, message, context, clean_content)
         return clean_content
 
     except asyncio.TimeoutError:
@@ -158,14 +265,110 @@ User Question:
         # API failures and other errors
         error_msg = str(e)
         logger.error(f"Groq API Error: {error_msg}", extra={"request_id": request_id, "error": error_msg})
-        
-        # Check for specific error types
-        if "authentication" in error_msg.lower() or "invalid" in error_msg.lower() and "key" in error_msg.lower():
-            raise Exception("Invalid API key. Please check your GROQ_API_KEY configuration.")
-        elif "quota" in error_msg.lower() or "rate" in error_msg.lower():
-            raise Exception("API quota exceeded or rate limit reached. Please try again later.")
-        elif "overloaded" in error_msg.lower():
-            raise Exception("Groq API is currently overloaded. Please try again in a moment.")
-        else:
-            raise Exception(f"API request failed: {error_msg}")
+        raise _friendly_error(error_msg)
+
+
+async def stream_chat(message: str, context: str = None, use_cache: bool = True) -> AsyncIterator[str]:
+    """
+    Stream the assistant's visible reply as it is generated.
+
+    Same prompt as chat_with_claude, but Groq deltas are yielded as they
+    arrive with the <thinking> block filtered out incrementally, so the first
+    visible words reach the user without waiting for the chain of thought.
+
+    Shares chat_with_claude's response cache: a cached reply is yielded in
+    one piece, and a completed stream is stored for later requests.
+
+    Raises the same errors as chat_with_claude; a stall longer than
+    STREAM_IDLE_TIMEOUT between deltas raises a timeout error.
+    """
+    request_id = f"req_{int(asyncio.get_event_loop().time() * 1000)}"
+    if not message or not message.strip():
+        logger.warning("Empty message received", extra={"request_id": request_id})
+        raise ValueError("Message cannot be empty")
+
+    key = _response_cache_key(message, context) if use_cache else None
+    if key is not None:
+        cached = _cached_reply(key, message, context)
+        if cached is not None:
+            logger.info("Chat stream served from cache", extra={"request_id": request_id})
+            yield cached
+            return
+
+    client = _initialize_client()
+    start_time = asyncio.get_event_loop().time()
+    thinking_filter = ThinkingFilter()
+    first_token_at = None
+    reply = []
+    chunks = None
+
+    try:
+        stream = await asyncio.wait_for(
+            client.chat.completions.create(
+                model=GROQ_MODEL,
+                messages=_build_messages(message, context),
+                max_tokens=2048,
+                temperature=CHAT_TEMPERATURE,
+                stream=True
+            ),
+            timeout=STREAM_IDLE_TIMEOUT
+        )
+        chunks = stream.__aiter__()
+        while True:
+            try:
+                # Cancels the await in this task; wait_for would run __anext__ in another task and
+                # leave the generator unable to close cleanly once cancelled there
+                async with asyncio.timeout(STREAM_IDLE_TIMEOUT):
+                    chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                break
+            if not chunk.choices:
+                continue
+            visible = thinking_filter.feed(chunk.choices[0].delta.content or "")
+            if visible:
+                if first_token_at is None:
+                    first_token_at = asyncio.get_event_loop().time()
+                reply.append(visible)
+                yield visible
+
+        tail = thinking_filter.flush()
+        if tail:
+            reply.append(tail)
+            yield tail
+
+    except asyncio.TimeoutError:
+        logger.error("Groq API stream timeout", extra={"request_id": request_id})
+        raise Exception("Groq Llama 3.3 70B backend is taking longer than expected to respond. Please try again in a few seconds.")
+
+    except Exception as e:
+        error_msg = str(e)
+        logger.error(f"Groq API Error: {error_msg}", extra={"request_id": request_id, "error": error_msg})
+        raise _friendly_error(error_msg)
+
+    finally:
+        # Release the gateway's concurrency permits even if the client went away mid-stream
+        if chunks is not None and hasattr(chunks, "aclose"):
+            await chunks.aclose()
+
+    if key is not None and reply:
+        _store_reply(key, message, context, "".join(reply).rstrip())
+    if thinking_filter.thinking:
+        logger.debug("AI Thought Process", extra={"request_id": request_id, "thinking": thinking_filter.thinking.strip()})
+    logger.info("Chat stream completed", extra={
+        "request_id": request_id,
+        "duration": asyncio.get_event_loop().time() - start_time,
+        "first_token_latency": None if first_token_at is None else first_token_at - start_time
+    })
+
 
+def _friendly_error(error_msg: str) -> Exception:
+    """Map a Groq API error message to the user-facing exception."""
+    # Check for specific error types
+    if "authentication" in error_msg.lower() or "invalid" in error_msg.lower() and "key" in error_msg.lower():
+        return Exception("Invalid API key. Please check your GROQ_API_KEY configuration.")
+    elif "quota" in error_msg.lower() or "rate" in error_msg.lower():
+        return Exception("API quota exceeded or rate limit reached. Please try again later.")
+    elif "overloaded" in error_msg.lower():
+        return Exception("Groq API is currently overloaded. Please try again in a moment.")
+    else:
+        return Exception(f"API request failed: {error_msg}")
@@ -58,6 +58,10 @@ COMBINATION_RULES = ["any_1", "any_2", "any_3", "all"]
 # SendGrid API configuration (for email notifications)
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY", "")
 
+# Bearer token for /metrics and /api/internal/performance. When unset, those
+# endpoints answer only direct loopback clients (a scraper on the same host).
+INTERNAL_METRICS_TOKEN = os.getenv("INTERNAL_METRICS_TOKEN", "")
+
 # Database configuration
 DATABASE_PATH = os.path.join(
     os.path.dirname(__file__),
@@ -15,6 +15,10 @@ import os
 DB_PATH = os.path.join(os.path.dirname(__file__), "ckcias.db")
 
 
+# Connection usage counters for monitoring (connections are opened per use, there is no pool)
+db_stats = {"connections_opened": 0, "in_use": 0, "max_in_use": 0}
+
+
 @contextmanager
 def get_db_connection():
     """
@@ -23,6 +27,9 @@ def get_db_connection():
     """
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+    db_stats["connections_opened"] += 1
+    db_stats["in_use"] += 1
+    db_stats["max_in_use"] = max(db_stats["max_in_use"], db_stats["in_use"])
     try:
         yield conn
         conn.commit()
@@ -31,6 +38,7 @@ def get_db_connection():
         raise e
     finally:
         conn.close()
+        db_stats["in_use"] -= 1
 
 
 def init_database() -> None:
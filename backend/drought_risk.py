@@ -13,6 +13,8 @@ import logging
 import xml.etree.ElementTree as ET
 import urllib.parse
 
+from instrumentation import upstream_client
+
 # Load environment variables
 load_dotenv("../sidecar/.env")
 
@@ -37,7 +39,7 @@ async def fetch_openweather_data(location: str) -> Dict[str, Any]:
         Dict containing temperature, humidity, and rainfall data
     """
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with upstream_client("openweather", timeout=10.0) as client:
             # Fetch current weather
             current_url = f"{OPENWEATHER_BASE_URL}/weather"
             current_params = {
@@ -110,7 +112,7 @@ async def fetch_trc_flow_data(site_name: str = "Patea at Skinner Rd") -> Dict[st
         
         logger.info(f"Fetching TRC SOS data from: {url}")
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with upstream_client("trc-hilltop", timeout=30.0) as client:
             response = await client.get(url)
             
             if response.status_code == 200:
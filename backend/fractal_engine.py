@@ -1,15 +1,55 @@
 import asyncio
-import uuid
 import json
-from typing import List, Dict, Optional, Any
-from dataclasses import dataclass, field
+import re
+from array import array
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
 from enum import Enum
 import time
 from logger_config import logger
+from llm_cache import LLM_CACHE_TTL_SECONDS, cache_key
 
 # Placeholder for Groq client (will be injected or imported)
 # from groq import AsyncGroq 
 
+# Budget-bounded beam search defaults (voice needs an answer within ~2s)
+BEAM_WIDTH = 2
+SEARCH_DEADLINE_SECONDS = 1.5
+SEARCH_MAX_CALLS = 16
+EARLY_STOP_SCORE = 0.9
+
+# Critic scores are cached by thought content (see _score_key); bump to invalidate
+CRITIC_VERSION = "critic-v1"
+CRITIC_TEMPERATURE = 0.1
+CRITIC_CACHE_ENTRIES = 2048
+# A score in [0, 1]; skips list markers such as "1." or "2)"
+_SCORE = re.compile(r"(?<![\w.])(?:0?\.\d+|1(?:\.0+)?|0)(?![\w.)])")
+
+
+def _clamp_score(value) -> float:
+    return min(1.0, max(0.0, float(value)))
+
+
+def parse_scores(content: str, count: int) -> Optional[List[float]]:
+    """
+    Scores from a batched Critic reply: a JSON array of numbers (or of
+    {"score": n} objects), else exactly `count` bare 0-1 scores in the text.
+    Returns None when the reply does not hold `count` scores.
+    """
+    start = content.find('[')
+    end = content.rfind(']') + 1
+    if start != -1 and end > start:
+        try:
+            values = json.loads(content[start:end])
+            if isinstance(values, list) and len(values) == count:
+                return [_clamp_score(v["score"] if isinstance(v, dict) else v) for v in values]
+        except (ValueError, TypeError, KeyError):
+            pass
+    numbers = _SCORE.findall(content)
+    if len(numbers) == count:
+        return [_clamp_score(n) for n in numbers]
+    return None
+
 class NodeStatus(Enum):
     PENDING = "pending"
     EXPLORING = "exploring"
@@ -17,25 +57,180 @@ class NodeStatus(Enum):
     PRUNED = "pruned"
     SELECTED = "selected"
 
-@dataclass
+_STATUSES = list(NodeStatus)
+_STATUS_INDEX = {status: i for i, status in enumerate(_STATUSES)}
+NO_PARENT = -1
+
+
+class FractalTree:
+    """
+    Node storage as parallel arrays indexed by integer node ID.
+
+    Tracks which nodes were added or re-scored since the last delta(), so
+    the client can be sent only what changed rather than the whole tree.
+    """
+
+    __slots__ = ("content", "parent", "depth", "score", "status", "children", "_dirty", "_sent")
+
+    def __init__(self):
+        self.content: List[str] = []
+        self.parent = array("i")
+        self.depth = array("H")
+        self.score = array("d")
+        self.status = array("B")
+        self.children: List[List[int]] = []
+        self._dirty: Set[int] = set()
+        self._sent = 0
+
+    def __len__(self) -> int:
+        return len(self.content)
+
+    def __contains__(self, node_id) -> bool:
+        return isinstance(node_id, int) and 0 <= node_id < len(self.content)
+
+    def __getitem__(self, node_id: int) -> "FractalNode":
+        if node_id not in self:
+            raise KeyError(node_id)
+        return FractalNode(self, node_id)
+
+    def get(self, node_id: Optional[int]) -> Optional["FractalNode"]:
+        return FractalNode(self, node_id) if node_id in self else None
+
+    def add(self, content: str, parent: int = NO_PARENT) -> "FractalNode":
+        node_id = len(self.content)
+        self.content.append(content)
+        self.parent.append(parent)
+        self.depth.append(0 if parent == NO_PARENT else self.depth[parent] + 1)
+        self.score.append(0.0)
+        self.status.append(_STATUS_INDEX[NodeStatus.PENDING])
+        self.children.append([])
+        if parent != NO_PARENT:
+            self.children[parent].append(node_id)
+        return FractalNode(self, node_id)
+
+    def mark(self, node_id: int) -> None:
+        """Records a change to a node the client already has."""
+        if node_id < self._sent:
+            self._dirty.add(node_id)
+
+    def delta(self) -> Dict[str, List[list]]:
+        """
+        Nodes added since the last call, as [id, parent, score, status, content],
+        and nodes re-scored or re-statused, as [id, score, status].
+        """
+        added = [
+            [i, self.parent[i], round(self.score[i], 3), _STATUSES[self.status[i]].value, self.content[i]]
+            for i in range(self._sent, len(self.content))
+        ]
+        changed = [
+            [i, round(self.score[i], 3), _STATUSES[self.status[i]].value] for i in sorted(self._dirty)
+        ]
+        self._sent = len(self.content)
+        self._dirty.clear()
+        return {"added": added, "changed": changed}
+
+
 class FractalNode:
-    content: str
-    parent_id: Optional[str] = None
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
-    children: List['FractalNode'] = field(default_factory=list)
-    score: float = 0.0
-    status: NodeStatus = NodeStatus.PENDING
-    metadata: Dict[str, Any] = field(default_factory=dict)
-    depth: int = 0
+    """Slotted handle to one node of a FractalTree."""
+
+    __slots__ = ("_tree", "id")
+
+    def __init__(self, tree: FractalTree, node_id: int):
+        self._tree = tree
+        self.id = node_id
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FractalNode) and other._tree is self._tree and other.id == self.id
+
+    def __hash__(self) -> int:
+        return hash((id(self._tree), self.id))
+
+    @property
+    def content(self) -> str:
+        return self._tree.content[self.id]
+
+    @property
+    def parent_id(self) -> Optional[int]:
+        parent = self._tree.parent[self.id]
+        return None if parent == NO_PARENT else parent
+
+    @property
+    def depth(self) -> int:
+        return self._tree.depth[self.id]
+
+    @property
+    def children(self) -> List["FractalNode"]:
+        return [FractalNode(self._tree, child) for child in self._tree.children[self.id]]
+
+    @property
+    def score(self) -> float:
+        return self._tree.score[self.id]
+
+    @score.setter
+    def score(self, value: float) -> None:
+        if self._tree.score[self.id] != value:
+            self._tree.score[self.id] = value
+            self._tree.mark(self.id)
+
+    @property
+    def status(self) -> NodeStatus:
+        return _STATUSES[self._tree.status[self.id]]
+
+    @status.setter
+    def status(self, value: NodeStatus) -> None:
+        index = _STATUS_INDEX[value]
+        if self._tree.status[self.id] != index:
+            self._tree.status[self.id] = index
+            self._tree.mark(self.id)
+
+class CriticScoreCache:
+    """
+    In-memory LRU + TTL cache of Critic scores.
+
+    Kept apart from llm_cache so scoring neither counts towards the chat
+    hit rate nor writes to SQLite from the search loop.
+    """
+
+    def __init__(self, max_entries: int = CRITIC_CACHE_ENTRIES, ttl: float = LLM_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (created_at, score)
+        self._entries: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[float]:
+        entry = self._entries.get(key)
+        if entry is None or time.time() - entry[0] > self.ttl:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, score: float) -> None:
+        self._entries[key] = (time.time(), score)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
 
 class FractalEngine:
-    def __init__(self, groq_client, model="llama-3.3-70b-versatile"):
+    def __init__(self, groq_client, model="llama-3.3-70b-versatile", score_cache: Optional[CriticScoreCache] = None):
         self.groq_client = groq_client
         self.model = model
-        self.nodes: Dict[str, FractalNode] = {}
-        self.root_id: Optional[str] = None
+        # Shared across engines, since identical hypotheses recur between sessions
+        self.score_cache = critic_score_cache if score_cache is None else score_cache
+        self.nodes = FractalTree()
+        self.root_id: Optional[int] = None
         self.max_depth = 3
         self.branch_factor = 3
+        self.llm_calls = 0
 
     def _sanitize_input(self, text: str) -> str:
         """Basic sanitization to prevent prompt injection."""
@@ -47,12 +242,11 @@ class FractalEngine:
     def create_root(self, initial_query: str) -> FractalNode:
         sanitized_query = self._sanitize_input(initial_query)
         logger.info(f"Creating root node with query: {sanitized_query}")
-        root = FractalNode(content=sanitized_query, depth=0)
-        self.nodes[root.id] = root
+        root = self.nodes.add(sanitized_query)
         self.root_id = root.id
         return root
 
-    async def expand_node(self, node_id: str):
+    async def expand_node(self, node_id: int):
         """Spawns child nodes (hypotheses/branches) from a given node."""
         node = self.nodes.get(node_id)
         if not node or node.depth >= self.max_depth:
@@ -75,6 +269,7 @@ class FractalEngine:
         """
 
         try:
+            self.llm_calls += 1
             completion = await self.groq_client.chat.completions.create(
                 model=self.model,
                 messages=[{"role": "system", "content": prompt}],
@@ -97,16 +292,11 @@ class FractalEngine:
                 logger.error(f"JSON parse error in expand_node: {parse_err}")
                 branches = [content]
 
-            for branch_text in branches:
+            # Search budgets assume at most branch_factor evaluations per expansion
+            for branch_text in branches[:self.branch_factor]:
                 # Sanitize branch text as well
                 clean_branch = self._sanitize_input(str(branch_text))
-                child = FractalNode(
-                    content=clean_branch,
-                    parent_id=node.id,
-                    depth=node.depth + 1
-                )
-                self.nodes[child.id] = child
-                node.children.append(child)
+                self.nodes.add(clean_branch, parent=node.id)
             
             node.status = NodeStatus.EVALUATED # Mark as expanded (children created)
             logger.info(f"Node {node_id} expanded into {len(node.children)} children")
@@ -115,10 +305,12 @@ class FractalEngine:
             logger.error(f"Error expanding node {node_id}: {e}", exc_info=True)
             node.status = NodeStatus.PENDING # Retry later?
 
-    async def evaluate_node(self, node_id: str):
+    async def evaluate_node(self, node_id: int):
         """Scores a node using the 'Critic' (Constitutional Validator)."""
         node = self.nodes.get(node_id)
         if not node: return
+        if self._cached_score(node):
+            return
 
         # Prompt for the "Critic" worker
         # SECURITY: Use delimiters
@@ -134,6 +326,7 @@ class FractalEngine:
         """
 
         try:
+            self.llm_calls += 1
             completion = await self.groq_client.chat.completions.create(
                 model=self.model,
                 messages=[{"role": "system", "content": prompt}],
@@ -143,7 +336,8 @@ class FractalEngine:
             
             score_text = completion.choices[0].message.content.strip()
             try:
-                node.score = float(score_text)
+                node.score = _clamp_score(score_text)
+                self._store_score(node)
             except:
                 logger.warning(f"Invalid score returned for node {node_id}: {score_text}")
                 node.score = 0.5 # Default neutral
@@ -154,17 +348,141 @@ class FractalEngine:
         except Exception as e:
             logger.error(f"Error evaluating node {node_id}: {e}", exc_info=True)
 
-    async def run_step(self, node_id: str):
+    def _score_key(self, content: str) -> str:
+        return cache_key(CRITIC_VERSION, content, "", self.model, CRITIC_TEMPERATURE)
+
+    def _cached_score(self, node: FractalNode) -> bool:
+        cached = self.score_cache.get(self._score_key(node.content))
+        if cached is None:
+            return False
+        node.score = cached
+        node.status = NodeStatus.EVALUATED
+        return True
+
+    def _store_score(self, node: FractalNode) -> None:
+        self.score_cache.put(self._score_key(node.content), node.score)
+
+    async def evaluate_children(self, node_id: int):
+        """Scores all children of a node with one batched 'Critic' call, falling back to per-node calls."""
+        node = self.nodes.get(node_id)
+        if not node: return
+
+        pending = [child for child in node.children if not self._cached_score(child)]
+        if len(pending) <= 1:
+            await asyncio.gather(*[self.evaluate_node(child.id) for child in pending])
+            return
+
+        # SECURITY: Use delimiters
+        thoughts = "\n".join(f'{i}. """{child.content}"""' for i, child in enumerate(pending, 1))
+        prompt = f"""
+        You are the CONSTITUTIONAL VALIDATOR (Critic).
+        Evaluate each thought against the 5 Yamas (Ahimsa, Satya, Asteya, Brahmacharya, Aparigraha).
+        
+        Thoughts:
+        {thoughts}
+        
+        Output ONLY a JSON array of {len(pending)} float scores between 0.0 (Violation) and 1.0 (Perfect Alignment), one per thought, in order.
+        Example: [0.8, 0.35, 0.6]
+        """
+
+        scores = None
+        try:
+            self.llm_calls += 1
+            completion = await self.groq_client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "system", "content": prompt}],
+                temperature=CRITIC_TEMPERATURE,
+                max_tokens=8 * len(pending) + 16
+            )
+            content = completion.choices[0].message.content
+            scores = parse_scores(content, len(pending))
+            if scores is None:
+                logger.warning(f"Unparseable batched Critic output for node {node_id}: {content[:50]}...")
+        except Exception as e:
+            logger.error(f"Error batch-evaluating children of node {node_id}: {e}", exc_info=True)
+
+        if scores is None:
+            # Fall back to one Critic call per child
+            await asyncio.gather(*[self.evaluate_node(child.id) for child in pending])
+            return
+
+        for child, score in zip(pending, scores):
+            child.score = score
+            child.status = NodeStatus.EVALUATED
+            self._store_score(child)
+        logger.debug(f"Children of node {node_id} evaluated in one call: {scores}")
+
+    async def run_step(self, node_id: int):
         """Runs one step of expansion and evaluation."""
         await self.expand_node(node_id)
         node = self.nodes.get(node_id)
         if node:
-            # Evaluate all children in parallel
-            await asyncio.gather(*[self.evaluate_node(child.id) for child in node.children])
+            # Evaluate all children in one batched Critic call
+            await self.evaluate_children(node_id)
+
+    async def search(self, root_id: Optional[int] = None, beam_width: int = BEAM_WIDTH,
+                     deadline: float = SEARCH_DEADLINE_SECONDS, max_calls: int = SEARCH_MAX_CALLS,
+                     early_stop_score: float = EARLY_STOP_SCORE,
+                     on_update: Optional[Callable[[], Awaitable[None]]] = None) -> List[FractalNode]:
+        """
+        Beam search: expands the top `beam_width` frontier nodes concurrently,
+        level by level, until the deadline (seconds), the LLM call budget or
+        max_depth runs out. Stops early once a level scores at least
+        `early_stop_score` or fails to improve on the previous level.
+
+        Cancelling the search (e.g. on barge-in) cancels every outstanding
+        LLM call. `on_update` is awaited after each level, e.g. to stream
+        to_delta() to the client. Returns the best path found so far.
+        """
+        loop = asyncio.get_running_loop()
+        ends_at = loop.time() + deadline
+        frontier = [self.nodes[self.root_id if root_id is None else root_id]]
+        best_score = None
+
+        while frontier:
+            # A step costs one expansion and one batched evaluation, plus one call per child if the batch fails
+            affordable = max(0, (max_calls - self.llm_calls) // (2 + self.branch_factor))
+            frontier = [node for node in frontier if node.depth < self.max_depth][:affordable]
+            remaining = ends_at - loop.time()
+            if not frontier or remaining <= 0:
+                break
+
+            steps = [asyncio.create_task(self.run_step(node.id)) for node in frontier]
+            try:
+                _, pending = await asyncio.wait(steps, timeout=remaining)
+            finally:
+                for step in steps:
+                    step.cancel()
+                await asyncio.gather(*steps, return_exceptions=True)
+
+            children = sorted(
+                (child for node in frontier for child in node.children if child.status == NodeStatus.EVALUATED),
+                key=lambda n: n.score, reverse=True
+            )
+            for pruned in children[beam_width:]:
+                pruned.status = NodeStatus.PRUNED
+            if on_update is not None:
+                await on_update()
+            if pending:
+                logger.info(f"Fractal search hit its {deadline}s deadline after {self.llm_calls} calls")
+                break
+            if not children:
+                break
+
+            level_best = children[0].score
+            if level_best >= early_stop_score or (best_score is not None and level_best <= best_score):
+                break
+            best_score = level_best
+            frontier = children[:beam_width]
+
+        path = self.get_best_path()
+        for node in path:
+            node.status = NodeStatus.SELECTED
+        return path
 
     def get_best_path(self) -> List[FractalNode]:
         """Traverses the tree to find the highest scoring path."""
-        if not self.root_id: return []
+        if self.root_id is None: return []
         
         path = []
         current = self.nodes[self.root_id]
@@ -178,8 +496,12 @@ class FractalEngine:
             
         return path
 
+    def to_delta(self) -> Dict[str, List[list]]:
+        """Nodes added or changed since the previous call (the first call sends the whole tree)."""
+        return self.nodes.delta()
+
     def to_json(self):
-        """Serializes the tree for visualization."""
+        """Serializes the full tree for visualization."""
         # Recursive serialization helper
         def serialize(node):
             return {
@@ -190,6 +512,10 @@ class FractalEngine:
                 "children": [serialize(child) for child in node.children]
             }
         
-        if self.root_id:
+        if self.root_id is not None:
             return serialize(self.nodes[self.root_id])
         return {}
+
+
+# Global instance
+critic_score_cache = CriticScoreCache()
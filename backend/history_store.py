@@ -0,0 +1,262 @@
+"""
+Open-Meteo History Store for CKCIAS Drought Monitor
+Per-coordinate-cell daily arrays with incremental upstream fetching
+
+Requests are snapped to a grid cell (about the resolution of the Open-Meteo
+model grid). Each cell keeps contiguous daily arrays of temperature, rainfall
+and soil moisture. Days older than MUTABLE_DAYS are immutable once fetched, so
+a warm cell only asks Open-Meteo for the unsettled tail (today/yesterday) at
+most once per TAIL_TTL_SECONDS, plus any day that has rolled over since. A
+wider window than the cell holds fetches only the missing older days.
+"""
+
+import asyncio
+import math
+import time
+from array import array
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from logger_config import logger
+from instrumentation import upstream_client
+
+try:
+    from zoneinfo import ZoneInfo
+    NZ_TZ = ZoneInfo("Pacific/Auckland")
+except Exception:
+    # zoneinfo without tzdata (e.g. bare Windows installs) - NZST is close enough for day boundaries
+    NZ_TZ = timezone(timedelta(hours=12))
+
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+DAILY_FIELDS = ("temperature_2m_mean", "precipitation_sum", "soil_moisture_0_to_7cm_mean")
+
+CELL_SIZE_DEG = 0.1        # ~11 km, matches the Open-Meteo grid spacing over NZ
+MAX_PAST_DAYS = 92         # Open-Meteo forecast API limit for past data
+MUTABLE_DAYS = 2           # today and yesterday can still be revised upstream
+TAIL_TTL_SECONDS = 3600    # how often the mutable tail is refreshed
+MAX_CELLS = 512            # LRU bound on cached cells
+
+# (label, temperature, rainfall, soil_moisture); None where upstream had no value
+DailyRow = Tuple[str, Optional[float], Optional[float], Optional[float]]
+
+
+def snap_to_cell(lat: float, lon: float, cell_size: float = CELL_SIZE_DEG) -> Tuple[float, float]:
+    """Snap coordinates to the centre of their grid cell."""
+    return (
+        round(round(lat / cell_size) * cell_size, 4),
+        round(round(lon / cell_size) * cell_size, 4)
+    )
+
+
+def nz_today() -> date:
+    """Current date in New Zealand (the timezone Open-Meteo is queried in)."""
+    return datetime.now(NZ_TZ).date()
+
+
+@lru_cache(maxsize=1024)
+def day_label(ordinal: int) -> str:
+    """Short chart label ("20 Nov") for a date ordinal."""
+    return date.fromordinal(ordinal).strftime("%d %b")
+
+
+def _to_array(values: list) -> array:
+    return array("d", [math.nan if v is None else v for v in values])
+
+
+def _from_float(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+class CellHistory:
+    """Contiguous daily arrays for one grid cell."""
+
+    __slots__ = ("start", "temps", "rain", "soil", "settled_until", "tail_fetched_at")
+
+    def __init__(self):
+        self.start: Optional[int] = None      # date ordinal of index 0
+        self.temps = array("d")
+        self.rain = array("d")
+        self.soil = array("d")
+        self.settled_until = -1               # last ordinal that will not change upstream
+        self.tail_fetched_at = 0.0            # monotonic time of the last fetch reaching today
+
+    @property
+    def end(self) -> int:
+        return (self.start or 0) + len(self.temps) - 1
+
+    def merge(self, first: int, temps: array, rain: array, soil: array) -> None:
+        """Overlay a contiguous upstream block starting at ordinal `first`."""
+        last = first + len(temps) - 1
+        if self.start is None or first > self.end + 1 or last < self.start - 1:
+            # Disjoint from what we hold - start over rather than keep an unfetched gap
+            self.start = first
+            self.temps, self.rain, self.soil = temps, rain, soil
+            return
+
+        new_start = min(self.start, first)
+        new_end = max(self.end, last)
+        size = new_end - new_start + 1
+        for name, block in (("temps", temps), ("rain", rain), ("soil", soil)):
+            merged = array("d", [math.nan]) * size
+            old = getattr(self, name)
+            offset = self.start - new_start
+            merged[offset:offset + len(old)] = old
+            offset = first - new_start
+            merged[offset:offset + len(block)] = block
+            setattr(self, name, merged)
+        self.start = new_start
+
+    def trim(self, oldest: int) -> None:
+        """Drop days older than `oldest`."""
+        if self.start is not None and oldest > self.start:
+            cut = oldest - self.start
+            self.temps = self.temps[cut:]
+            self.rain = self.rain[cut:]
+            self.soil = self.soil[cut:]
+            self.start = oldest
+
+    def rows(self, first: int, last: int) -> List[DailyRow]:
+        lo = max(first, self.start) - self.start
+        hi = min(last, self.end) - self.start
+        return [
+            (
+                day_label(self.start + i),
+                _from_float(self.temps[i]),
+                _from_float(self.rain[i]),
+                _from_float(self.soil[i])
+            )
+            for i in range(lo, hi + 1)
+        ]
+
+
+class HistoryStore:
+    """
+    Cache of Open-Meteo daily history keyed by grid cell.
+
+    Usage:
+        rows = await history_store.get_daily(lat, lon, days=90)
+    """
+
+    def __init__(self, cell_size: float = CELL_SIZE_DEG, max_cells: int = MAX_CELLS,
+                 tail_ttl: float = TAIL_TTL_SECONDS):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.tail_ttl = tail_ttl
+        self._cells: "OrderedDict[Tuple[float, float], CellHistory]" = OrderedDict()
+        self._locks: Dict[Tuple[float, float], asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.upstream_days = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and cache size for monitoring."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "upstream_days": self.upstream_days,
+            "cells": len(self._cells)
+        }
+
+    def _cell(self, key: Tuple[float, float]) -> CellHistory:
+        cell = self._cells.get(key)
+        if cell is None:
+            cell = self._cells[key] = CellHistory()
+            while len(self._cells) > self.max_cells:
+                evicted, _ = self._cells.popitem(last=False)
+                self._locks.pop(evicted, None)
+        else:
+            self._cells.move_to_end(key)
+        return cell
+
+    def _fetch_ranges(self, cell: CellHistory, first: int, today: int) -> List[Tuple[int, int]]:
+        """
+        (first, last) ordinal ranges that must come from upstream: days older
+        than the cell holds, then the unsettled or missing tail. Empty if the
+        cell can serve the window.
+        """
+        if cell.start is None:
+            return [(first, today)]
+        ranges = []
+        if first < cell.start:
+            ranges.append((first, cell.start - 1))
+        tail_stale = time.monotonic() - cell.tail_fetched_at > self.tail_ttl
+        if cell.end < today or (cell.settled_until < today and tail_stale):
+            ranges.append((max(first, cell.settled_until + 1), today))
+        return ranges
+
+    async def get_daily(self, lat: float, lon: float, days: int = 90) -> List[DailyRow]:
+        """
+        Daily rows for the past `days` days plus today, oldest first.
+
+        Raises:
+            ValueError: If `days` is outside 1..MAX_PAST_DAYS
+            httpx.HTTPError: If upstream fails and the cell has nothing to serve
+        """
+        if days < 1 or days > MAX_PAST_DAYS:
+            raise ValueError(f"days must be between 1 and {MAX_PAST_DAYS}")
+
+        key = snap_to_cell(lat, lon, self.cell_size)
+        today = nz_today().toordinal()
+        first = today - days
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            cell = self._cell(key)
+            ranges = self._fetch_ranges(cell, first, today)
+            if not ranges:
+                self.hits += 1
+            else:
+                self.misses += 1
+                for range_first, range_last in ranges:
+                    try:
+                        await self._fetch_into(cell, key, range_first, range_last, today)
+                    except Exception as e:
+                        if cell.start is None:
+                            raise
+                        logger.warning(f"Open-Meteo refresh failed for cell {key}, serving cached days: {e}")
+                cell.trim(today - MAX_PAST_DAYS)
+
+            if cell.start is None:
+                return []
+            return cell.rows(first, today)
+
+    async def _fetch_into(self, cell: CellHistory, key: Tuple[float, float], first: int, last: int,
+                          today: int) -> None:
+        params = {
+            "latitude": key[0],
+            "longitude": key[1],
+            "start_date": date.fromordinal(first).isoformat(),
+            "end_date": date.fromordinal(last).isoformat(),
+            "daily": ",".join(DAILY_FIELDS),
+            "timezone": "Pacific/Auckland"
+        }
+        async with upstream_client("open-meteo", timeout=10.0) as client:
+            response = await client.get(OPEN_METEO_URL, params=params)
+            response.raise_for_status()
+            daily = response.json().get("daily", {})
+
+        dates = daily.get("time", [])
+        if not dates:
+            return
+
+        # Open-Meteo returns a contiguous daily range, so only the first date needs parsing
+        block_start = date.fromisoformat(dates[0]).toordinal()
+        n = len(dates)
+        cell.merge(
+            block_start,
+            _to_array(daily.get(DAILY_FIELDS[0], [None] * n)),
+            _to_array(daily.get(DAILY_FIELDS[1], [None] * n)),
+            _to_array(daily.get(DAILY_FIELDS[2], [None] * n))
+        )
+        self.upstream_days += n
+
+        block_end = block_start + n - 1
+        cell.settled_until = max(cell.settled_until, min(block_end, today - MUTABLE_DAYS))
+        if block_end >= today:
+            cell.tail_fetched_at = time.monotonic()
+
+
+# Global instance
+history_store = HistoryStore()
@@ -0,0 +1,198 @@
+"""
+HTTP Caching Middleware for CKCIAS Drought Monitor
+Strong ETags, Last-Modified and per-endpoint Cache-Control on public GET endpoints
+
+Every successful GET under /api/public/ gets a strong ETag computed from the
+response body. A matching If-None-Match (or an If-Modified-Since no older than
+the representation) is answered with a bodyless 304, so dashboard polls that
+find nothing new cost a few hundred bytes instead of the full payload. HEAD
+responses carry no body to hash, so they only get Cache-Control (plus any
+validator the endpoint set itself).
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Iterable, List, Tuple
+
+PUBLIC_PREFIX = "/api/public/"
+
+# (max-age, stale-while-revalidate) in seconds, longest matching prefix wins.
+# Tuned to how often each upstream actually changes.
+CACHE_POLICIES: Dict[str, Tuple[int, int]] = {
+    "/api/public/drought-risk": (60, 300),
+    "/api/public/forecast-trend": (600, 1800),
+    "/api/public/history": (1800, 3600),
+    "/api/public/news-headlines": (300, 900),
+    "/api/public/council-alerts": (300, 900),
+    "/api/public/data-sources": (300, 3600),
+    "/api/public/weather-narrative": (600, 1800),
+    "/api/public/hilltop/sites": (3600, 86400),
+    "/api/public/hilltop/measurements": (3600, 86400),
+    "/api/public/hilltop/data": (300, 900),
+}
+DEFAULT_POLICY = (0, 60)
+
+MAX_TRACKED_ETAGS = 2048
+
+# ETag suffixes added for content-coded representations by response_compression.py
+CODING_SUFFIXES = ('-br"', '-zstd"', '-gzip"')
+
+# 304 vs full-response counters for monitoring
+conditional_stats = {"not_modified": 0, "full_responses": 0}
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag for a response body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def cache_control_for(path: str) -> str:
+    """Cache-Control header value for a public endpoint path."""
+    best = ""
+    for prefix in CACHE_POLICIES:
+        if path.startswith(prefix) and len(prefix) > len(best):
+            best = prefix
+    max_age, swr = CACHE_POLICIES.get(best, DEFAULT_POLICY)
+    if max_age == 0:
+        return f"no-cache, stale-while-revalidate={swr}"
+    return f"public, max-age={max_age}, stale-while-revalidate={swr}"
+
+
+def representation_etag(etag: str, coding: str) -> str:
+    """ETag of a content-coded representation, e.g. '"abc"' -> '"abc-br"'."""
+    if etag.endswith('"'):
+        return f'{etag[:-1]}-{coding}"'
+    return etag
+
+
+def parse_etags(header: str) -> List[str]:
+    """
+    Split an If-None-Match header into opaque tags.
+
+    Weak prefixes and content-coding suffixes (see `representation_etag`)
+    are dropped, so a client holding the Brotli variant still revalidates.
+    """
+    tags = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        for suffix in CODING_SUFFIXES:
+            if tag.endswith(suffix):
+                tag = tag[:-len(suffix)] + '"'
+                break
+        if tag:
+            tags.append(tag)
+    return tags
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison, as required for If-None-Match."""
+    tags = parse_etags(if_none_match)
+    return "*" in tags or etag in tags
+
+
+class ConditionalGetMiddleware:
+    """
+    ASGI middleware adding validators and 304 handling to public GET endpoints.
+
+    Usage:
+        app.add_middleware(ConditionalGetMiddleware)
+    """
+
+    def __init__(self, app, prefix: str = PUBLIC_PREFIX):
+        self.app = app
+        self.prefix = prefix
+        # ETag -> unix time the representation was first served, for Last-Modified
+        self._first_seen: "OrderedDict[str, float]" = OrderedDict()
+
+    def _last_modified(self, etag: str) -> float:
+        first_seen = self._first_seen.get(etag)
+        if first_seen is None:
+            first_seen = self._first_seen[etag] = time.time()
+            while len(self._first_seen) > MAX_TRACKED_ETAGS:
+                self._first_seen.popitem(last=False)
+        else:
+            self._first_seen.move_to_end(etag)
+        return first_seen
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] not in ("GET", "HEAD")
+                or not scope["path"].startswith(self.prefix)):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        start_message = None
+        chunks = []
+
+        async def buffer(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            else:
+                await send(message)
+
+        await self.app(scope, receive, buffer)
+        if start_message is None:
+            return
+
+        body = b"".join(chunks)
+        if start_message["status"] != 200:
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        headers = [(k, v) for k, v in start_message["headers"]]
+        names = {k.lower() for k, _ in headers}
+        if b"cache-control" not in names:
+            headers.append((b"cache-control", cache_control_for(scope["path"]).encode("latin-1")))
+        etag = next((v.decode("latin-1") for k, v in headers if k.lower() == b"etag"), None)
+        if etag is None and scope["method"] == "HEAD":
+            # A hash of the empty HEAD body would never match the GET representation
+            await send({"type": "http.response.start", "status": 200, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+        if etag is None:
+            etag = compute_etag(body)
+            headers.append((b"etag", etag.encode("latin-1")))
+        last_modified = self._last_modified(etag)
+        if b"last-modified" not in names:
+            headers.append((b"last-modified", formatdate(last_modified, usegmt=True).encode("latin-1")))
+
+        if self._is_not_modified(request_headers, etag, last_modified):
+            conditional_stats["not_modified"] += 1
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": _without(headers, (b"content-length", b"content-type"))
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        conditional_stats["full_responses"] += 1
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    def _is_not_modified(request_headers: Dict[bytes, bytes], etag: str, last_modified: float) -> bool:
+        if_none_match = request_headers.get(b"if-none-match")
+        if if_none_match is not None:
+            return etag_matches(if_none_match.decode("latin-1"), etag)
+
+        if_modified_since = request_headers.get(b"if-modified-since")
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since.decode("latin-1")).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(last_modified) <= since
+        return False
+
+
+def _without(headers: Iterable[Tuple[bytes, bytes]], names: Tuple[bytes, ...]) -> List[Tuple[bytes, bytes]]:
+    return [(k, v) for k, v in headers if k.lower() not in names]
@@ -0,0 +1,176 @@
+"""
+Request Instrumentation for CKCIAS Drought Monitor
+Feeds inbound request and outbound upstream timings into the bottleneck optimizer
+
+BellmanBottleneckOptimizer ranks endpoints by latency and failure rate, but
+only from what is recorded into it. Two recorders feed the global optimizer:
+
+- InstrumentationMiddleware times every HTTP request, labelled by method and
+  route template ("GET /api/public/history", not the concrete URL, so query
+  strings and path parameters do not multiply the series), with the status
+  and the number of body bytes sent. Requests matching no route share the
+  label "<METHOD> unmatched".
+- InstrumentedTransport wraps the httpx transport of an outbound client and
+  records each upstream call as "upstream:<dependency>". Calls that do not
+  go through httpx (SendGrid) use track_dependency instead.
+
+A 5xx status or an exception counts as a failure. Streaming responses are
+timed until their last body chunk, except Server-Sent Events streams, which
+stay open for the whole subscription and are timed to their first body
+chunk instead. WebSocket sessions are long-lived and are not timed here (the
+relays report relay_stats instead).
+
+Usage:
+    app.add_middleware(InstrumentationMiddleware)
+    async with upstream_client("open-meteo", timeout=10.0) as client:
+        response = await client.get(OPEN_METEO_URL, params=params)
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import httpx
+
+from bottleneck_optimizer import BellmanBottleneckOptimizer, get_optimizer
+
+
+def route_prefix(scope, route) -> str:
+    """
+    Prefix of an included router or mount in front of a matched route.
+
+    route.path is relative to its router, so the prefix is the part of the
+    concrete path in front of the first tail the route's regex matches
+    (root_path when the server already stripped it from the path).
+    """
+    path = scope.get("path", "")
+    regex = getattr(route, "path_regex", None)
+    if regex is not None:
+        for i, char in enumerate(path):
+            if char == "/" and regex.match(path[i:]):
+                if i:
+                    return path[:i]
+                break
+    root_path = scope.get("root_path", "")
+    return "" if path.startswith(root_path) else root_path
+
+
+def route_label(scope) -> str:
+    """Optimizer label for a request: method plus the full matched route template."""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return f"{scope.get('method', 'GET')} unmatched"
+    return f"{scope.get('method', 'GET')} {route_prefix(scope, route)}{template}"
+
+
+def is_event_stream(headers) -> bool:
+    """Whether raw ASGI response headers declare a text/event-stream body."""
+    for name, value in headers:
+        if name.lower() == b"content-type":
+            return value.split(b";")[0].strip().lower() == b"text/event-stream"
+    return False
+
+
+def dependency_label(dependency: str) -> str:
+    return f"upstream:{dependency}"
+
+
+class InstrumentationMiddleware:
+    """
+    ASGI middleware recording route, status, latency and response bytes.
+
+    Usage:
+        app.add_middleware(InstrumentationMiddleware)
+    """
+
+    def __init__(self, app, optimizer: Optional[BellmanBottleneckOptimizer] = None):
+        self.app = app
+        self.optimizer = optimizer or get_optimizer()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        # An exception before the response starts is recorded as a 500
+        status = 500
+        sent = 0
+        event_stream = False
+        first_byte: Optional[float] = None
+
+        async def send_wrapper(message):
+            nonlocal status, sent, event_stream, first_byte
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                event_stream = is_event_stream(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+                if first_byte is None:
+                    first_byte = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end = first_byte if event_stream and first_byte is not None else time.perf_counter()
+            latency = (end - start) * 1000
+            self.optimizer.record_call(route_label(scope), latency, status < 500,
+                                       status=status, response_bytes=sent)
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport recording every request it sends under one dependency label.
+
+    Latency runs until the response headers arrive; the size is taken from
+    Content-Length when the upstream sends one.
+    """
+
+    def __init__(self, dependency: str, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 optimizer: Optional[BellmanBottleneckOptimizer] = None, **transport_kwargs):
+        self.label = dependency_label(dependency)
+        self._transport = transport or httpx.AsyncHTTPTransport(**transport_kwargs)
+        self.optimizer = optimizer or get_optimizer()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception:
+            self.optimizer.record_call(self.label, (time.perf_counter() - start) * 1000, False)
+            raise
+        size = response.headers.get("content-length", "")
+        self.optimizer.record_call(self.label, (time.perf_counter() - start) * 1000,
+                                   response.status_code < 500, status=response.status_code,
+                                   response_bytes=int(size) if size.isdigit() else 0)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def upstream_client(dependency: str, limits: Optional[httpx.Limits] = None, **client_kwargs) -> httpx.AsyncClient:
+    """httpx.AsyncClient whose requests are recorded as `upstream:<dependency>`."""
+    transport_kwargs = {"limits": limits} if limits is not None else {}
+    return httpx.AsyncClient(transport=InstrumentedTransport(dependency, **transport_kwargs), **client_kwargs)
+
+
+@contextmanager
+def track_dependency(dependency: str, optimizer: Optional[BellmanBottleneckOptimizer] = None):
+    """
+    Records a non-httpx upstream call; an exception counts as a failure.
+
+    Usage:
+        with track_dependency("sendgrid"):
+            response = sg.send(message)
+    """
+    optimizer = optimizer or get_optimizer()
+    start = time.perf_counter()
+    success = False
+    try:
+        yield
+        success = True
+    finally:
+        optimizer.record_call(dependency_label(dependency), (time.perf_counter() - start) * 1000, success)
@@ -0,0 +1,254 @@
+"""
+Streaming Latency Histograms for the Bottleneck Optimizer
+Fixed-memory, log-bucketed (HDR-style) histograms with 1m / 5m / 1h windows
+
+The optimizer used to keep the last 100 latencies per endpoint in a list and
+sort it for every p95, which hid real tail latency behind a tiny sample.
+Each endpoint now keeps counts in log-linear buckets instead:
+
+- latencies are recorded in microseconds; values below 2 * SUB_BUCKETS us
+  get a bucket each, above that every power of two is split into
+  SUB_BUCKETS equal buckets, so a reported percentile (the bucket midpoint)
+  is within 1 / (2 * SUB_BUCKETS) (~1.6%) of the true value
+- one histogram has a fixed number of buckets (up to MAX_LATENCY_US, ~71
+  minutes; larger values are clamped), so memory does not grow with traffic
+  and p50/p95/p99/p99.9 are one pass over the buckets
+- windows are rings of sub-window histograms keyed by wall-clock slot, so a
+  window rotates lazily on record/read and histograms from several workers
+  merge slot by slot (see to_dict / merge)
+
+Usage:
+    latency = EndpointLatency()
+    latency.record(123.4)                 # milliseconds
+    latency.percentiles("5m")            # {"count": 1, "p50": 123.4, ...}
+"""
+
+import time
+from array import array
+from operator import add
+from typing import Any, Dict, List, Optional, Tuple
+
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+MAX_LATENCY_US = (1 << 32) - 1
+BUCKET_COUNT = (32 - SUB_BUCKET_BITS + 1) * SUB_BUCKETS
+
+# Window name -> (span in seconds, number of sub-window slots)
+WINDOWS: Dict[str, Tuple[int, int]] = {
+    "1m": (60, 6),
+    "5m": (300, 5),
+    "1h": (3600, 12),
+}
+PERCENTILES = (50.0, 95.0, 99.0, 99.9)
+
+
+def bucket_index(value_us: int) -> int:
+    """Bucket for a latency in microseconds."""
+    if value_us < 2 * SUB_BUCKETS:
+        return max(0, value_us)
+    shift = min(value_us, MAX_LATENCY_US).bit_length() - SUB_BUCKET_BITS - 1
+    return shift * SUB_BUCKETS + (min(value_us, MAX_LATENCY_US) >> shift)
+
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """(lowest value, width) in microseconds of a bucket."""
+    if index < 2 * SUB_BUCKETS:
+        return index, 1
+    shift = index // SUB_BUCKETS - 1
+    return (index - shift * SUB_BUCKETS) << shift, 1 << shift
+
+
+def percentile_label(pct: float) -> str:
+    """50.0 -> "p50", 99.9 -> "p999"."""
+    return "p" + f"{pct:g}".replace(".", "")
+
+
+class LatencyHistogram:
+    """Counts of latencies in log-linear buckets; merges by adding counts."""
+
+    __slots__ = ("counts", "count", "total_us", "min_us", "max_us")
+
+    def __init__(self):
+        self.counts = array("I", bytes(4 * BUCKET_COUNT))
+        self.count = 0
+        self.total_us = 0
+        self.min_us = 0
+        self.max_us = 0
+
+    def record(self, latency_ms: float) -> None:
+        value = int(latency_ms * 1000)
+        self.counts[bucket_index(value)] += 1
+        if self.count == 0 or value < self.min_us:
+            self.min_us = value
+        self.max_us = max(self.max_us, value)
+        self.count += 1
+        self.total_us += value
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if not other.count:
+            return
+        self.counts = array("I", map(add, self.counts, other.counts))
+        self.min_us = other.min_us if self.count == 0 else min(self.min_us, other.min_us)
+        self.max_us = max(self.max_us, other.max_us)
+        self.count += other.count
+        self.total_us += other.total_us
+
+    def value_at(self, pct: float) -> float:
+        """Latency in ms at a percentile (0-100), from one pass over the buckets."""
+        if not self.count:
+            return 0.0
+        rank = max(1, -(-self.count * pct // 100))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                low, width = bucket_bounds(index)
+                # Midpoint, kept within what was actually recorded
+                value = min(max(low + (width - 1) / 2, self.min_us), self.max_us)
+                return value / 1000
+        return self.max_us / 1000
+
+    def summary(self) -> Dict[str, float]:
+        data = {"count": self.count}
+        for pct in PERCENTILES:
+            data[percentile_label(pct)] = round(self.value_at(pct), 2)
+        data["max"] = round(self.max_us / 1000, 2)
+        return data
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """(upper bound in ms, count) for each non-empty bucket, in order."""
+        result = []
+        for index, n in enumerate(self.counts):
+            if n:
+                low, width = bucket_bounds(index)
+                result.append(((low + width) / 1000, n))
+        return result
+
+    def cumulative_counts(self, bounds_ms: List[float]) -> List[int]:
+        """
+        Count of values <= each bound (ascending, in ms), as for Prometheus
+        `le` buckets. A bucket is placed by its midpoint, like value_at.
+        """
+        result = [0] * len(bounds_ms)
+        for index, n in enumerate(self.counts):
+            if n:
+                low, width = bucket_bounds(index)
+                value_ms = (low + (width - 1) / 2) / 1000
+                for i, bound in enumerate(bounds_ms):
+                    if value_ms <= bound:
+                        result[i] += n
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Sparse, JSON-friendly form for merging across workers."""
+        return {
+            "counts": {str(index): n for index, n in enumerate(self.counts) if n},
+            "count": self.count, "total_us": self.total_us, "min_us": self.min_us, "max_us": self.max_us
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LatencyHistogram":
+        histogram = cls()
+        for index, n in data.get("counts", {}).items():
+            histogram.counts[int(index)] = n
+        histogram.count = data.get("count", 0)
+        histogram.total_us = data.get("total_us", 0)
+        histogram.min_us = data.get("min_us", 0)
+        histogram.max_us = data.get("max_us", 0)
+        return histogram
+
+
+class WindowedHistogram:
+    """
+    Latencies of the last `span` seconds, as a ring of `slots` histograms
+    (the window moves a slot at a time, so it covers span - slot to span).
+
+    Slots are keyed by wall-clock epoch (time // slot length), so a slot is
+    reset when it is reused and windows of different workers line up.
+    Memory is only allocated for slots that received a value.
+    """
+
+    def __init__(self, span: int, slots: int):
+        self.span = span
+        self.slot_seconds = span / slots
+        self._histograms: List[Optional[LatencyHistogram]] = [None] * slots
+        self._epochs: List[int] = [-1] * slots
+
+    def _slot(self, epoch: int) -> LatencyHistogram:
+        i = epoch % len(self._histograms)
+        histogram = self._histograms[i]
+        if self._epochs[i] != epoch or histogram is None:
+            histogram = self._histograms[i] = LatencyHistogram()
+            self._epochs[i] = epoch
+        return histogram
+
+    def record(self, latency_ms: float, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        self._slot(int(now // self.slot_seconds)).record(latency_ms)
+
+    def _live(self, now: Optional[float]):
+        now = time.time() if now is None else now
+        current = int(now // self.slot_seconds)
+        oldest = current - len(self._histograms) + 1
+        for i, epoch in enumerate(self._epochs):
+            histogram = self._histograms[i]
+            if histogram is None:
+                continue
+            if oldest <= epoch <= current:
+                yield epoch, histogram
+            else:
+                # Expired: release the memory until the slot is reused
+                self._histograms[i] = None
+                self._epochs[i] = -1
+
+    def snapshot(self, now: Optional[float] = None) -> LatencyHistogram:
+        """One histogram of everything recorded within the window."""
+        merged = LatencyHistogram()
+        for _, histogram in self._live(now):
+            merged.merge(histogram)
+        return merged
+
+    def to_dict(self, now: Optional[float] = None) -> Dict[str, Any]:
+        return {"span": self.span, "slots": [[epoch, h.to_dict()] for epoch, h in self._live(now)]}
+
+    def merge(self, data: Dict[str, Any], now: Optional[float] = None) -> None:
+        """Adds another worker's window (from to_dict) slot by slot; expired slots are ignored."""
+        now = time.time() if now is None else now
+        current = int(now // self.slot_seconds)
+        for epoch, slot in data.get("slots", []):
+            if current - len(self._histograms) < epoch <= current:
+                self._slot(epoch).merge(LatencyHistogram.from_dict(slot))
+
+
+class EndpointLatency:
+    """Lifetime and windowed latency histograms for one endpoint."""
+
+    def __init__(self):
+        self.lifetime = LatencyHistogram()
+        self.windows = {name: WindowedHistogram(span, slots) for name, (span, slots) in WINDOWS.items()}
+
+    def record(self, latency_ms: float, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        self.lifetime.record(latency_ms)
+        for window in self.windows.values():
+            window.record(latency_ms, now)
+
+    def histogram(self, window: Optional[str] = None, now: Optional[float] = None) -> LatencyHistogram:
+        """The window's histogram ("1m", "5m", "1h"), or the lifetime one for None."""
+        if window is None:
+            return self.lifetime
+        return self.windows[window].snapshot(now)
+
+    def percentiles(self, window: Optional[str] = None, now: Optional[float] = None) -> Dict[str, float]:
+        return self.histogram(window, now).summary()
+
+    def to_dict(self, now: Optional[float] = None) -> Dict[str, Any]:
+        return {"lifetime": self.lifetime.to_dict(),
+                "windows": {name: window.to_dict(now) for name, window in self.windows.items()}}
+
+    def merge(self, data: Dict[str, Any], now: Optional[float] = None) -> None:
+        """Adds another worker's histograms (from to_dict)."""
+        self.lifetime.merge(LatencyHistogram.from_dict(data.get("lifetime", {})))
+        for name, window in data.get("windows", {}).items():
+            if name in self.windows:
+                self.windows[name].merge(window, now)
@@ -0,0 +1,186 @@
+"""
+LLM Response Cache for CKCIAS Drought Monitor
+Exact-match cache of Groq completions, persisted in SQLite
+
+Keys are a SHA-256 over (system prompt, normalised user message, context
+version, model, temperature), so the same question asked while the drought
+data is unchanged is answered without another Groq call. Entries live in an
+in-memory LRU backed by a SQLite table, bounded by entry count and TTL, and
+survive restarts.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from logger_config import logger
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), "llm_cache.db"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(6 * 3600)))
+MEMORY_ENTRIES = 512
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalise_message(message: str) -> str:
+    """Case-fold, collapse whitespace and drop trailing punctuation."""
+    return _WHITESPACE.sub(" ", message.casefold()).strip().rstrip("?!. ")
+
+
+def context_version(context: Optional[str]) -> str:
+    """Short digest identifying the data a prompt was built from."""
+    if not context:
+        return ""
+    return hashlib.blake2b(context.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def cache_key(system_prompt: str, message: str, version: str, model: str, temperature: float) -> str:
+    payload = json.dumps(
+        [system_prompt, normalise_message(message), version, model, round(float(temperature), 3)],
+        ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    LRU + TTL response cache with a SQLite backing store.
+
+    Usage:
+        key = cache_key(SYSTEM_PROMPT, message, context_version(context), GROQ_MODEL, 0.7)
+        cached = llm_cache.get(key)
+        if cached is None:
+            llm_cache.put(key, response_text)
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 ttl: float = LLM_CACHE_TTL_SECONDS, memory_entries: int = MEMORY_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        # key -> (created_at, response)
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._touched: Dict[str, float] = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None:
+            try:
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_used REAL NOT NULL
+                    )
+                """)
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)")
+                self._conn.commit()
+            except sqlite3.Error as e:
+                # Degrade to a memory-only cache rather than failing chat
+                logger.error(f"LLM cache database unavailable ({self.path}): {e}")
+                self._conn = None
+        return self._conn
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory)
+        }
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is None:
+            entry = self._load(key)
+            if entry is not None:
+                self.disk_hits += 1
+        if entry is None or now - entry[0] > self.ttl:
+            if entry is not None:
+                self.delete(key)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._remember(key, entry)
+        # Recency is written back with the next put, keeping hits read-only
+        self._touched[key] = now
+        return entry[1]
+
+    def put(self, key: str, response: str) -> None:
+        now = time.time()
+        self._remember(key, (now, response))
+        self.stores += 1
+        conn = self._connection()
+        if conn is None:
+            return
+        if self._touched:
+            conn.executemany("UPDATE llm_cache SET last_used = ? WHERE key = ?",
+                             [(used, touched) for touched, used in self._touched.items()])
+            self._touched.clear()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, response, created_at, last_used) VALUES (?, ?, ?, ?)",
+            (key, response, now, now)
+        )
+        self._evict(conn, now)
+        conn.commit()
+
+    def delete(self, key: str) -> None:
+        self._memory.pop(key, None)
+        conn = self._connection()
+        if conn is not None:
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            conn.commit()
+
+    def _remember(self, key: str, entry: Tuple[float, str]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, key: str) -> Optional[Tuple[float, str]]:
+        conn = self._connection()
+        if conn is None:
+            return None
+        row = conn.execute("SELECT created_at, response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        cutoff = now - self.ttl
+        stale = [row[0] for row in conn.execute("SELECT key FROM llm_cache WHERE created_at < ?", (cutoff,))]
+        (count,) = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        overflow = count - len(stale) - self.max_entries
+        if overflow > 0:
+            stale += [row[0] for row in conn.execute(
+                "SELECT key FROM llm_cache WHERE created_at >= ? ORDER BY last_used ASC LIMIT ?",
+                (cutoff, overflow)
+            )]
+        if stale:
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", [(key,) for key in stale])
+            for key in stale:
+                self._memory.pop(key, None)
+            self.evictions += len(stale)
+
+
+# Global instance
+llm_cache = LLMResponseCache()
@@ -0,0 +1,323 @@
+"""
+LLM Gateway for CKCIAS Drought Monitor
+One pooled Groq client with concurrency limits, rate limiting and retries
+
+Every Groq caller (chat, narratives, the voice sidecar, the fractal engine)
+goes through this module instead of constructing its own AsyncGroq:
+
+- one AsyncGroq over a shared, keep-alive httpx pool
+- a global concurrency semaphore plus one per feature, so a burst of
+  narratives cannot starve chat
+- token buckets for requests and tokens per minute, matched to the Groq quota
+  (GROQ_REQUESTS_PER_MINUTE / GROQ_TOKENS_PER_MINUTE)
+- retries with full-jitter exponential backoff on 429, 5xx and connection
+  errors, honouring Retry-After
+- per-feature latency, token, retry, error and rate-limit wait counters
+
+GROQ_BASE_URL points the client at a local stub server for tests and load runs.
+
+Usage:
+    completion = await llm_gateway.chat("chat", model=..., messages=[...])
+    client = llm_gateway.client_for("fractal")   # drop-in for AsyncGroq
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+from groq import APIConnectionError, APIStatusError, APITimeoutError, AsyncGroq
+
+from logger_config import logger
+from instrumentation import upstream_client
+
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "16"))
+GROQ_REQUESTS_PER_MINUTE = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", "1000"))
+GROQ_TOKENS_PER_MINUTE = float(os.getenv("GROQ_TOKENS_PER_MINUTE", "300000"))
+GROQ_REQUEST_TIMEOUT = 60.0
+
+# Concurrent calls allowed per feature (within the global limit)
+FEATURE_CONCURRENCY = {
+    "chat": 8,
+    "narrative": 2,
+    "sidecar": 4,
+    "voice": 4,
+    "fractal": 6
+}
+DEFAULT_FEATURE_CONCURRENCY = 4
+
+MAX_ATTEMPTS = 4
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_CAP_SECONDS = 8.0
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+# Rough characters-per-token ratio for budgeting before the call
+CHARS_PER_TOKEN = 4
+DEFAULT_COMPLETION_TOKENS = 1024
+
+
+class TokenBucket:
+    """Asynchronous token bucket refilled continuously at `rate` per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Take `amount` tokens, waiting for the refill if needed. Returns seconds waited."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        # The lock keeps waiters in arrival order
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+    def adjust(self, amount: float) -> None:
+        """Charge (positive) or refund (negative) tokens after the fact."""
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens - amount)
+
+
+def estimate_tokens(kwargs: Dict[str, Any]) -> int:
+    """Prompt plus completion-limit token estimate for a chat.completions call."""
+    chars = sum(len(str(message.get("content") or "")) for message in kwargs.get("messages", []))
+    completion = kwargs.get("max_completion_tokens") or kwargs.get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+    return chars // CHARS_PER_TOKEN + int(completion)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(BACKOFF_CAP_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    return isinstance(error, APIStatusError) and error.status_code in RETRYABLE_STATUS
+
+
+class _FeatureMetrics:
+    __slots__ = ("calls", "errors", "retries", "rate_limited", "prompt_tokens", "completion_tokens",
+                 "latency_ms_total", "latency_ms_max", "queue_ms_total", "throttle_ms_total", "in_flight")
+
+    def __init__(self):
+        self.calls = self.errors = self.retries = self.rate_limited = 0
+        self.prompt_tokens = self.completion_tokens = 0
+        self.latency_ms_total = self.latency_ms_max = self.queue_ms_total = self.throttle_ms_total = 0.0
+        self.in_flight = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        finished = self.calls - self.in_flight
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["latency_ms_avg"] = round(self.latency_ms_total / finished, 1) if finished > 0 else 0.0
+        return data
+
+
+class LLMGateway:
+    """
+    Shared entry point for Groq chat completions.
+
+    Usage:
+        completion = await llm_gateway.chat("narrative", model=GROQ_MODEL, messages=messages)
+    """
+
+    def __init__(self, client: AsyncGroq = None, api_key: str = None, base_url: str = GROQ_BASE_URL,
+                 max_concurrency: int = GROQ_MAX_CONCURRENCY, feature_concurrency: Dict[str, int] = None,
+                 requests_per_minute: float = GROQ_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = GROQ_TOKENS_PER_MINUTE, max_attempts: int = MAX_ATTEMPTS):
+        self._client = client
+        self._api_key = api_key
+        self._base_url = base_url
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._feature_limits = dict(FEATURE_CONCURRENCY, **(feature_concurrency or {}))
+        self._features: Dict[str, asyncio.Semaphore] = {}
+        self.requests = TokenBucket(requests_per_minute / 60.0, max(1.0, requests_per_minute / 60.0 * 5))
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute / 60.0 * 10)
+        self.max_attempts = max_attempts
+        self._metrics: Dict[str, _FeatureMetrics] = {}
+
+    @property
+    def client(self) -> AsyncGroq:
+        """The pooled AsyncGroq client, created on first use."""
+        if self._client is None:
+            api_key = self._api_key or os.getenv("GROQ_API_KEY")
+            if not api_key:
+                raise ValueError("GROQ_API_KEY environment variable is required")
+            self._client = AsyncGroq(
+                api_key=api_key,
+                base_url=self._base_url,
+                # Retries are handled here, with the rate limiter in the loop
+                max_retries=0,
+                timeout=GROQ_REQUEST_TIMEOUT,
+                http_client=upstream_client(
+                    "groq",
+                    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+                    timeout=GROQ_REQUEST_TIMEOUT
+                )
+            )
+            logger.info(f"LLM gateway client initialised ({self._base_url or 'api.groq.com'})")
+        return self._client
+
+    def client_for(self, feature: str) -> "GatewayClient":
+        """An AsyncGroq-shaped client whose calls go through the gateway under `feature`."""
+        return GatewayClient(self, feature)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {feature: metrics.as_dict() for feature, metrics in self._metrics.items()}
+
+    def _metrics_for(self, feature: str) -> _FeatureMetrics:
+        metrics = self._metrics.get(feature)
+        if metrics is None:
+            metrics = self._metrics[feature] = _FeatureMetrics()
+        return metrics
+
+    def _semaphore(self, feature: str) -> asyncio.Semaphore:
+        semaphore = self._features.get(feature)
+        if semaphore is None:
+            limit = self._feature_limits.get(feature, DEFAULT_FEATURE_CONCURRENCY)
+            semaphore = self._features[feature] = asyncio.Semaphore(limit)
+        return semaphore
+
+    async def _create(self, feature: str, metrics: _FeatureMetrics, kwargs: Dict[str, Any]):
+        """Rate-limited create() with jittered retries. Caller holds the semaphores."""
+        estimate = estimate_tokens(kwargs)
+        for attempt in range(self.max_attempts):
+            waited = await self.requests.acquire()
+            waited += await self.tokens.acquire(estimate)
+            metrics.throttle_ms_total += waited * 1000
+            try:
+                return await self.client.chat.completions.create(**kwargs), estimate
+            except Exception as e:
+                if not _is_retryable(e) or attempt == self.max_attempts - 1:
+                    raise
+                # A failed attempt produced no tokens; the retry takes its own reservation
+                self.tokens.adjust(-estimate)
+                retry_after = _retry_after(e)
+                if isinstance(e, APIStatusError) and e.status_code == 429:
+                    metrics.rate_limited += 1
+                metrics.retries += 1
+                delay = backoff_delay(attempt, retry_after)
+                logger.warning(f"Groq {feature} call failed ({e.__class__.__name__}), "
+                               f"retry {attempt + 1} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def chat(self, feature: str, **kwargs):
+        """
+        chat.completions.create through the gateway.
+
+        With stream=True the result is an async iterator of chunks; the
+        concurrency permits are held until it is exhausted or closed.
+        """
+        if kwargs.get("stream"):
+            return self._stream(feature, kwargs)
+
+        metrics = self._metrics_for(feature)
+        queued = time.perf_counter()
+        # Feature permit first, so a saturated feature queues without holding global capacity
+        async with self._semaphore(feature), self._global:
+            started = time.perf_counter()
+            metrics.queue_ms_total += (started - queued) * 1000
+            metrics.calls += 1
+            metrics.in_flight += 1
+            try:
+                completion, estimate = await self._create(feature, metrics, kwargs)
+            except Exception:
+                metrics.errors += 1
+                raise
+            finally:
+                metrics.in_flight -= 1
+                self._record_latency(metrics, started)
+
+        usage = getattr(completion, "usage", None)
+        if usage is not None:
+            metrics.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            metrics.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+            # Give back what the estimate over-reserved
+            self.tokens.adjust((getattr(usage, "total_tokens", 0) or estimate) - estimate)
+        return completion
+
+    async def _stream(self, feature: str, kwargs: Dict[str, Any]) -> AsyncIterator[Any]:
+        metrics = self._metrics_for(feature)
+        queued = time.perf_counter()
+        async with self._semaphore(feature), self._global:
+            started = time.perf_counter()
+            metrics.queue_ms_total += (started - queued) * 1000
+            metrics.calls += 1
+            metrics.in_flight += 1
+            try:
+                # Only opening the stream is retried; a stream that breaks midway is not
+                stream, _ = await self._create(feature, metrics, kwargs)
+                try:
+                    async for chunk in stream:
+                        yield chunk
+                finally:
+                    # Also on early exit (disconnect, timeout, cancellation), so the pooled connection is released
+                    await stream.close()
+            except Exception:
+                metrics.errors += 1
+                raise
+            finally:
+                metrics.in_flight -= 1
+                self._record_latency(metrics, started)
+
+    @staticmethod
+    def _record_latency(metrics: _FeatureMetrics, started: float) -> None:
+        latency_ms = (time.perf_counter() - started) * 1000
+        metrics.latency_ms_total += latency_ms
+        metrics.latency_ms_max = max(metrics.latency_ms_max, latency_ms)
+
+
+class _Completions:
+    def __init__(self, gateway: LLMGateway, feature: str):
+        self._gateway = gateway
+        self._feature = feature
+
+    async def create(self, **kwargs):
+        return await self._gateway.chat(self._feature, **kwargs)
+
+
+class _Chat:
+    def __init__(self, gateway: LLMGateway, feature: str):
+        self.completions = _Completions(gateway, feature)
+
+
+class GatewayClient:
+    """Exposes `.chat.completions.create(...)` like AsyncGroq, routed through the gateway."""
+
+    def __init__(self, gateway: LLMGateway, feature: str):
+        self.feature = feature
+        self.chat = _Chat(gateway, feature)
+
+
+# Global instance
+llm_gateway = LLMGateway()
@@ -0,0 +1,55 @@
+"""
+Event-Loop Lag Monitor for CKCIAS Drought Monitor
+Measures how late the asyncio loop runs a timer, as a sign of blocking work
+
+Every INTERVAL_SECONDS a task sleeps and records how much later than asked
+it woke up. Anything that blocks the loop (sync I/O in a handler, a large
+JSON encode, CPU-bound scoring) delays every WebSocket relay and request on
+the worker by the same amount, and shows up here.
+
+Usage:
+    loop_lag_monitor.start()        # from the app lifespan
+    loop_lag_monitor.histogram      # lag in ms, for /metrics
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from latency_histogram import LatencyHistogram
+
+INTERVAL_SECONDS = 0.5
+
+
+class EventLoopLagMonitor:
+    """Samples event-loop lag into a lifetime histogram."""
+
+    def __init__(self, interval: float = INTERVAL_SECONDS):
+        self.interval = interval
+        self.histogram = LatencyHistogram()
+        self.last_lag_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.last_lag_ms = max(0.0, (time.perf_counter() - started - self.interval) * 1000)
+            self.histogram.record(self.last_lag_ms)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance
+loop_lag_monitor = EventLoopLagMonitor()
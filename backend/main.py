@@ -3,11 +3,12 @@ CKCIAS Drought Monitor Backend
 Main FastAPI application
 """
 
-from fastapi import FastAPI, Response, status
+from fastapi import Depends, FastAPI, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 from dotenv import load_dotenv
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 # Load environment variables
@@ -15,11 +16,28 @@ load_dotenv(dotenv_path="../.env")
 load_dotenv(dotenv_path="../.env.local")
 load_dotenv(dotenv_path="../sidecar/.env")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background refreshers so request handlers serve from warm caches."""
+    from services.news_aggregator import news_aggregator
+    from risk_refresher import risk_refresher
+    from narrative_producer import narrative_producer
+    from loop_monitor import loop_lag_monitor
+    news_aggregator.refresh_in_background()
+    risk_refresher.start()
+    narrative_producer.start()
+    loop_lag_monitor.start()
+    yield
+    await loop_lag_monitor.stop()
+    await narrative_producer.stop()
+    await risk_refresher.stop()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="CKCIAS Drought Monitor API",
     description="Real-time drought risk assessment for New Zealand",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS for frontend communication
@@ -48,8 +66,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "Cache-Control", "Retry-After"],
 )
 
+# ETag / Last-Modified validators and 304s for /api/public/* GETs
+from http_cache import ConditionalGetMiddleware
+app.add_middleware(ConditionalGetMiddleware)
+
+# Negotiated br/zstd/gzip; wraps the ETag middleware so encoded bytes are cached per body
+from response_compression import CompressionMiddleware
+app.add_middleware(CompressionMiddleware)
+
+# Route/status/latency/bytes per request into the bottleneck optimizer; added
+# last so it wraps compression and times the whole response
+from instrumentation import InstrumentationMiddleware
+app.add_middleware(InstrumentationMiddleware)
+
 # Import API routes
 from api_routes import router as api_router
 app.include_router(api_router, prefix="/api")
@@ -70,6 +102,10 @@ app.include_router(voice_relay_router, prefix="/api")
 from openai_relay import router as openai_relay_router
 app.include_router(openai_relay_router, prefix="/api")
 
+# Import live risk stream router
+from risk_stream import router as risk_stream_router
+app.include_router(risk_stream_router, prefix="/api")
+
 # Import system dynamics router
 from system_dynamics import router as system_dynamics_router
 app.include_router(system_dynamics_router, prefix="/api")
@@ -128,6 +164,22 @@ async def health_check(response: Response):
             "error": str(e)
         }
 
+# Internal observability endpoints: INTERNAL_METRICS_TOKEN (config.py), or loopback clients when unset
+from metrics_exporter import CONTENT_TYPE, render_metrics, require_internal_token
+
+# Request and upstream performance, ranked by the bottleneck optimizer (needs INTERNAL_METRICS_TOKEN)
+@app.get("/api/internal/performance", dependencies=[Depends(require_internal_token)])
+async def internal_performance():
+    """Per-route and per-dependency latency, failure rate and bottleneck recommendations."""
+    from bottleneck_optimizer import get_optimizer
+    return get_optimizer().export_state()
+
+# OpenMetrics exposition for the metrics scraper (needs INTERNAL_METRICS_TOKEN)
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_internal_token)])
+async def metrics():
+    """Request, upstream, cache, trigger, DB, WebSocket and event-loop metrics."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
 # Root endpoint
 @app.get("/")
 async def root():
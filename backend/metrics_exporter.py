@@ -0,0 +1,324 @@
+"""
+OpenMetrics Exporter for CKCIAS Drought Monitor
+GET /metrics in the OpenMetrics text format, for the metrics scraper
+
+Nothing is pushed anywhere: every scrape reads state the app already keeps.
+
+- request latency by route, and upstream latency and errors by dependency,
+  come from the bottleneck optimizer (fed by instrumentation.py); its
+  lifetime histograms are re-bucketed onto LATENCY_BUCKETS_SECONDS
+- hit and miss counters of the HTTP, LLM, semantic, tool, history, news
+  and chat-context caches, plus the hit ratio of each
+- Groq calls, errors, retries, 429s, tokens and rate-limit and queue waits
+  by feature (llm_gateway)
+- narrative producer regenerations, skips, failures and in-flight runs
+- trigger evaluation counts (trigger_stats) and durations (optimizer)
+- SQLite connections in use (database.db_stats; there is no pool)
+- open relay WebSocket sessions and queue counters (relay_stats), and risk
+  stream subscribers
+- event-loop lag (loop_monitor)
+
+There is no email queue: alerts are sent inline through SendGrid, whose
+calls appear as the "sendgrid" upstream dependency.
+
+Labels are limited to route templates, dependency, cache and relay names
+and status classes, so the number of series stays bounded whatever URLs
+clients request.
+
+/metrics and /api/internal/performance need config.INTERNAL_METRICS_TOKEN
+as a bearer token; without one configured they answer only direct loopback
+clients (see require_internal_token).
+"""
+
+import hmac
+import ipaddress
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Header, HTTPException, Request
+
+import config
+
+from bottleneck_optimizer import BellmanBottleneckOptimizer, get_optimizer
+from chat_context import context_builder
+from database import db_stats
+from history_store import history_store
+from http_cache import conditional_stats
+from instrumentation import dependency_label
+from latency_histogram import LatencyHistogram
+from llm_cache import llm_cache
+from llm_gateway import llm_gateway
+from loop_monitor import loop_lag_monitor
+from narrative_producer import narrative_producer
+from relay_queue import relay_stats
+from response_compression import compression_stats
+from risk_refresher import risk_refresher
+from semantic_cache import semantic_cache
+from services.news_aggregator import news_aggregator
+from services.trigger_engine import TRIGGER_EVALUATION_LABEL, trigger_stats
+from tool_cache import tool_cache_stats
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PREFIX = "ckcias_"
+
+LATENCY_BUCKETS_SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LOOP_LAG_BUCKETS_SECONDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+UPSTREAM_PREFIX = dependency_label("")
+
+
+def is_loopback_client(request: Request) -> bool:
+    """A direct connection from this host (not relayed by a proxy)."""
+    if request.client is None or "x-forwarded-for" in request.headers or "forwarded" in request.headers:
+        return False
+    try:
+        return ipaddress.ip_address(request.client.host).is_loopback
+    except ValueError:
+        return False
+
+
+def require_internal_token(request: Request, authorization: str = Header("")) -> None:
+    """
+    Dependency gating the internal observability endpoints.
+
+    Usage:
+        @app.get("/metrics", dependencies=[Depends(require_internal_token)])
+    """
+    expected = config.INTERNAL_METRICS_TOKEN
+    if not expected:
+        if is_loopback_client(request):
+            return
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: Any) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def status_class(status: int) -> str:
+    """200 -> "2xx"; keeps the status label to five values."""
+    return f"{status // 100}xx"
+
+
+class MetricsWriter:
+    """
+    Builds an OpenMetrics exposition, one metric family at a time.
+
+    Usage:
+        writer.family("cache_hits", "counter", "Cache hits.")
+        writer.sample("cache_hits_total", 12, {"cache": "llm"})
+        text = writer.render()
+    """
+
+    def __init__(self, prefix: str = PREFIX):
+        self.prefix = prefix
+        self._lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str, unit: Optional[str] = None) -> None:
+        name = self.prefix + name
+        self._lines.append(f"# TYPE {name} {kind}")
+        if unit:
+            self._lines.append(f"# UNIT {name} {unit}")
+        self._lines.append(f"# HELP {name} {help_text}")
+
+    def sample(self, name: str, value: Any, labels: Optional[Dict[str, str]] = None) -> None:
+        label_text = ""
+        if labels:
+            label_text = "{" + ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items()) + "}"
+        self._lines.append(f"{self.prefix}{name}{label_text} {_number(value)}")
+
+    def histogram(self, name: str, histogram: LatencyHistogram, labels: Dict[str, str],
+                  bounds_seconds: Iterable[float] = LATENCY_BUCKETS_SECONDS) -> None:
+        """Samples of a latency histogram, in seconds."""
+        bounds_seconds = list(bounds_seconds)
+        counts = histogram.cumulative_counts([bound * 1000 for bound in bounds_seconds])
+        for bound, count in zip(bounds_seconds, counts):
+            self.sample(f"{name}_bucket", count, {**labels, "le": repr(float(bound))})
+        self.sample(f"{name}_bucket", histogram.count, {**labels, "le": "+Inf"})
+        self.sample(f"{name}_count", histogram.count, labels)
+        self.sample(f"{name}_sum", histogram.total_us / 1e6, labels)
+
+    def render(self) -> str:
+        return "\n".join(self._lines + ["# EOF"]) + "\n"
+
+
+def cache_counters() -> Dict[str, Tuple[int, int]]:
+    """(hits, misses) per cache."""
+    return {
+        "http_conditional": (conditional_stats["not_modified"], conditional_stats["full_responses"]),
+        "http_compression": (compression_stats["hits"], compression_stats["misses"]),
+        "llm_response": (llm_cache.hits, llm_cache.misses),
+        "llm_semantic": (semantic_cache.hits, semantic_cache.misses),
+        "voice_tool": (tool_cache_stats["hits"] + tool_cache_stats["coalesced"], tool_cache_stats["misses"]),
+        "history": (history_store.hits, history_store.misses),
+        "news": (news_aggregator.hits, news_aggregator.misses),
+        "chat_context": (context_builder.hits, context_builder.renders),
+    }
+
+
+def _write_requests(writer: MetricsWriter, endpoint_metrics: List[Tuple[str, Dict[str, Any]]]) -> None:
+    routes = []
+    for label, metrics in endpoint_metrics:
+        method, separator, route = label.partition(" ")
+        if separator:
+            routes.append(({"method": method, "route": route}, metrics))
+
+    writer.family("http_request_duration_seconds", "histogram",
+                  "HTTP request latency by route template.", unit="seconds")
+    for labels, metrics in routes:
+        writer.histogram("http_request_duration_seconds", metrics["latency"].lifetime, labels)
+
+    writer.family("http_requests", "counter", "HTTP requests by route template and status class.")
+    for labels, metrics in routes:
+        by_class: Dict[str, int] = defaultdict(int)
+        for status, count in metrics["status_counts"].items():
+            by_class[status_class(status)] += count
+        for status in sorted(by_class):
+            writer.sample("http_requests_total", by_class[status], {**labels, "status": status})
+
+    writer.family("http_response_bytes", "counter", "HTTP response body bytes sent by route template.",
+                  unit="bytes")
+    for labels, metrics in routes:
+        writer.sample("http_response_bytes_total", metrics["response_bytes"], labels)
+
+
+def _write_upstreams(writer: MetricsWriter, endpoint_metrics: List[Tuple[str, Dict[str, Any]]]) -> None:
+    upstreams = [({"dependency": label[len(UPSTREAM_PREFIX):]}, metrics)
+                 for label, metrics in endpoint_metrics if label.startswith(UPSTREAM_PREFIX)]
+
+    writer.family("upstream_request_duration_seconds", "histogram",
+                  "Outbound call latency by upstream dependency.", unit="seconds")
+    for labels, metrics in upstreams:
+        writer.histogram("upstream_request_duration_seconds", metrics["latency"].lifetime, labels)
+
+    writer.family("upstream_requests", "counter", "Outbound calls by upstream dependency.")
+    for labels, metrics in upstreams:
+        writer.sample("upstream_requests_total", metrics["call_count"], labels)
+
+    writer.family("upstream_errors", "counter", "Outbound calls that raised or returned a 5xx.")
+    for labels, metrics in upstreams:
+        writer.sample("upstream_errors_total", metrics["failures"], labels)
+
+
+def _write_caches(writer: MetricsWriter) -> None:
+    counters = cache_counters()
+    writer.family("cache_hits", "counter", "Cache hits by cache.")
+    for cache, (hits, _) in counters.items():
+        writer.sample("cache_hits_total", hits, {"cache": cache})
+    writer.family("cache_misses", "counter", "Cache misses by cache.")
+    for cache, (_, misses) in counters.items():
+        writer.sample("cache_misses_total", misses, {"cache": cache})
+    writer.family("cache_hit_ratio", "gauge", "Hits over lookups since start, by cache.")
+    for cache, (hits, misses) in counters.items():
+        writer.sample("cache_hit_ratio", hits / (hits + misses) if hits + misses else 0.0, {"cache": cache})
+
+
+def _write_llm(writer: MetricsWriter) -> None:
+    features = sorted(llm_gateway.stats().items())
+    counters = (
+        ("llm_requests", "calls", "Groq calls by feature."),
+        ("llm_errors", "errors", "Groq calls that failed after retries, by feature."),
+        ("llm_retries", "retries", "Groq call retries by feature."),
+        ("llm_rate_limited", "rate_limited", "Groq 429 responses by feature."),
+    )
+    for name, key, help_text in counters:
+        writer.family(name, "counter", help_text)
+        for feature, stats in features:
+            writer.sample(f"{name}_total", stats[key], {"feature": feature})
+    writer.family("llm_tokens", "counter", "Groq tokens used by feature and kind.")
+    for feature, stats in features:
+        writer.sample("llm_tokens_total", stats["prompt_tokens"], {"feature": feature, "kind": "prompt"})
+        writer.sample("llm_tokens_total", stats["completion_tokens"], {"feature": feature, "kind": "completion"})
+    writer.family("llm_rate_limit_wait_seconds", "counter",
+                  "Time Groq calls waited on the request and token buckets, by feature.", unit="seconds")
+    for feature, stats in features:
+        writer.sample("llm_rate_limit_wait_seconds_total", stats["throttle_ms_total"] / 1000, {"feature": feature})
+    writer.family("llm_queue_wait_seconds", "counter",
+                  "Time Groq calls waited for a concurrency permit, by feature.", unit="seconds")
+    for feature, stats in features:
+        writer.sample("llm_queue_wait_seconds_total", stats["queue_ms_total"] / 1000, {"feature": feature})
+    writer.family("llm_in_flight", "gauge", "Groq calls in progress by feature.")
+    for feature, stats in features:
+        writer.sample("llm_in_flight", stats["in_flight"], {"feature": feature})
+
+
+def _write_narratives(writer: MetricsWriter) -> None:
+    stats = narrative_producer.stats()
+    writer.family("narrative_runs", "counter", "Narrative producer runs by outcome.")
+    for outcome in ("generated", "skipped", "failures"):
+        writer.sample("narrative_runs_total", stats[outcome], {"outcome": outcome})
+    writer.family("narrative_in_flight", "gauge", "Narratives being produced.")
+    writer.sample("narrative_in_flight", stats["in_flight"])
+
+
+def _write_triggers(writer: MetricsWriter, optimizer: BellmanBottleneckOptimizer) -> None:
+    writer.family("trigger_evaluations", "counter", "Drought trigger evaluations by outcome.")
+    triggered = trigger_stats["triggered"]
+    writer.sample("trigger_evaluations_total", triggered, {"outcome": "triggered"})
+    writer.sample("trigger_evaluations_total", trigger_stats["evaluations"] - triggered, {"outcome": "not_triggered"})
+    writer.family("trigger_evaluation_errors", "counter", "Trigger evaluations that reported errors.")
+    writer.sample("trigger_evaluation_errors_total", trigger_stats["errors"])
+
+    writer.family("trigger_evaluation_duration_seconds", "histogram",
+                  "Time to evaluate one trigger.", unit="seconds")
+    metrics = optimizer.endpoint_metrics.get(TRIGGER_EVALUATION_LABEL)
+    if metrics is not None:
+        writer.histogram("trigger_evaluation_duration_seconds", metrics["latency"].lifetime, {})
+
+
+def _write_resources(writer: MetricsWriter) -> None:
+    writer.family("db_connections_in_use", "gauge", "SQLite connections currently open.")
+    writer.sample("db_connections_in_use", db_stats["in_use"])
+    writer.family("db_connections_in_use_max", "gauge", "Most SQLite connections open at once since start.")
+    writer.sample("db_connections_in_use_max", db_stats["max_in_use"])
+    writer.family("db_connections_opened", "counter", "SQLite connections opened.")
+    writer.sample("db_connections_opened_total", db_stats["connections_opened"])
+
+    directions = relay_stats.stats()
+    writer.family("websocket_sessions", "gauge", "Open relay WebSocket sessions by relay.")
+    for direction, stats in sorted(directions.items()):
+        relay, _, side = direction.partition(".")
+        if side == "upstream":
+            writer.sample("websocket_sessions", stats["queues_open"], {"relay": relay})
+    writer.family("relay_queue_depth", "gauge", "Frames waiting in relay queues by direction.")
+    for direction, stats in sorted(directions.items()):
+        writer.sample("relay_queue_depth", stats["depth"], {"direction": direction})
+    writer.family("relay_frames_forwarded", "counter", "Relay frames forwarded by direction.")
+    for direction, stats in sorted(directions.items()):
+        writer.sample("relay_frames_forwarded_total", stats["forwarded"], {"direction": direction})
+    writer.family("relay_frames_dropped", "counter", "Relay frames dropped (stale or overflowing audio) by direction.")
+    for direction, stats in sorted(directions.items()):
+        writer.sample("relay_frames_dropped_total", stats["dropped"], {"direction": direction})
+
+    writer.family("risk_stream_subscribers", "gauge", "Open risk stream (SSE) subscriptions.")
+    writer.sample("risk_stream_subscribers", risk_refresher.subscriber_count)
+
+    writer.family("event_loop_lag_seconds", "histogram",
+                  "How late the event loop ran a periodic timer.", unit="seconds")
+    writer.histogram("event_loop_lag_seconds", loop_lag_monitor.histogram, {}, LOOP_LAG_BUCKETS_SECONDS)
+
+
+def render_metrics(optimizer: Optional[BellmanBottleneckOptimizer] = None) -> str:
+    """The full OpenMetrics exposition."""
+    optimizer = optimizer or get_optimizer()
+    endpoint_metrics = sorted(optimizer.endpoint_metrics.items())
+    writer = MetricsWriter()
+    _write_requests(writer, endpoint_metrics)
+    _write_upstreams(writer, endpoint_metrics)
+    _write_caches(writer)
+    _write_llm(writer)
+    _write_narratives(writer)
+    _write_triggers(writer, optimizer)
+    _write_resources(writer)
+    return writer.render()
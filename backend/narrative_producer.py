@@ -0,0 +1,207 @@
+"""
+Kaitiaki Wai Narrative Producer for CKCIAS Drought Monitor
+Background pre-generation of narratives for every region
+
+Narratives used to be generated on the request path (headlines, council
+alerts, risk, history and a Groq call) behind a per-process 30-minute dict.
+The producer now regenerates them in the background, for the national view
+and every dashboard region, whenever a region's inputs change meaningfully:
+its risk band or trajectory direction (see narrative_signature in
+api_routes.py), or the stored narrative reaches NARRATIVE_MAX_AGE_SECONDS.
+
+Results are kept in a SQLite table shared by all worker processes and
+surviving restarts, so /public/weather-narrative only ever reads.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from database import DB_PATH
+from logger_config import logger
+from risk_refresher import REFRESH_REGIONS, RiskRefresher, risk_refresher
+
+NARRATIVE_REFRESH_SECONDS = float(os.getenv("NARRATIVE_REFRESH_SECONDS", "900"))
+NARRATIVE_MAX_AGE_SECONDS = float(os.getenv("NARRATIVE_MAX_AGE_SECONDS", str(6 * 3600)))
+NARRATIVE_CONCURRENCY = 2
+NARRATIVE_RETRY_AFTER_SECONDS = 10
+# Pause after a risk change so the rest of that refresh pass lands first
+CHANGE_SETTLE_SECONDS = 5
+
+NATIONAL = "national"
+
+
+def region_key(region: Optional[str]) -> str:
+    return region or NATIONAL
+
+
+class NarrativeStore:
+    """Persistent narrative table: region -> (payload, signature, generated_at)."""
+
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS narratives (
+                    region TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    signature TEXT NOT NULL,
+                    generated_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+        return self._conn
+
+    def get(self, region: Optional[str]) -> Optional[Tuple[Dict[str, Any], str, float]]:
+        row = self._connection().execute(
+            "SELECT payload, signature, generated_at FROM narratives WHERE region = ?", (region_key(region),)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def put(self, region: Optional[str], payload: Dict[str, Any], signature: str) -> None:
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO narratives (region, payload, signature, generated_at) VALUES (?, ?, ?, ?)",
+            (region_key(region), json.dumps(payload), signature, time.time())
+        )
+        conn.commit()
+
+
+class NarrativeProducer:
+    """
+    Keeps a fresh narrative in the store for every region.
+
+    The pipeline functions (gather inputs, signature, compose) come from
+    api_routes.py and are resolved lazily to avoid a circular import.
+
+    Usage:
+        narrative_producer.start()                 # from the app lifespan
+        payload = narrative_producer.get("Taranaki")
+    """
+
+    def __init__(self, store: NarrativeStore = None, regions: List[Optional[str]] = None,
+                 refresher: RiskRefresher = risk_refresher, interval: float = NARRATIVE_REFRESH_SECONDS,
+                 max_age: float = NARRATIVE_MAX_AGE_SECONDS, concurrency: int = NARRATIVE_CONCURRENCY,
+                 gather: Callable = None, signature: Callable = None, compose: Callable = None):
+        self.store = store or NarrativeStore()
+        self.regions = regions if regions is not None else [None] + REFRESH_REGIONS
+        self.refresher = refresher
+        self.interval = interval
+        self.max_age = max_age
+        self._gather = gather
+        self._signature = signature
+        self._compose = compose
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.generated = 0
+        self.skipped = 0
+        self.failures = 0
+
+    def _pipeline(self):
+        if self._gather is None:
+            from api_routes import compose_narrative, gather_narrative_inputs, narrative_signature
+            self._gather, self._signature, self._compose = gather_narrative_inputs, narrative_signature, compose_narrative
+        return self._gather, self._signature, self._compose
+
+    def stats(self) -> Dict[str, Any]:
+        return {"generated": self.generated, "skipped": self.skipped, "failures": self.failures,
+                "in_flight": len(self._in_flight)}
+
+    def resolve_region(self, region: Optional[str]) -> Optional[str]:
+        """
+        Canonical name of a produced region, matched case-insensitively
+        (None or "" for the national view). Raises KeyError for any other
+        region, so the store only ever holds len(self.regions) narratives.
+        """
+        if not region:
+            return None
+        for known in self.regions:
+            if known and known.casefold() == region.strip().casefold():
+                return known
+        raise KeyError(region)
+
+    def get(self, region: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Stored narrative payload for a region, however old, or None."""
+        stored = self.store.get(region)
+        return stored[0] if stored else None
+
+    def request(self, region: Optional[str]) -> asyncio.Task:
+        """Produce a region's narrative in the background (single flight per region)."""
+        region = self.resolve_region(region)
+        key = region_key(region)
+        task = self._in_flight.get(key)
+        if task is None or task.done():
+            task = self._in_flight[key] = asyncio.create_task(self.produce(region))
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return task
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    async def produce(self, region: Optional[str]) -> bool:
+        """Regenerate a region's narrative if its inputs changed. Returns True if regenerated."""
+        gather, signature_of, compose = self._pipeline()
+        async with self._semaphore:
+            try:
+                inputs = await gather(region)
+                signature = signature_of(inputs)
+                stored = self.store.get(region)
+                if stored and stored[1] == signature and time.time() - stored[2] < self.max_age:
+                    self.skipped += 1
+                    return False
+
+                payload = await compose(inputs)
+                self.store.put(region, payload, signature)
+                self.generated += 1
+                logger.info(f"Narrative regenerated for {region_key(region)} ({signature})")
+                return True
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Narrative production failed for {region_key(region)}: {e}")
+                return False
+
+    async def run_once(self) -> int:
+        """Check every region once. Returns the number of narratives regenerated."""
+        results = await asyncio.gather(*(self.request(region) for region in self.regions))
+        return sum(results)
+
+    async def _run(self) -> None:
+        if self.refresher.last_refresh is None:
+            # Let the first risk refresh land instead of calculating every region again
+            await self.refresher.wait_for_change(timeout=CHANGE_SETTLE_SECONDS * 12)
+        while True:
+            await asyncio.sleep(CHANGE_SETTLE_SECONDS)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Narrative producer loop error: {e}", exc_info=True)
+            # Re-check early when the risk data moves
+            await self.refresher.wait_for_change(timeout=self.interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance
+narrative_producer = NarrativeProducer()
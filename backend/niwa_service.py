@@ -11,6 +11,8 @@ import logging
 from typing import Optional
 from dotenv import load_dotenv
 
+from instrumentation import upstream_client
+
 # Load environment variables
 load_dotenv("../sidecar/.env")
 
@@ -54,7 +56,7 @@ async def list_niwa_data_files(page: int = 1, limit: int = 50) -> Optional[dict]
     }
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with upstream_client("niwa") as client:
             response = await client.get(url, headers=headers, params=params, timeout=30.0)
             response.raise_for_status()
             return response.json()
@@ -90,7 +92,7 @@ async def fetch_niwa_data_file(file_id: str) -> Optional[dict]:
     }
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with upstream_client("niwa") as client:
             response = await client.get(url, headers=headers, params=params, timeout=30.0)
             response.raise_for_status()
             return response.json()
@@ -1,24 +1,34 @@
 import os
 import json
-import asyncio
 import time
 import websockets
 from websockets.client import connect
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from dotenv import load_dotenv
-from groq import AsyncGroq
 from logger_config import logger
+from llm_gateway import llm_gateway
+from sidecar_context import SidecarContext, count_tokens
+from sidecar_scheduler import SidecarScheduler
+from audio_frames import append_frame, is_audio_append, is_audio_delta, receive_frame
+from relay_queue import RelayQueue, drain, run_until_first_exits
 
 load_dotenv()
 
 router = APIRouter()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Overridable so load tests can point the relay at a local Realtime stub
+OPENAI_REALTIME_URL = os.getenv(
+    "OPENAI_REALTIME_URL",
+    "wss://api.openai.com/v1/realtime?model=gpt-4o-mini-realtime-preview-2024-12-17"
+)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     logger.error("GROQ_API_KEY environment variable is required")
     raise ValueError("GROQ_API_KEY environment variable is required")
 GROQ_MODEL = "llama-3.3-70b-versatile"
+# The validator's JSON update is a few hundred tokens
+SIDECAR_MAX_COMPLETION_TOKENS = 1024
 
 # -----------------------------------------------------------------------------
 # SIDECAR SYSTEM PROMPT (Constitutional Validator)
@@ -61,55 +71,57 @@ async def openai_relay(websocket: WebSocket):
     await websocket.accept()
     logger.info(f"Client connected to OpenAI Relay. Websockets version: {websockets.__version__}")
 
-    openai_url = "wss://api.openai.com/v1/realtime?model=gpt-4o-mini-realtime-preview-2024-12-17"
+    openai_url = OPENAI_REALTIME_URL
     headers = {
         "Authorization": f"Bearer {OPENAI_API_KEY}",
         "OpenAI-Beta": "realtime=v1"
     }
 
+    # Per-direction bounded queues: readers never wait on the other socket's writes
+    upstream = RelayQueue("sidecar.upstream")      # client -> OpenAI
+    downstream = RelayQueue("sidecar.downstream")  # OpenAI -> client
+
     # Initialize Sidecar
-    groq_client = AsyncGroq(api_key=GROQ_API_KEY)
-    conversation_history = [] # List of {"role": "user"|"assistant", "content": "..."}
+    groq_client = llm_gateway.client_for("sidecar")
+    # Rolling summary plus recent turns, kept within a per-call token budget
+    sidecar_context = SidecarContext()
     
-    async def run_sidecar_analysis(history_snapshot):
-        """Runs Groq inference in the background and injects the result back to the client."""
-        try:
-            logger.info(f"Triggering Sidecar analysis with {len(history_snapshot)} turns...")
-            start_time = time.time()
-            
-            messages = [
-                {"role": "system", "content": SIDECAR_SYSTEM_PROMPT},
-                {"role": "user", "content": f"Current Conversation History:\n{json.dumps(history_snapshot, indent=2)}\n\nAnalyze the latest turn and provide the JSON update."}
-            ]
-
-            # Use parameters optimized for Llama 3.3 70B
-            completion = await groq_client.chat.completions.create(
-                model=GROQ_MODEL,
-                messages=messages,
-                temperature=0.6,
-                max_completion_tokens=4096,
-                top_p=1,
-                stream=False,
-                stop=None
-            )
-            
-            result_json_str = completion.choices[0].message.content
-            duration = time.time() - start_time
-            logger.info(f"Sidecar analysis complete in {duration:.2f}s")
-
-            # Construct the fake tool call event for the frontend
-            tool_event = {
-                "type": "response.function_call_arguments.done",
-                "call_id": f"sidecar_{int(time.time())}",
-                "name": "updateAssessmentState",
-                "arguments": result_json_str
-            }
-            
-            # Inject into client stream
-            await websocket.send_text(json.dumps(tool_event))
-
-        except Exception as e:
-            logger.error(f"Sidecar Error: {e}", exc_info=True)
+    async def run_sidecar_analysis():
+        """Runs Groq inference over the session context as it stands now."""
+        messages = sidecar_context.messages(SIDECAR_SYSTEM_PROMPT)
+        logger.info(f"Triggering Sidecar analysis at turn {sidecar_context.turns} "
+                    f"(~{count_tokens(messages[-1]['content'])} prompt tokens)...")
+        start_time = time.time()
+
+        # Use parameters optimized for Llama 3.3 70B
+        completion = await groq_client.chat.completions.create(
+            model=GROQ_MODEL,
+            messages=messages,
+            temperature=0.6,
+            max_completion_tokens=SIDECAR_MAX_COMPLETION_TOKENS,
+            top_p=1,
+            stream=False,
+            stop=None
+        )
+
+        result_json_str = completion.choices[0].message.content
+        sidecar_context.record_assessment(result_json_str)
+        duration = time.time() - start_time
+        logger.info(f"Sidecar analysis complete in {duration:.2f}s")
+        return result_json_str
+
+    async def deliver_sidecar_result(seq, result_json_str):
+        """Injects the result back to the client as a tool call event."""
+        tool_event = {
+            "type": "response.function_call_arguments.done",
+            "call_id": f"sidecar_{seq}",
+            "name": "updateAssessmentState",
+            "arguments": result_json_str
+        }
+        await downstream.put(json.dumps(tool_event))
+
+    # Debounced, latest-only: a newer user turn supersedes the pending analysis
+    sidecar_scheduler = SidecarScheduler(run_sidecar_analysis, deliver_sidecar_result)
 
     try:
         # Use connect directly from websockets.client
@@ -120,7 +132,16 @@ async def openai_relay(websocket: WebSocket):
             async def client_to_openai():
                 try:
                     while True:
-                        data = await websocket.receive_text()
+                        data = await receive_frame(websocket)
+
+                        # FAST PATH: audio frames are forwarded without a JSON round-trip
+                        if isinstance(data, bytes):
+                            await upstream.put(append_frame(data), droppable=True)
+                            continue
+                        if is_audio_append(data):
+                            await upstream.put(data, droppable=True)
+                            continue
+
                         msg = json.loads(data)
 
                         # INTERCEPT: Track User Audio Transcription (if available) or just rely on audio
@@ -134,7 +155,7 @@ async def openai_relay(websocket: WebSocket):
                              if "input_audio_transcription" not in msg["session"]:
                                  msg["session"]["input_audio_transcription"] = {"model": "whisper-1"}
 
-                        await openai_ws.send(json.dumps(msg))
+                        await upstream.put(json.dumps(msg))
                 except WebSocketDisconnect:
                     logger.info("Client disconnected")
                 except Exception as e:
@@ -144,6 +165,11 @@ async def openai_relay(websocket: WebSocket):
             async def openai_to_client():
                 try:
                     async for message in openai_ws:
+                        # FAST PATH: audio deltas are forwarded without parsing
+                        if is_audio_delta(message):
+                            await downstream.put(message, droppable=True)
+                            continue
+
                         msg = json.loads(message)
                         
                         # TRACKING: Build History
@@ -151,22 +177,27 @@ async def openai_relay(websocket: WebSocket):
                             transcript = msg.get("transcript", "")
                             if transcript:
                                 logger.info(f"User Transcript: {transcript}")
-                                conversation_history.append({"role": "user", "content": transcript})
+                                sidecar_context.add("user", transcript)
                                 # Trigger Sidecar on User Turn
-                                asyncio.create_task(run_sidecar_analysis(list(conversation_history)))
+                                sidecar_scheduler.submit()
 
                         elif msg.get("type") == "response.audio_transcript.done":
                             transcript = msg.get("transcript", "")
                             if transcript:
                                 logger.info(f"AI Transcript: {transcript}")
-                                conversation_history.append({"role": "assistant", "content": transcript})
+                                sidecar_context.add("assistant", transcript)
 
-                        await websocket.send_text(message)
+                        await downstream.put(message)
                 except Exception as e:
                     logger.error(f"Error in openai_to_client: {e}", exc_info=True)
 
-            # Run both tasks
-            await asyncio.gather(client_to_openai(), openai_to_client())
+            # Readers enqueue, one writer per socket drains; the session ends when any loop exits
+            await run_until_first_exits(
+                client_to_openai(),
+                openai_to_client(),
+                drain(upstream, openai_ws.send),
+                drain(downstream, websocket.send_text)
+            )
 
     except Exception as e:
         logger.error(f"OpenAI Connection Error: {e}", exc_info=True)
@@ -176,3 +207,7 @@ async def openai_relay(websocket: WebSocket):
         except:
             pass
         await websocket.close()
+    finally:
+        await sidecar_scheduler.close()
+        upstream.discard()
+        downstream.discard()
@@ -0,0 +1,181 @@
+"""
+Bounded Relay Queues for the Voice WebSocket Relays
+Per-direction buffering with backpressure and a stale-audio drop policy
+
+Each relay direction (browser -> OpenAI "upstream", OpenAI -> browser
+"downstream") is split into a reader that enqueues frames and a single
+writer that drains them, so a slow socket or a slow handler on one side no
+longer stalls the other.
+
+Queue policy when a queue is full:
+- audio frames are droppable: the oldest queued audio frame is discarded
+  to make room (stale audio is worth less than fresh audio), or the new
+  frame is discarded if nothing queued is audio
+- control frames (tool results, session updates, transcripts) are never
+  dropped; the reader waits for room instead (backpressure)
+- audio that has waited longer than STALE_AUDIO_SECONDS is discarded when
+  dequeued, so a stalled peer catches up instead of playing old speech
+
+Queue depth, drops and relay lag (time from enqueue to send) are recorded
+per direction in relay_stats.
+"""
+
+import asyncio
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Deque, Dict, Tuple
+
+from logger_config import logger
+
+RELAY_QUEUE_SIZE = 256
+STALE_AUDIO_SECONDS = 2.0
+
+
+class QueueClosed(Exception):
+    """get() on a closed and drained queue."""
+
+
+class _DirectionStats:
+    __slots__ = ("queues_open", "depth", "max_depth", "forwarded", "dropped", "lag_ms_total", "lag_ms_max")
+
+    def __init__(self):
+        self.queues_open = self.depth = self.max_depth = self.forwarded = self.dropped = 0
+        self.lag_ms_total = self.lag_ms_max = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["lag_ms_avg"] = round(self.lag_ms_total / self.forwarded, 2) if self.forwarded else 0.0
+        return data
+
+
+class RelayStats:
+    """Process-wide relay queue counters, by direction (e.g. "voice.downstream")."""
+
+    def __init__(self):
+        self._directions: Dict[str, _DirectionStats] = defaultdict(_DirectionStats)
+
+    def direction(self, name: str) -> _DirectionStats:
+        return self._directions[name]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: direction.as_dict() for name, direction in self._directions.items()}
+
+
+class RelayQueue:
+    """
+    Bounded FIFO of frames for one relay direction.
+
+    Usage:
+        queue = RelayQueue("voice.downstream")
+        await queue.put(message, droppable=is_audio_delta(message))   # reader
+        frame = await queue.get()                                      # writer
+    """
+
+    def __init__(self, direction: str, maxsize: int = RELAY_QUEUE_SIZE,
+                 stale_after: float = STALE_AUDIO_SECONDS, stats: RelayStats = None):
+        self.maxsize = maxsize
+        self.stale_after = stale_after
+        self._items: Deque[Tuple[float, Any, bool]] = deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._closed = False
+        self._stats = (stats or relay_stats).direction(direction)
+        self._stats.queues_open += 1
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _drop_oldest_audio(self) -> bool:
+        for index, item in enumerate(self._items):
+            if item[2]:
+                del self._items[index]
+                self._stats.depth -= 1
+                self._stats.dropped += 1
+                return True
+        return False
+
+    async def put(self, frame: Any, droppable: bool = False) -> None:
+        """Enqueue a frame; droppable (audio) frames never wait for room."""
+        while len(self._items) >= self.maxsize and not self._closed:
+            if self._drop_oldest_audio():
+                break
+            if droppable:
+                self._stats.dropped += 1
+                return
+            self._not_full.clear()
+            await self._not_full.wait()
+        if self._closed:
+            return
+        self._items.append((time.monotonic(), frame, droppable))
+        self._stats.depth += 1
+        self._stats.max_depth = max(self._stats.max_depth, len(self._items))
+        self._not_empty.set()
+
+    async def get(self) -> Any:
+        """
+        Next frame, skipping stale audio.
+
+        Raises:
+            QueueClosed: once the queue is closed and empty
+        """
+        while True:
+            while not self._items:
+                if self._closed:
+                    raise QueueClosed()
+                self._not_empty.clear()
+                await self._not_empty.wait()
+            enqueued, frame, droppable = self._items.popleft()
+            self._stats.depth -= 1
+            self._not_full.set()
+            waited = time.monotonic() - enqueued
+            if droppable and waited > self.stale_after:
+                self._stats.dropped += 1
+                continue
+            lag_ms = waited * 1000
+            self._stats.forwarded += 1
+            self._stats.lag_ms_total += lag_ms
+            self._stats.lag_ms_max = max(self._stats.lag_ms_max, lag_ms)
+            return frame
+
+    def close(self) -> None:
+        """Stop accepting frames; get() drains what is left, then raises QueueClosed."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stats.queues_open -= 1
+        self._not_empty.set()
+        self._not_full.set()
+
+    def discard(self) -> None:
+        """Close and drop everything still queued."""
+        self._stats.depth -= len(self._items)
+        self._items.clear()
+        self.close()
+
+
+async def drain(queue: RelayQueue, send) -> None:
+    """Writer loop: sends frames from the queue until it is closed and empty."""
+    try:
+        while True:
+            await send(await queue.get())
+    except QueueClosed:
+        pass
+
+
+async def run_until_first_exits(*coroutines: Awaitable) -> None:
+    """Runs relay loops together; when any one finishes, the rest are cancelled."""
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning(f"Relay loop ended with error: {task.exception()!r}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Global instance
+relay_stats = RelayStats()
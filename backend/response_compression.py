@@ -0,0 +1,251 @@
+"""
+Response Compression Middleware for CKCIAS Drought Monitor
+Negotiated Brotli / zstd / gzip with a compress-once cache
+
+Responses at or above MIN_COMPRESS_SIZE with a compressible content type are
+encoded with the best coding the client accepts. Encoded bytes are cached by
+(body hash, coding), so an unchanged payload (cached history, Hilltop series,
+narratives) is compressed once when it is first produced and every later
+request is served the stored bytes.
+
+Brotli and zstd are used when their libraries are installed; gzip is always
+available.
+"""
+
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from http_cache import representation_etag
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 6
+ZSTD_LEVEL = 6
+MAX_CACHE_BYTES = 8 * 1024 * 1024
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/vnd.ckcias.series",
+    "text/html",
+    "text/plain",
+    "text/csv",
+)
+
+# Cache hit/miss and byte counters for monitoring
+compression_stats = {"hits": 0, "misses": 0, "bytes_in": 0, "bytes_out": 0}
+
+
+def _gzip(body: bytes) -> bytes:
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _brotli(body: bytes) -> bytes:
+    return brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+def _zstd(body: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+
+
+def available_codings() -> List[str]:
+    """Codings this process can produce, in server preference order."""
+    codings = []
+    if BROTLI_AVAILABLE:
+        codings.append("br")
+    if ZSTD_AVAILABLE:
+        codings.append("zstd")
+    codings.append("gzip")
+    return codings
+
+
+ENCODERS = {"br": _brotli, "zstd": _zstd, "gzip": _gzip}
+
+
+def negotiate_encoding(accept_encoding: str, codings: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Pick a content coding from an Accept-Encoding header.
+
+    Highest client q-value wins; ties go to server preference (br, zstd, gzip).
+    Returns None when nothing acceptable is available.
+    """
+    codings = codings if codings is not None else available_codings()
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+
+    best, best_q = None, 0.0
+    for coding in codings:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressedBodyCache:
+    """Byte-bounded LRU of encoded bodies keyed by (body digest, coding)."""
+
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+
+    def get_or_compress(self, digest: str, coding: str, body: bytes) -> bytes:
+        key = (digest, coding)
+        encoded = self._entries.get(key)
+        if encoded is not None:
+            self._entries.move_to_end(key)
+            compression_stats["hits"] += 1
+            return encoded
+
+        compression_stats["misses"] += 1
+        encoded = ENCODERS[coding](body)
+        if len(encoded) <= self.max_bytes:
+            self._entries[key] = encoded
+            self.size += len(encoded)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+        return encoded
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware applying negotiated content coding to buffered responses.
+
+    Streaming responses (text/event-stream) and already-encoded responses
+    are passed through untouched. A 304 gets Vary: Accept-Encoding and, when
+    the client revalidated a coded representation, that representation's ETag.
+
+    Usage:
+        app.add_middleware(CompressionMiddleware)
+    """
+
+    def __init__(self, app, minimum_size: int = MIN_COMPRESS_SIZE, max_cache_bytes: int = MAX_CACHE_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = CompressedBodyCache(max_cache_bytes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1")
+        coding = negotiate_encoding(accept) if accept else None
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = dict(scope["headers"]).get(b"if-none-match", b"").decode("latin-1")
+        start_message = None
+        chunks = []
+        passthrough = False
+
+        async def buffer(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                start_message = message
+                if message["status"] == 304:
+                    passthrough = True
+                    await send(self._not_modified(message, coding, if_none_match))
+                elif not self._is_compressible(message["headers"]):
+                    passthrough = True
+                    await send(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await self._send_buffered(send, start_message, b"".join(chunks), coding)
+            else:
+                await send(message)
+
+        await self.app(scope, receive, buffer)
+
+    @staticmethod
+    def _is_compressible(headers) -> bool:
+        content_type = b""
+        for name, value in headers:
+            name = name.lower()
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.decode("latin-1").split(";")[0].strip() in COMPRESSIBLE_TYPES
+
+    @staticmethod
+    def _with_vary(headers) -> List[Tuple[bytes, bytes]]:
+        out = [(k, v) for k, v in headers if k.lower() != b"vary"]
+        vary = [v.decode("latin-1") for k, v in headers if k.lower() == b"vary"]
+        if "accept-encoding" not in ", ".join(vary).lower():
+            vary.append("Accept-Encoding")
+        out.append((b"vary", ", ".join(vary).encode("latin-1")))
+        return out
+
+    def _not_modified(self, start_message, coding: str, if_none_match: str):
+        """304 headers naming the representation the client revalidated."""
+        headers = self._with_vary(start_message["headers"])
+        sent_tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        out_headers = []
+        for name, value in headers:
+            if name.lower() == b"etag":
+                coded = representation_etag(value.decode("latin-1"), coding)
+                if coded in sent_tags:
+                    value = coded.encode("latin-1")
+            out_headers.append((name, value))
+        return {**start_message, "headers": out_headers}
+
+    async def _send_buffered(self, send, start_message, body: bytes, coding: str) -> None:
+        headers = self._with_vary(start_message["headers"])
+
+        if len(body) < self.minimum_size or start_message["status"] < 200 or start_message["status"] in (204, 304):
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        # Public GETs already carry a body-derived ETag; reuse it instead of hashing again
+        digest = next((v.decode("latin-1") for k, v in headers if k.lower() == b"etag"), None)
+        if digest is None:
+            digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        encoded = self.cache.get_or_compress(digest, coding, body)
+        compression_stats["bytes_in"] += len(body)
+        compression_stats["bytes_out"] += len(encoded)
+
+        out_headers = []
+        for name, value in headers:
+            lname = name.lower()
+            if lname == b"content-length":
+                continue
+            if lname == b"etag":
+                value = representation_etag(value.decode("latin-1"), coding).encode("latin-1")
+            out_headers.append((name, value))
+        out_headers.append((b"content-encoding", coding.encode("latin-1")))
+        out_headers.append((b"content-length", str(len(encoded)).encode("latin-1")))
+
+        await send({**start_message, "headers": out_headers})
+        await send({"type": "http.response.body", "body": encoded})
@@ -0,0 +1,197 @@
+"""
+Response encoders for CKCIAS time-series endpoints
+Compact columnar JSON and little-endian float32 binary frames
+
+Time-series endpoints return lists of small dicts, repeating every key per point.
+Clients can opt into `format=columnar` (parallel arrays per field) or
+`format=binary` (float32 buffers with a small JSON header) instead.
+
+The measurements carry one or two decimals, well within float32's seven
+significant digits, so the binary frame is the smallest raw payload (see
+benchmarks/bench_series_formats.py). Decimal text gzips well, so columnar
+JSON can still be close to it, or smaller, after compression.
+
+Binary frame layout:
+    magic       4 bytes   b"CKTS"
+    version     uint8     currently 2 (1 used float64 columns)
+    header_len  uint32    little-endian length of the JSON header
+    header      JSON      {"meta", "count", "numeric", "labels"}
+    columns     float32   one little-endian buffer of `count` values per
+                          name in header["numeric"], in that order (NaN = null)
+"""
+
+import json
+import math
+import struct
+import sys
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+SERIES_FORMATS = ("json", "columnar", "binary")
+
+BINARY_MAGIC = b"CKTS"
+BINARY_VERSION = 2
+BINARY_MEDIA_TYPE = "application/vnd.ckcias.series"
+_PREAMBLE = struct.Struct("<4sBI")
+
+
+def encode_json(content: Any) -> bytes:
+    """Encode JSON with orjson when installed, compact stdlib JSON otherwise."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that renders through `encode_json`."""
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content)
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """Encode one Server-Sent Events message with a JSON payload."""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + encode_json(data) + b"\n\n"
+
+
+def check_series_format(fmt: str) -> str:
+    """Validate a `format` query parameter, raising 400 for unknown formats."""
+    fmt = (fmt or "json").lower()
+    if fmt not in SERIES_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported format '{fmt}'. Must be one of: {', '.join(SERIES_FORMATS)}"
+        )
+    return fmt
+
+
+def to_columns(rows: List[Dict[str, Any]], fields: Optional[List[str]] = None) -> Dict[str, list]:
+    """
+    Pivot a list of dicts into parallel arrays.
+
+    Args:
+        rows: Records sharing the same keys
+        fields: Column order (defaults to the keys of the first row)
+
+    Returns:
+        Dict of field name -> list of values (missing keys become None)
+    """
+    if fields is None:
+        fields = list(rows[0].keys()) if rows else []
+    return {field: [row.get(field) for row in rows] for field in fields}
+
+
+def _numeric_column(values: list) -> Optional[array]:
+    """float32 buffer of a column of numbers and None (as NaN), or None for any other column."""
+    try:
+        column = array("f", values)
+    except TypeError:
+        if None not in values:
+            return None
+        try:
+            column = array("f", [math.nan if v is None else v for v in values])
+        except TypeError:
+            return None
+    # array() accepts bools as 0/1; they stay labels
+    if bool in set(map(type, values)):
+        return None
+    return column
+
+
+def encode_binary(columns: Dict[str, list], meta: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Encode columns into a binary series frame.
+
+    Numeric columns become float32 buffers; any other column is carried
+    as a label array inside the JSON header.
+    """
+    count = len(next(iter(columns.values()))) if columns else 0
+    buffers = {}
+    labels = {}
+    for name, values in columns.items():
+        column = _numeric_column(values)
+        if column is None:
+            labels[name] = values
+        else:
+            buffers[name] = column
+    numeric = list(buffers)
+
+    header = encode_json({
+        "meta": meta or {},
+        "count": count,
+        "numeric": numeric,
+        "labels": labels
+    })
+
+    parts = [_PREAMBLE.pack(BINARY_MAGIC, BINARY_VERSION, len(header)), header]
+    for column in buffers.values():
+        parts.append(_column_bytes(column))
+    return b"".join(parts)
+
+
+def _column_bytes(column: array) -> bytes:
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column.tobytes()
+
+
+def _from_float32(value: float) -> Optional[float]:
+    # Shortest decimal that round-trips through float32 (14.199999809 -> 14.2)
+    return None if math.isnan(value) else float(f"{value:.7g}")
+
+
+def decode_binary(payload: bytes) -> Tuple[Dict[str, Any], Dict[str, list]]:
+    """
+    Decode a binary series frame back into (meta, columns).
+
+    Numeric values are rounded to float32 precision; NaN is returned as None.
+    """
+    magic, version, header_len = _PREAMBLE.unpack_from(payload, 0)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError("Not a CKCIAS series frame")
+
+    offset = _PREAMBLE.size
+    header = json.loads(payload[offset:offset + header_len])
+    offset += header_len
+
+    count = header["count"]
+    column_struct = struct.Struct(f"<{count}f")
+    columns: Dict[str, list] = dict(header["labels"])
+    for name in header["numeric"]:
+        values = column_struct.unpack_from(payload, offset)
+        offset += column_struct.size
+        columns[name] = [_from_float32(v) for v in values]
+    return header["meta"], columns
+
+
+def series_response(rows: List[Dict[str, Any]], fmt: str,
+                    meta: Optional[Dict[str, Any]] = None) -> Response:
+    """
+    Build a columnar or binary response for a list of records.
+
+    Args:
+        rows: Records to encode
+        fmt: "columnar" or "binary" (validated with `check_series_format`)
+        meta: Extra top-level fields (e.g. site, units) kept alongside the columns
+    """
+    columns = to_columns(rows)
+    if fmt == "binary":
+        return Response(content=encode_binary(columns, meta), media_type=BINARY_MEDIA_TYPE)
+
+    body = dict(meta or {})
+    body.update({
+        "format": "columnar",
+        "count": len(rows),
+        "fields": list(columns.keys()),
+        "columns": columns
+    })
+    return FastJSONResponse(body)
@@ -0,0 +1,251 @@
+"""
+Background Risk Refresher for CKCIAS Drought Monitor
+Shared per-region risk cache with change notifications
+
+A single background loop recalculates drought risk for every dashboard region
+on a fixed interval. Each region's result is compared with the one last
+published; only regions whose risk score, level or trigger set (the per-factor
+risk points and TRC Hilltop availability) changed bump the data generation and
+are published to subscribers as small diffs. Raw readings such as temperature
+and humidity ride along in those diffs but never trigger one on their own.
+
+Consumers:
+- /api/stream/risk pushes the diffs to dashboards (risk_stream.py)
+- get_drought_context renders chat context from the cached snapshots
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from drought_risk import calculate_drought_risk
+from logger_config import logger
+
+# Mirrors NZ_REGIONS in constants.ts
+REFRESH_REGIONS = [
+    "Northland", "Auckland", "Waikato", "Bay of Plenty", "Gisborne", "Hawke's Bay",
+    "Taranaki", "Manawatu-Wanganui", "Wellington", "Tasman", "Nelson", "Marlborough",
+    "West Coast", "Canterbury", "Otago", "Southland"
+]
+
+REFRESH_INTERVAL_SECONDS = float(os.getenv("RISK_REFRESH_SECONDS", "300"))
+REFRESH_CONCURRENCY = 4
+SUBSCRIBER_QUEUE_SIZE = 64
+
+# Fields whose change is worth pushing to clients
+TRACKED_FIELDS = ("risk_score", "risk_level", "factors")
+
+# Discrete factors that drive the score; a change in any of them is published
+TRIGGER_FACTORS = ("temperature_risk", "humidity_risk", "rainfall_risk", "flow_risk", "trc_data_available")
+
+
+def tracked_view(risk_data: Dict[str, Any]) -> Dict[str, Any]:
+    """The subset of a risk result that clients are notified about."""
+    return {field: risk_data.get(field) for field in TRACKED_FIELDS}
+
+
+def is_material_change(old: Dict[str, Any], new: Dict[str, Any]) -> bool:
+    """Whether the risk score, band or trigger set differs between two results."""
+    if any(old.get(field) != new.get(field) for field in ("risk_score", "risk_level")):
+        return True
+    old_factors = old.get("factors") or {}
+    new_factors = new.get("factors") or {}
+    return any(old_factors.get(key) != new_factors.get(key) for key in TRIGGER_FACTORS)
+
+
+def diff_risk(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Changed tracked fields between two risk results.
+
+    Empty unless the change is material (see is_material_change). Factor
+    changes are then reported key by key (removed keys map to None), so a
+    band change does not resend every factor.
+    """
+    if old is None:
+        return tracked_view(new)
+    if not is_material_change(old, new):
+        return {}
+
+    changes: Dict[str, Any] = {}
+    for field in ("risk_score", "risk_level"):
+        if old.get(field) != new.get(field):
+            changes[field] = new.get(field)
+
+    old_factors = old.get("factors") or {}
+    new_factors = new.get("factors") or {}
+    factor_changes = {
+        key: new_factors.get(key)
+        for key in set(old_factors) | set(new_factors)
+        if old_factors.get(key) != new_factors.get(key)
+    }
+    if factor_changes:
+        changes["factors"] = factor_changes
+    return changes
+
+
+class Subscription:
+    """A client's view of the update stream, filtered to the regions it displays."""
+
+    def __init__(self, regions: Optional[Iterable[str]] = None, maxsize: int = SUBSCRIBER_QUEUE_SIZE):
+        self.regions: Optional[Set[str]] = set(regions) if regions else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        # Set when the client fell behind and its diffs were dropped; it needs a full snapshot
+        self.needs_snapshot = False
+
+    def wants(self, region: str) -> bool:
+        return self.regions is None or region in self.regions
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        if self.needs_snapshot:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.needs_snapshot = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+
+class RiskRefresher:
+    """
+    Periodic drought-risk refresher and change publisher.
+
+    Usage:
+        risk_refresher.start()                  # from the app lifespan
+        data = risk_refresher.get("Taranaki")   # cached result or None
+        sub = risk_refresher.subscribe(["Taranaki"])
+    """
+
+    def __init__(self, regions: List[str] = None, interval: float = REFRESH_INTERVAL_SECONDS,
+                 concurrency: int = REFRESH_CONCURRENCY, fetch=None):
+        self.regions = list(regions if regions is not None else REFRESH_REGIONS)
+        self.interval = interval
+        self.concurrency = concurrency
+        self._fetch = fetch or calculate_drought_risk
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        # The result each region's current version was published with
+        self._published: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        self._subscribers: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._changed_event: Optional[asyncio.Event] = None
+        self.generation = 0
+        self.last_refresh: Optional[float] = None
+
+    # -- cache access -------------------------------------------------------
+
+    def get(self, region: str) -> Optional[Dict[str, Any]]:
+        return self._snapshots.get(region)
+
+    def version(self, region: str) -> int:
+        return self._versions.get(region, 0)
+
+    def snapshot(self, regions: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+        """Published tracked view per region, with its version."""
+        names = regions if regions is not None else self._published.keys()
+        return {
+            name: {"version": self._versions[name], **tracked_view(self._published[name])}
+            for name in names if name in self._published
+        }
+
+    async def wait_for_change(self, timeout: float = None) -> bool:
+        """Wait until the next generation bump. Returns False on timeout."""
+        if self._changed_event is None:
+            self._changed_event = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed_event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    # -- subscriptions ------------------------------------------------------
+
+    def subscribe(self, regions: Optional[Iterable[str]] = None) -> Subscription:
+        subscription = Subscription(regions)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # -- refreshing ---------------------------------------------------------
+
+    def update(self, region: str, risk_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Store a fresh result and publish it if it changed materially.
+
+        Returns the published diff, or None when nothing material changed.
+        """
+        changes = diff_risk(self._published.get(region), risk_data)
+        self._snapshots[region] = risk_data
+        if not changes:
+            return None
+        self._published[region] = risk_data
+
+        self.generation += 1
+        self._versions[region] = self._versions.get(region, 0) + 1
+        event = {
+            "type": "update",
+            "region": region,
+            "version": self._versions[region],
+            "generation": self.generation,
+            "changes": changes
+        }
+        for subscription in list(self._subscribers):
+            if subscription.wants(region):
+                subscription.offer(event)
+
+        if self._changed_event is not None:
+            self._changed_event.set()
+            self._changed_event = asyncio.Event()
+        return event
+
+    async def refresh_once(self) -> int:
+        """Recalculate every region once. Returns the number of regions that changed."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh_region(region: str):
+            async with semaphore:
+                try:
+                    return region, await self._fetch(region)
+                except Exception as e:
+                    logger.warning(f"Risk refresh failed for {region}: {e}")
+                    return region, None
+
+        results = await asyncio.gather(*(refresh_region(region) for region in self.regions))
+        changed = sum(1 for region, data in results if data is not None and self.update(region, data))
+        self.last_refresh = time.time()
+        logger.info(f"Risk refresh complete: {changed}/{len(self.regions)} regions changed "
+                    f"(generation {self.generation}, {self.subscriber_count} subscribers)")
+        return changed
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh_once()
+            except Exception as e:
+                logger.error(f"Risk refresher loop error: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global instance
+risk_refresher = RiskRefresher()
@@ -0,0 +1,81 @@
+"""
+Live Risk Update Stream for CKCIAS Drought Monitor
+Server-Sent Events endpoint fed by the background risk refresher
+
+Clients open one EventSource for the regions they display:
+
+    GET /api/stream/risk?regions=Taranaki,Waikato
+
+and receive
+- `snapshot`: the current tracked state of every subscribed region (on
+  connect, and again after falling behind)
+- `update`: a diff for one region, containing only the changed fields
+- a `: ping` comment every HEARTBEAT_SECONDS to keep proxies from closing
+  the connection
+"""
+
+import asyncio
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from response_formats import sse_event
+from risk_refresher import RiskRefresher, Subscription, risk_refresher
+
+router = APIRouter()
+
+HEARTBEAT_SECONDS = 15.0
+
+
+def parse_regions(regions: Optional[str], refresher: RiskRefresher = risk_refresher):
+    """Comma-separated region filter; None means every region."""
+    if not regions:
+        return None
+    names = [name.strip() for name in regions.split(",") if name.strip()]
+    unknown = [name for name in names if name not in refresher.regions]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown regions: {', '.join(unknown)}")
+    return names
+
+
+async def risk_events(request: Request, subscription: Subscription,
+                      refresher: RiskRefresher = risk_refresher,
+                      heartbeat: float = HEARTBEAT_SECONDS) -> AsyncIterator[bytes]:
+    """Yield SSE messages for one subscription until the client disconnects."""
+    names = sorted(subscription.regions) if subscription.regions else None
+    try:
+        yield sse_event("snapshot", {"generation": refresher.generation, "regions": refresher.snapshot(names)})
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield b": ping\n\n"
+                continue
+
+            if event["type"] == "resync":
+                # Slow client: its queued diffs were dropped, so resend full state
+                subscription.needs_snapshot = False
+                yield sse_event("snapshot", {"generation": refresher.generation, "regions": refresher.snapshot(names)})
+            else:
+                yield sse_event("update", event)
+    finally:
+        refresher.unsubscribe(subscription)
+
+
+@router.get("/stream/risk")
+async def stream_risk(request: Request, regions: Optional[str] = None):
+    """
+    Push risk changes for the requested regions as Server-Sent Events.
+
+    Only regions whose risk score, level or factors (TRC Hilltop flow
+    included) changed since the last refresh are sent, as small diffs.
+    """
+    subscription = risk_refresher.subscribe(parse_regions(regions))
+    return StreamingResponse(
+        risk_events(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,223 @@
+"""
+Semantic Chat Cache for CKCIAS Drought Monitor
+Near-duplicate question matching with hashed TF-IDF vectors and MinHash LSH
+
+Most chat questions are paraphrases ("how dry is Taranaki", "drought risk in
+Taranaki right now?"). Questions are embedded CPU-only as hashed word and
+bigram features weighted by TF-IDF over the cached questions; a MinHash LSH
+index narrows the candidates and the best cosine match above the threshold
+is served, provided it was answered against the same context version.
+
+Guard rails: a match must mention the same NZ regions and the same numbers
+as the question, since TF-IDF alone treats "risk in Otago" and "risk in
+Taranaki" as near-identical.
+
+Disabled unless SEMANTIC_CACHE_ENABLED=true. Tune SEMANTIC_CACHE_THRESHOLD
+with benchmarks/eval_semantic_cache.py over a recorded question log.
+"""
+
+import math
+import os
+import re
+import time
+import zlib
+from collections import Counter, OrderedDict, defaultdict
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.7"))
+SEMANTIC_CACHE_MAX_ENTRIES = 2000
+SEMANTIC_CACHE_TTL_SECONDS = 6 * 3600
+
+FEATURE_BUCKETS = 1 << 18
+NUM_PERMUTATIONS = 32
+LSH_ROWS = 2  # rows per band; NUM_PERMUTATIONS // LSH_ROWS bands
+_MERSENNE_PRIME = (1 << 61) - 1
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+STOPWORDS = frozenset("""
+a an and any are as at be by can could currently did do does for from get got how i in is it its
+me much my now of on or our please right so tell that the there this to us we what whats when
+where which will with would you your
+""".split())
+
+# Region names (and common short forms) that a match must agree on
+REGION_ALIASES = {
+    "northland": "Northland", "auckland": "Auckland", "waikato": "Waikato",
+    "bay of plenty": "Bay of Plenty", "bop": "Bay of Plenty", "gisborne": "Gisborne",
+    "hawke's bay": "Hawke's Bay", "hawkes bay": "Hawke's Bay", "taranaki": "Taranaki",
+    "manawatu": "Manawatu-Wanganui", "whanganui": "Manawatu-Wanganui", "wanganui": "Manawatu-Wanganui",
+    "wellington": "Wellington", "tasman": "Tasman", "nelson": "Nelson", "marlborough": "Marlborough",
+    "west coast": "West Coast", "canterbury": "Canterbury", "otago": "Otago", "southland": "Southland"
+}
+_REGION_PATTERN = re.compile(r"\b(" + "|".join(sorted(map(re.escape, REGION_ALIASES), key=len, reverse=True)) + r")\b")
+
+# Fixed MinHash permutations (a*x + b mod p), deterministic across restarts
+_PERMUTATIONS = [
+    ((zlib.crc32(f"a{i}".encode()) << 29 | 1) % _MERSENNE_PRIME, zlib.crc32(f"b{i}".encode()))
+    for i in range(NUM_PERMUTATIONS)
+]
+
+
+def _bucket(feature: str) -> int:
+    return zlib.crc32(feature.encode("utf-8")) % FEATURE_BUCKETS
+
+
+def features(text: str) -> Counter:
+    """Hashed unigram and bigram counts of the content words in a question."""
+    tokens = [t.strip("'") for t in _TOKEN.findall(text.casefold())]
+    words = [t for t in tokens if t and t not in STOPWORDS]
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return Counter(_bucket(gram) for gram in grams)
+
+
+def guard_terms(text: str) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """Regions and numbers mentioned in a question."""
+    lowered = text.casefold()
+    regions = frozenset(REGION_ALIASES[m] for m in _REGION_PATTERN.findall(lowered))
+    return regions, frozenset(_NUMBER.findall(lowered))
+
+
+def minhash(buckets) -> List[int]:
+    """MinHash signature of a feature set."""
+    return [min((a * x + b) % _MERSENNE_PRIME for x in buckets) for a, b in _PERMUTATIONS]
+
+
+class _Entry:
+    __slots__ = ("question", "version", "answer", "tf", "guards", "bands", "created_at")
+
+    def __init__(self, question, version, answer, tf, guards, bands, created_at):
+        self.question = question
+        self.version = version
+        self.answer = answer
+        self.tf = tf
+        self.guards = guards
+        self.bands = bands
+        self.created_at = created_at
+
+
+class SemanticCache:
+    """
+    In-memory approximate nearest-neighbour cache of chat answers.
+
+    Usage:
+        answer = semantic_cache.lookup(question, version)
+        if answer is None:
+            semantic_cache.add(question, version, answer_text)
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 ttl: float = SEMANTIC_CACHE_TTL_SECONDS, enabled: bool = True):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, Tuple[int, ...]], Set[int]] = defaultdict(set)
+        self._document_frequency: Counter = Counter()
+        self._next_id = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "threshold": self.threshold
+        }
+
+    def _idf(self, bucket: int) -> float:
+        return math.log((1 + len(self._entries)) / (1 + self._document_frequency[bucket])) + 1.0
+
+    def _cosine(self, a: Counter, b: Counter) -> float:
+        weights = {}
+        for bucket in a.keys() | b.keys():
+            weights[bucket] = self._idf(bucket)
+        dot = sum(a[k] * b[k] * weights[k] ** 2 for k in a.keys() & b.keys())
+        if not dot:
+            return 0.0
+        norm_a = math.sqrt(sum((c * weights[k]) ** 2 for k, c in a.items()))
+        norm_b = math.sqrt(sum((c * weights[k]) ** 2 for k, c in b.items()))
+        return dot / (norm_a * norm_b)
+
+    @staticmethod
+    def _bands(tf: Counter) -> List[Tuple[int, ...]]:
+        signature = minhash(tf.keys())
+        return [tuple(signature[i:i + LSH_ROWS]) for i in range(0, NUM_PERMUTATIONS, LSH_ROWS)]
+
+    def best_match(self, question: str, version: str) -> Optional[Tuple[float, int, _Entry]]:
+        """(similarity, entry id, entry) of the closest live entry under this context version."""
+        tf = features(question)
+        if not tf:
+            return None
+        guards = guard_terms(question)
+        now = time.time()
+
+        candidates: Set[int] = set()
+        for band, key in enumerate(self._bands(tf)):
+            candidates |= self._buckets.get((version, band, key), set())
+
+        best = None
+        for entry_id in candidates:
+            entry = self._entries[entry_id]
+            if now - entry.created_at > self.ttl:
+                self._remove(entry_id)
+                continue
+            if entry.guards != guards:
+                continue
+            score = self._cosine(tf, entry.tf)
+            if best is None or score > best[0]:
+                best = (score, entry_id)
+        if best is None:
+            return None
+        return best[0], best[1], self._entries[best[1]]
+
+    def lookup(self, question: str, version: str) -> Optional[str]:
+        match = self.best_match(question, version)
+        if match is None or match[0] < self.threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        _, entry_id, entry = match
+        self._entries.move_to_end(entry_id)
+        return entry.answer
+
+    def add(self, question: str, version: str, answer: str) -> None:
+        tf = features(question)
+        if not tf:
+            return
+        entry = _Entry(question, version, answer, tf, guard_terms(question), self._bands(tf), time.time())
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = entry
+        self._document_frequency.update(tf.keys())
+        for band, key in enumerate(entry.bands):
+            self._buckets[(version, band, key)].add(entry_id)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        for bucket in entry.tf:
+            self._document_frequency[bucket] -= 1
+            if self._document_frequency[bucket] <= 0:
+                del self._document_frequency[bucket]
+        for band, key in enumerate(entry.bands):
+            bucket = self._buckets.get((entry.version, band, key))
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[(entry.version, band, key)]
+
+
+# Global instance
+semantic_cache = SemanticCache(enabled=SEMANTIC_CACHE_ENABLED)
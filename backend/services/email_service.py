@@ -27,6 +27,7 @@ except ImportError:
 
 from database import get_db_connection, log_notification
 from config import SENDGRID_API_KEY, AVAILABLE_INDICATORS
+from instrumentation import track_dependency
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -522,7 +523,8 @@ Questions? Contact: support@ckcias.nz
 
         # Send email via SendGrid
         sg = SendGridAPIClient(SENDGRID_API_KEY)
-        response = sg.send(message)
+        with track_dependency("sendgrid"):
+            response = sg.send(message)
 
         # Log successful send
         logger.info(f"Email sent successfully to {user_email}. Status: {response.status_code}")
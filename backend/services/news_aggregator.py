@@ -0,0 +1,192 @@
+"""
+CKCIAS Drought Monitor - News Aggregator
+Concurrent, cached RSS aggregation for farming and weather headlines
+
+This module provides:
+- Concurrent feed fetching with conditional GET (ETag / If-Modified-Since)
+- feedparser parsing in a worker thread, off the event loop
+- De-duplication of entries by link hash
+- A TTL cache that is refreshed in the background, so request handlers
+  only wait on RSS for the very first (cold) fetch
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from instrumentation import upstream_client
+
+try:
+    import feedparser
+    FEEDPARSER_AVAILABLE = True
+except ImportError:
+    FEEDPARSER_AVAILABLE = False
+    logging.warning("feedparser library not installed. Install with: pip install feedparser")
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# RSS Feed sources - Updated Nov 2025
+NEWS_FEEDS = [
+    {
+        "url": "https://feeds.feedburner.com/RuralNews",
+        "source": "Rural News Group"
+    },
+    {
+        "url": "https://www.farmersweekly.co.nz/feed/",
+        "source": "Farmers Weekly"
+    }
+]
+
+ENTRIES_PER_FEED = 5
+NEWS_TTL_SECONDS = 15 * 60
+FEED_TIMEOUT_SECONDS = 5.0
+EMPTY_RETRY_SECONDS = 60
+
+
+def link_hash(entry: Dict[str, Any]) -> str:
+    """Stable de-duplication key for a headline (link, falling back to title)."""
+    key = entry.get("link") or entry.get("title", "")
+    return hashlib.sha1(key.strip().lower().encode("utf-8")).hexdigest()
+
+
+def parse_feed(content: bytes, source: str, limit: int = ENTRIES_PER_FEED) -> List[Dict[str, Any]]:
+    """
+    Parse raw RSS/Atom bytes into headline dicts.
+
+    CPU-bound; called through asyncio.to_thread by the aggregator.
+    """
+    feed = feedparser.parse(content)
+    headlines = []
+    for entry in feed.entries[:limit]:
+        # Handle different date formats or missing dates
+        headlines.append({
+            "title": entry.title,
+            "link": entry.get("link", ""),
+            "source": source,
+            "published": entry.get("published", datetime.now().isoformat())
+        })
+    return headlines
+
+
+class _FeedState:
+    """Validators and last good entries for one feed."""
+
+    __slots__ = ("etag", "last_modified", "entries")
+
+    def __init__(self):
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.entries: List[Dict[str, Any]] = []
+
+
+class NewsAggregator:
+    """
+    Merged headline cache over several RSS feeds.
+
+    Usage:
+        headlines = await news_aggregator.get_headlines()
+    """
+
+    def __init__(self, feeds: List[Dict[str, str]] = None, ttl: float = NEWS_TTL_SECONDS,
+                 timeout: float = FEED_TIMEOUT_SECONDS):
+        self.feeds = feeds if feeds is not None else NEWS_FEEDS
+        self.ttl = ttl
+        self.timeout = timeout
+        self._state = {feed["url"]: _FeedState() for feed in self.feeds}
+        self._headlines: Optional[List[Dict[str, Any]]] = None
+        self._fetched_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and cache age for monitoring."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "headlines": len(self._headlines or []),
+            "age_seconds": round(time.monotonic() - self._fetched_at, 1) if self._fetched_at else None
+        }
+
+    @property
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._fetched_at > self.ttl
+
+    async def get_headlines(self) -> List[Dict[str, Any]]:
+        """
+        Return the merged headline list.
+
+        Serves the cached list immediately and refreshes it in the background
+        once the TTL has passed. Only a cold cache waits for the feeds.
+        """
+        if self._headlines is None:
+            self.misses += 1
+            await self.refresh()
+        else:
+            self.hits += 1
+            if self.is_stale:
+                self.refresh_in_background()
+        return list(self._headlines or [])
+
+    def refresh_in_background(self) -> asyncio.Task:
+        """Start a refresh unless one is already running (single flight)."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return self._refresh_task
+
+    async def refresh(self) -> None:
+        """Refresh all feeds now, joining an in-flight refresh if there is one."""
+        await asyncio.shield(self.refresh_in_background())
+
+    async def _refresh(self) -> None:
+        async with upstream_client("news-feeds", timeout=self.timeout, follow_redirects=True) as client:
+            await asyncio.gather(*(self._fetch_feed(client, feed) for feed in self.feeds))
+
+        merged = []
+        seen = set()
+        for feed in self.feeds:
+            for entry in self._state[feed["url"]].entries:
+                key = link_hash(entry)
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(entry)
+
+        self._headlines = merged
+        self._fetched_at = time.monotonic()
+        if not merged:
+            logger.warning("Warning: No news headlines could be fetched.")
+            # Retry sooner than the full TTL when every feed failed
+            self._fetched_at -= max(0.0, self.ttl - EMPTY_RETRY_SECONDS)
+
+    async def _fetch_feed(self, client: httpx.AsyncClient, feed: Dict[str, str]) -> None:
+        state = self._state[feed["url"]]
+        headers = {}
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+
+        try:
+            response = await client.get(feed["url"], headers=headers)
+            if response.status_code == 304:
+                logger.debug(f"{feed['source']} not modified")
+                return
+            response.raise_for_status()
+
+            state.entries = await asyncio.to_thread(parse_feed, response.content, feed["source"])
+            state.etag = response.headers.get("ETag")
+            state.last_modified = response.headers.get("Last-Modified")
+        except Exception as e:
+            # Keep the last good entries for this feed
+            logger.error(f"Error fetching {feed['source']}: {str(e)}")
+
+
+# Global instance
+news_aggregator = NewsAggregator()
@@ -15,6 +15,7 @@ from datetime import datetime, timedelta
 import logging
 import sys
 import os
+import time
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
@@ -28,6 +29,7 @@ from database import (
     get_trigger_conditions,
     log_notification
 )
+from bottleneck_optimizer import get_optimizer
 
 # Create FastAPI router
 router = APIRouter(prefix="/triggers", tags=["trigger-evaluation"])
@@ -39,6 +41,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Evaluation counters for /metrics; durations are recorded in the bottleneck
+# optimizer under TRIGGER_EVALUATION_LABEL
+TRIGGER_EVALUATION_LABEL = "trigger:evaluate"
+trigger_stats = {"evaluations": 0, "triggered": 0, "errors": 0}
+
 
 # Operator mapping for condition evaluation
 OPERATORS = {
@@ -269,6 +276,16 @@ def evaluate_trigger(
         return False, [], [error_msg]
 
 
+def record_trigger_evaluation(latency_ms: float, triggered: bool, errors: List[str]) -> None:
+    """Count one trigger evaluation and record its duration."""
+    trigger_stats["evaluations"] += 1
+    if triggered:
+        trigger_stats["triggered"] += 1
+    if errors:
+        trigger_stats["errors"] += 1
+    get_optimizer().record_call(TRIGGER_EVALUATION_LABEL, latency_ms, not errors)
+
+
 def evaluate_all_triggers(
     user_id: int,
     weather_data: Dict[str, Any]
@@ -316,7 +333,9 @@ def evaluate_all_triggers(
 
         # Evaluate each active trigger
         for trigger in active_triggers:
+            started = time.perf_counter()
             triggered, conditions_met, errors = evaluate_trigger(trigger, weather_data)
+            record_trigger_evaluation((time.perf_counter() - started) * 1000, triggered, errors)
 
             if triggered:
                 # Get recommendations based on conditions met
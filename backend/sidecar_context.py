@@ -0,0 +1,167 @@
+"""
+Sidecar Conversation Context for the OpenAI Relay
+Token-budgeted prompt context: rolling summary plus the most recent turns
+
+The Constitutional Validator sidecar used to receive the whole conversation
+as indented JSON on every user turn, so prompt size (and Groq latency and
+spend) grew with the length of the voice session. SidecarContext keeps the
+last RECENT_TURNS turns verbatim and folds older turns into a bounded
+extractive summary, next to the validator's own previous assessment, which
+already carries the state of the conversation so far.
+
+Token counts are a local estimate (no tokenizer download): roughly one
+token per word or punctuation mark, plus one per CHARS_PER_TOKEN characters
+for long words, which tracks Llama 3 token counts to within ~10% for
+English speech transcripts.
+
+Usage:
+    context.add("user", transcript)
+    messages = context.messages(SIDECAR_SYSTEM_PROMPT)
+    ...
+    context.record_assessment(completion.choices[0].message.content)
+"""
+
+import json
+import re
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from llm_gateway import CHARS_PER_TOKEN
+
+RECENT_TURNS = 8
+# Budget for the rendered user message (the system prompt is fixed on top)
+PROMPT_TOKEN_BUDGET = 1500
+SUMMARY_TOKEN_BUDGET = 400
+SUMMARY_TURN_CHARS = 160
+# Cap for any single turn kept verbatim (a long monologue would otherwise fill the budget)
+TURN_TOKEN_LIMIT = 400
+# Shares of the budget for the parts render() never drops
+ASSESSMENT_BUDGET_SHARE = 0.2
+LATEST_TURN_BUDGET_SHARE = 0.4
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Local estimate of the number of LLM tokens in text."""
+    count = 0
+    for piece in _TOKEN.findall(text):
+        count += 1 + (len(piece) - 1) // CHARS_PER_TOKEN
+    return count
+
+
+def compact_json(value: Any) -> str:
+    """JSON without indentation or spaces after separators."""
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def truncate_tokens(text: str, limit: int, keep_head: bool = False) -> str:
+    """
+    Keep the tail of text within roughly `limit` tokens (the latest words
+    matter most), or its head with keep_head.
+    """
+    if count_tokens(text) <= limit:
+        return text
+    words = text.split()
+    kept: List[str] = []
+    used = count_tokens("...")
+    for word in (words if keep_head else reversed(words)):
+        used += count_tokens(word)
+        if used > limit:
+            break
+        kept.append(word)
+    if keep_head:
+        return " ".join(kept) + " ..."
+    return "... " + " ".join(reversed(kept))
+
+
+class SidecarContext:
+    """
+    Conversation state for one relay session, rendered within a token budget.
+
+    Usage:
+        context = SidecarContext()
+        context.add("user", "Should I buy more NZX dairy stocks?")
+        messages = context.messages(SIDECAR_SYSTEM_PROMPT)
+    """
+
+    def __init__(self, recent_turns: int = RECENT_TURNS, budget: int = PROMPT_TOKEN_BUDGET,
+                 summary_budget: int = SUMMARY_TOKEN_BUDGET):
+        self.recent_turns = recent_turns
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self._recent: Deque[Dict[str, str]] = deque()
+        self._summary: Deque[str] = deque()
+        self._summary_tokens = 0
+        self._dropped = 0
+        self.turns = 0
+        self.assessment: Optional[Any] = None
+
+    def add(self, role: str, content: str) -> None:
+        """Record a finished turn; turns beyond the recent window move into the summary."""
+        self.turns += 1
+        self._recent.append({"role": role, "content": truncate_tokens(content, TURN_TOKEN_LIMIT)})
+        while len(self._recent) > self.recent_turns:
+            self._fold(self._recent.popleft())
+
+    def record_assessment(self, result: str) -> None:
+        """Keep the validator's latest output as rolling state for the next call."""
+        try:
+            self.assessment = json.loads(result)
+        except (TypeError, ValueError):
+            # Not JSON; the previous assessment remains the better state
+            pass
+
+    def _fold(self, turn: Dict[str, str]) -> None:
+        content = turn["content"]
+        if len(content) > SUMMARY_TURN_CHARS:
+            content = content[:SUMMARY_TURN_CHARS].rsplit(" ", 1)[0] + "..."
+        line = f"{turn['role']}: {content}"
+        self._summary.append(line)
+        self._summary_tokens += count_tokens(line)
+        while self._summary_tokens > self.summary_budget and len(self._summary) > 1:
+            self._summary_tokens -= count_tokens(self._summary.popleft())
+            self._dropped += 1
+
+    def _render(self, assessment: Optional[str], recent: List[Dict[str, str]], summary: List[str],
+                dropped: int) -> str:
+        parts = []
+        if assessment is not None:
+            parts.append(f"Previous assessment: {assessment}")
+        if summary or dropped:
+            header = f"Earlier conversation ({dropped} older turns omitted):" if dropped else "Earlier conversation:"
+            parts.append("\n".join([header] + summary))
+        parts.append(f"Recent turns: {compact_json(recent)}")
+        parts.append("Analyze the latest turn and provide the JSON update.")
+        return "\n\n".join(parts)
+
+    def render(self) -> str:
+        """The sidecar's user message, shrunk until it fits the token budget."""
+        # The assessment and the latest turn are never dropped, so they are capped up front
+        assessment = None
+        if self.assessment is not None:
+            assessment = truncate_tokens(compact_json(self.assessment),
+                                         int(self.budget * ASSESSMENT_BUDGET_SHARE), keep_head=True)
+        recent = list(self._recent)
+        if recent:
+            latest = recent[-1]
+            recent[-1] = {**latest, "content": truncate_tokens(latest["content"],
+                                                               int(self.budget * LATEST_TURN_BUDGET_SHARE))}
+        summary = list(self._summary)
+        dropped = self._dropped
+        text = self._render(assessment, recent, summary, dropped)
+        # Shed the oldest summary lines first, then the oldest verbatim turns; the latest turn always stays
+        while count_tokens(text) > self.budget and (summary or len(recent) > 1):
+            if summary:
+                summary.pop(0)
+            else:
+                recent.pop(0)
+            dropped += 1
+            text = self._render(assessment, recent, summary, dropped)
+        return text
+
+    def messages(self, system_prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": self.render()}
+        ]
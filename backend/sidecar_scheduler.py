@@ -0,0 +1,89 @@
+"""
+Sidecar Analysis Scheduler for the OpenAI Relay
+Latest-only, debounced scheduling of background analyses
+
+Every user transcript used to start its own Groq analysis. A fast talker
+stacked up overlapping calls whose results reached the dashboard out of
+order. Only the newest dashboard state is worth computing, so per session:
+
+- a new turn waits DEBOUNCE_SECONDS for follow-up turns before running
+- a newer turn cancels the pending or in-flight analysis
+- every run carries a sequence number, and a result is dropped if one with
+  a later sequence number has already been delivered
+
+Usage:
+    scheduler = SidecarScheduler(analyse, deliver)
+    scheduler.submit()        # on each user turn
+    await scheduler.close()   # when the session ends
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from logger_config import logger
+
+DEBOUNCE_SECONDS = 0.6
+
+
+class SidecarScheduler:
+    """
+    Runs `analyse()` for the latest submission only and passes its result to
+    `deliver(seq, result)`. `analyse` should read the session state when it
+    runs, so a debounced run covers every turn submitted before it started.
+    """
+
+    def __init__(self, analyse: Callable[[], Awaitable[Any]], deliver: Callable[[int, Any], Awaitable[None]],
+                 debounce: float = DEBOUNCE_SECONDS):
+        self._analyse = analyse
+        self._deliver = deliver
+        self.debounce = debounce
+        self._task: Optional[asyncio.Task] = None
+        self.seq = 0
+        self.delivered_seq = 0
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.dropped = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"submitted": self.submitted, "completed": self.completed, "cancelled": self.cancelled,
+                "dropped": self.dropped, "delivered_seq": self.delivered_seq}
+
+    def submit(self) -> int:
+        """Schedule an analysis, superseding any pending or running one. Returns its sequence number."""
+        self.seq += 1
+        self.submitted += 1
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            self.cancelled += 1
+        self._task = asyncio.create_task(self._run(self.seq))
+        return self.seq
+
+    async def _run(self, seq: int) -> None:
+        if self.debounce > 0:
+            await asyncio.sleep(self.debounce)
+        try:
+            result = await self._analyse()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Sidecar analysis {seq} failed: {e}", exc_info=True)
+            return
+        self.completed += 1
+        if seq <= self.delivered_seq:
+            self.dropped += 1
+            logger.info(f"Dropping stale sidecar result {seq} (delivered {self.delivered_seq})")
+            return
+        self.delivered_seq = seq
+        # A newer turn arriving now should not cut off a finished result mid-send
+        await asyncio.shield(self._deliver(seq, result))
+
+    async def close(self) -> None:
+        """Cancel any pending or running analysis."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
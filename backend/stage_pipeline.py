@@ -0,0 +1,134 @@
+"""
+Dependency-Aware Async Stage Pipeline for CKCIAS Drought Monitor
+Run independent inputs concurrently, each with its own deadline and fallback
+
+Each stage names the stages it depends on and receives their results as
+keyword arguments. Every stage starts as soon as its own dependencies are
+done, so the wall time is the critical path rather than the sum of all
+stages. A stage that fails or misses its deadline yields its fallback value;
+a stage without a fallback is required and fails the whole pipeline.
+
+Usage:
+    results, timings = await run_stages([
+        Stage("risk", fetch_risk, deadline=10.0),
+        Stage("history", fetch_history, deps=("risk",), deadline=8.0, fallback=[]),
+    ])
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple
+
+REQUIRED = object()
+
+
+class StageError(Exception):
+    """A required stage failed or missed its deadline."""
+
+    def __init__(self, stage: str, cause: BaseException):
+        super().__init__(f"Stage '{stage}' failed: {cause or type(cause).__name__}")
+        self.stage = stage
+        self.cause = cause
+
+
+class Stage:
+    """One named step of a pipeline."""
+
+    __slots__ = ("name", "func", "deps", "deadline", "fallback")
+
+    def __init__(self, name: str, func: Callable[..., Awaitable[Any]], deps: Sequence[str] = (),
+                 deadline: float = None, fallback: Any = REQUIRED):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.deadline = deadline
+        self.fallback = fallback
+
+
+async def run_stages(stages: List[Stage]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    Run stages concurrently in dependency order.
+
+    Returns (results by stage name, timings by stage name). Each timing has
+    `start_ms` (offset from pipeline start, i.e. how long the stage waited
+    on its dependencies), `ms` (its own duration) and `status`
+    ("ok", "timeout", "error" or "skipped").
+
+    Raises:
+        StageError: if a required stage fails, or a stage depends on one that did
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+
+    started = time.perf_counter()
+    timings: Dict[str, Dict[str, Any]] = {}
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(stage: Stage) -> Any:
+        try:
+            deps = {dep: await tasks[dep] for dep in stage.deps}
+        except StageError:
+            timings[stage.name] = {"start_ms": _ms_since(started), "ms": 0.0, "status": "skipped"}
+            raise
+
+        stage_start = time.perf_counter()
+        status = "ok"
+        try:
+            return await asyncio.wait_for(stage.func(**deps), stage.deadline)
+        except asyncio.TimeoutError as e:
+            status = "timeout"
+            error = e
+        except Exception as e:
+            status = "error"
+            error = e
+        finally:
+            timings[stage.name] = {
+                "start_ms": round((stage_start - started) * 1000, 1),
+                "ms": _ms_since(stage_start),
+                "status": status
+            }
+
+        if stage.fallback is REQUIRED:
+            raise StageError(stage.name, error)
+        return stage.fallback
+
+    # Dependencies must exist before dependants look them up
+    for stage in _topological(stages, by_name):
+        tasks[stage.name] = asyncio.create_task(run(stage))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except StageError:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    return {name: task.result() for name, task in tasks.items()}, timings
+
+
+def _ms_since(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def _topological(stages: List[Stage], by_name: Dict[str, Stage]) -> List[Stage]:
+    ordered: List[Stage] = []
+    state: Dict[str, int] = {}
+
+    def visit(stage: Stage) -> None:
+        mark = state.get(stage.name)
+        if mark == 2:
+            return
+        if mark == 1:
+            raise ValueError(f"Dependency cycle at stage '{stage.name}'")
+        state[stage.name] = 1
+        for dep in stage.deps:
+            visit(by_name[dep])
+        state[stage.name] = 2
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return ordered
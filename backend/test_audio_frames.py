@@ -0,0 +1,59 @@
+"""
+Unit tests for the relay audio frame fast path
+
+Run with: python -m pytest test_audio_frames.py -v
+"""
+
+import asyncio
+import base64
+import json
+import unittest
+
+from fastapi import WebSocketDisconnect
+
+from audio_frames import append_frame, is_audio_append, is_audio_delta, receive_frame
+
+
+class FakeWebSocket:
+    def __init__(self, messages):
+        self.messages = list(messages)
+
+    async def receive(self):
+        return self.messages.pop(0)
+
+
+class TestAudioFrames(unittest.TestCase):
+    """Test prefix detection, binary framing and frame receipt"""
+
+    def test_detects_audio_frames_by_prefix(self):
+        self.assertTrue(is_audio_append(json.dumps({"type": "input_audio_buffer.append", "audio": "AAA="})))
+        self.assertTrue(is_audio_append('{"type":"input_audio_buffer.append","audio":"AAA="}'))
+        self.assertTrue(is_audio_delta('{"type":"response.audio.delta","event_id":"e1","delta":"AAA="}'))
+        self.assertFalse(is_audio_append('{"type":"input_audio_buffer.append_extra"}'))
+        self.assertFalse(is_audio_delta('{"type":"response.audio.done"}'))
+        self.assertFalse(is_audio_append('{"audio":"AAA=","type":"input_audio_buffer.append"}'))
+
+    def test_binary_pcm_becomes_append_frame(self):
+        pcm = bytes(range(256)) * 4
+        frame = json.loads(append_frame(pcm))
+        self.assertEqual(frame["type"], "input_audio_buffer.append")
+        self.assertEqual(base64.b64decode(frame["audio"]), pcm)
+        self.assertTrue(is_audio_append(append_frame(pcm)))
+
+    def test_receive_frame(self):
+        async def run():
+            ws = FakeWebSocket([
+                {"type": "websocket.receive", "text": '{"type":"session.update"}'},
+                {"type": "websocket.receive", "bytes": b"\x01\x02"},
+                {"type": "websocket.disconnect", "code": 1001}
+            ])
+            frames = [await receive_frame(ws), await receive_frame(ws)]
+            with self.assertRaises(WebSocketDisconnect):
+                await receive_frame(ws)
+            return frames
+
+        self.assertEqual(asyncio.run(run()), ['{"type":"session.update"}', b"\x01\x02"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Unit tests for the generation-versioned chat context builder
+
+Run with: python -m pytest test_chat_context.py -v
+"""
+
+import asyncio
+import unittest
+
+from chat_context import DroughtContextBuilder
+from risk_refresher import RiskRefresher
+
+
+def risk(score):
+    return {"risk_score": score, "risk_level": "Moderate", "factors": {"temperature_anomaly": 1.5}}
+
+
+class TestDroughtContextBuilder(unittest.TestCase):
+    """Test cache reuse, invalidation and cold-start fills"""
+
+    def test_reuses_rendering_until_generation_changes(self):
+        async def run():
+            refresher = RiskRefresher(["Taranaki", "Otago"])
+            refresher.update("Taranaki", risk(3.0))
+            refresher.update("Otago", risk(2.0))
+            builder = DroughtContextBuilder(refresher, ["Taranaki", "Otago"])
+
+            first = await builder.get_context()
+            self.assertIs(await builder.get_context(), first)
+            self.assertEqual(builder.renders, 1)
+            self.assertIn("- Taranaki: Risk 3.0/100 (Moderate)", first)
+            self.assertIn("Temp Anomaly: 1.5C", first)
+
+            refresher.update("Otago", risk(2.0))  # unchanged data
+            self.assertIs(await builder.get_context(), first)
+
+            refresher.update("Otago", risk(7.0))
+            self.assertIn("Otago: Risk 7.0/100", await builder.get_context())
+            self.assertEqual(builder.renders, 2)
+
+        asyncio.run(run())
+
+    def test_cold_start_fetches_once(self):
+        calls = []
+
+        async def fetch(region):
+            calls.append(region)
+            await asyncio.sleep(0.01)
+            if region == "Otago":
+                raise Exception("OpenWeather down")
+            return risk(4.0)
+
+        async def run():
+            refresher = RiskRefresher(["Taranaki", "Otago"])
+            builder = DroughtContextBuilder(refresher, ["Taranaki", "Otago"], fetch=fetch)
+            contexts = await asyncio.gather(*(builder.get_context() for _ in range(5)))
+            self.assertEqual(sorted(calls), ["Otago", "Taranaki"])
+            self.assertEqual(len(set(contexts)), 1)
+            self.assertNotIn("Otago", contexts[0])
+
+            # Failed region is not retried on every chat
+            await builder.get_context()
+            self.assertEqual(len(calls), 2)
+            self.assertIsNotNone(refresher.get("Taranaki"))
+
+        asyncio.run(run())
+
+    def test_no_data(self):
+        async def fetch(region):
+            raise Exception("down")
+
+        builder = DroughtContextBuilder(RiskRefresher(["Otago"]), ["Otago"], fetch=fetch)
+        self.assertEqual(asyncio.run(builder.get_context()),
+                         "Current Regional Drought Conditions:\n- Data unavailable")
+
+
+if __name__ == "__main__":
+    unittest.main()
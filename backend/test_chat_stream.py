@@ -0,0 +1,132 @@
+"""
+Unit tests for the streaming chat path and the incremental <thinking> filter
+
+Run with: python -m pytest test_chat_stream.py -v
+"""
+
+import asyncio
+import os
+import unittest
+from types import SimpleNamespace
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import chatbot
+from chatbot import ThinkingFilter, stream_chat
+from llm_cache import LLMResponseCache
+
+REPLY = "<thinking>User asks about Taranaki.\nRisk is 6.2.</thinking>\n\nTaranaki is at high risk."
+
+
+def filter_chunks(chunks):
+    f = ThinkingFilter()
+    visible = "".join(f.feed(chunk) for chunk in chunks) + f.flush()
+    return visible, f.thinking
+
+
+def chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class FakeCompletions:
+    def __init__(self, deltas, stall=False):
+        self.deltas = deltas
+        self.stall = stall
+        self.kwargs = None
+        self.closed = False
+
+    async def create(self, **kwargs):
+        self.kwargs = kwargs
+
+        async def stream():
+            try:
+                for delta in self.deltas:
+                    yield chunk(delta)
+                if self.stall:
+                    await asyncio.sleep(60)
+            finally:
+                self.closed = True
+        return stream()
+
+
+class TestThinkingFilter(unittest.TestCase):
+    """Test suppression across arbitrary delta boundaries"""
+
+    def test_every_split_point(self):
+        for size in range(1, len(REPLY) + 1):
+            chunks = [REPLY[i:i + size] for i in range(0, len(REPLY), size)]
+            visible, thinking = filter_chunks(chunks)
+            self.assertEqual(visible, "Taranaki is at high risk.", f"chunk size {size}")
+            self.assertIn("Risk is 6.2.", thinking)
+
+    def test_visible_text_is_released_early(self):
+        f = ThinkingFilter()
+        self.assertEqual(f.feed("<think"), "")
+        self.assertEqual(f.feed("ing>plan</thinking>Kia "), "Kia ")
+        self.assertEqual(f.feed("ora <b"), "ora <b")
+
+    def test_lookalike_tags_and_no_thinking(self):
+        self.assertEqual(filter_chunks(["Use <thin", "k> wisely"])[0], "Use <think> wisely")
+        self.assertEqual(filter_chunks(["Plain answer"])[0], "Plain answer")
+
+    def test_unclosed_block_is_dropped(self):
+        self.assertEqual(filter_chunks(["Hi <thinking>never closed"])[0], "Hi ")
+
+
+class TestStreamChat(unittest.TestCase):
+    """Test streaming against a fake Groq client"""
+
+    def setUp(self):
+        self.original_client = chatbot._client
+        self.original_cache = chatbot.llm_cache
+        chatbot.llm_cache = LLMResponseCache(":memory:")
+
+    def tearDown(self):
+        chatbot._client = self.original_client
+        chatbot.llm_cache = self.original_cache
+
+    def test_streams_visible_deltas(self):
+        completions = FakeCompletions(["<thinking>", "hmm", "</thin", "king>", "Kia ", "ora"])
+        chatbot._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+        async def run():
+            return [text async for text in stream_chat("How dry is it?", context="- Taranaki: Risk 6.2")]
+
+        self.assertEqual(asyncio.run(run()), ["Kia ", "ora"])
+        self.assertTrue(completions.kwargs["stream"])
+        self.assertIn("Taranaki", completions.kwargs["messages"][1]["content"])
+
+        # Same question, same data: served whole from the response cache
+        completions.kwargs = None
+        self.assertEqual(asyncio.run(run()), ["Kia ora"])
+        self.assertIsNone(completions.kwargs)
+
+    def test_idle_timeout_closes_the_stream(self):
+        completions = FakeCompletions(["Kia ", "ora"], stall=True)
+        chatbot._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        received = []
+
+        async def run():
+            async for text in stream_chat("How dry is it?", use_cache=False):
+                received.append(text)
+
+        original_timeout = chatbot.STREAM_IDLE_TIMEOUT
+        chatbot.STREAM_IDLE_TIMEOUT = 0.05
+        try:
+            with self.assertRaisesRegex(Exception, "longer than expected"):
+                asyncio.run(run())
+        finally:
+            chatbot.STREAM_IDLE_TIMEOUT = original_timeout
+        self.assertEqual(received, ["Kia ", "ora"])
+        self.assertTrue(completions.closed)
+
+    def test_empty_message(self):
+        async def run():
+            return [text async for text in stream_chat("  ")]
+
+        with self.assertRaises(ValueError):
+            asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
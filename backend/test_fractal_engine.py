@@ -0,0 +1,187 @@
+"""
+Unit tests for the budget-bounded FractalEngine beam search
+
+Run with: python -m pytest test_fractal_engine.py -v
+"""
+
+import asyncio
+import json
+import re
+import unittest
+from types import SimpleNamespace
+
+from fractal_engine import CriticScoreCache, FractalEngine, FractalTree, NodeStatus, parse_scores
+
+
+class FakeGroq:
+    """Answers Explorer prompts with branches and Critic prompts with scores."""
+
+    def __init__(self, delay=0.01, score=0.6, batch_reply=None):
+        self.delay = delay
+        self.score = score
+        self.batch_reply = batch_reply
+        self.prompts = []
+        self.active = 0
+        self.max_active = 0
+        self.cancelled = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, messages, **kwargs):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.active -= 1
+        prompt = messages[0]["content"]
+        self.prompts.append(prompt)
+        if "EXPLORER" in prompt:
+            depth = sum("EXPLORER" in p for p in self.prompts)
+            content = json.dumps([f"angle {depth}{c}" for c in "abcd"])
+        elif "Thoughts:" in prompt:
+            count = int(re.search(r"JSON array of (\d+)", prompt).group(1))
+            content = self.batch_reply or json.dumps([self.score] * count)
+        else:
+            content = str(self.score)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def search(client, cache=None, **kwargs):
+    async def run():
+        engine = FractalEngine(client, score_cache=CriticScoreCache() if cache is None else cache)
+        root = engine.create_root("Should I hedge my dairy exposure?")
+        path = await engine.search(root.id, **kwargs)
+        return engine, path
+    return asyncio.run(run())
+
+
+class TestFractalSearch(unittest.TestCase):
+    """Test beam expansion, budgets, deadlines and cancellation"""
+
+    def test_expands_beam_concurrently_within_call_budget(self):
+        client = FakeGroq()
+        client.score = 0.5
+        engine, path = search(client, beam_width=2, max_calls=12, deadline=5.0, early_stop_score=1.1)
+        # Budget reserves 5 calls a step (batch fallback); root step, then both beam nodes at once
+        self.assertEqual(engine.llm_calls, 6)
+        self.assertEqual(client.max_active, 2)
+        self.assertEqual(len(path), 3)
+        self.assertTrue(all(n.status == NodeStatus.SELECTED for n in path))
+
+    def test_stops_early_on_a_high_score(self):
+        engine, path = search(FakeGroq(score=0.95), max_calls=40, deadline=5.0)
+        self.assertEqual(engine.llm_calls, 2)
+        self.assertEqual(len(path), 2)
+
+    def test_deadline_cancels_outstanding_calls(self):
+        client = FakeGroq(delay=0.5)
+        engine, path = search(client, deadline=0.05)
+        self.assertEqual(client.cancelled, 1)
+        self.assertEqual(client.active, 0)
+        self.assertEqual(len(path), 1)
+
+    def test_cancelling_the_search_cancels_llm_calls(self):
+        client = FakeGroq(delay=0.5)
+
+        async def run():
+            engine = FractalEngine(client, score_cache=CriticScoreCache())
+            root = engine.create_root("question")
+            task = asyncio.create_task(engine.search(root.id, deadline=5.0))
+            await asyncio.sleep(0.02)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        self.assertEqual(client.cancelled, 1)
+        self.assertEqual(client.active, 0)
+
+
+
+class TestBatchedCritic(unittest.TestCase):
+    """Test batched scoring, parsing, fallback and the score cache"""
+
+    def test_parse_scores(self):
+        self.assertEqual(parse_scores("Scores: [0.8, 0.35, 1.4]", 3), [0.8, 0.35, 1.0])
+        self.assertEqual(parse_scores('[{"score": 0.2}, {"score": "0.9"}]', 2), [0.2, 0.9])
+        self.assertEqual(parse_scores("1. 0.7\n2) .4\n3. 1", 3), [0.7, 0.4, 1.0])
+        self.assertIsNone(parse_scores("[0.5, 0.6]", 3))
+
+    def test_unparseable_batch_falls_back_to_per_node_calls(self):
+        client = FakeGroq(score=0.4, batch_reply="I cannot score these.")
+        engine, _ = search(client, max_calls=5, deadline=5.0)
+        # Expand, failed batch, then three single Critic calls
+        self.assertEqual(engine.llm_calls, 5)
+        root = engine.nodes[engine.root_id]
+        self.assertEqual([c.score for c in root.children], [0.4, 0.4, 0.4])
+
+    def test_failed_batches_stay_within_the_call_budget(self):
+        for max_calls in (4, 5, 9, 12, 16):
+            client = FakeGroq(score=0.5, batch_reply="I cannot score these.")
+            engine, _ = search(client, max_calls=max_calls, deadline=5.0, early_stop_score=1.1)
+            self.assertLessEqual(engine.llm_calls, max_calls)
+            self.assertEqual(len(client.prompts), engine.llm_calls)
+
+    def test_scores_are_reused_across_sessions(self):
+        cache = CriticScoreCache()
+        search(FakeGroq(score=0.95), cache=cache, deadline=5.0)
+        client = FakeGroq(score=0.1)
+        engine, _ = search(client, cache=cache, deadline=5.0)
+        self.assertEqual(engine.llm_calls, 1)  # expansion only
+        self.assertEqual([c.score for c in engine.nodes[engine.root_id].children], [0.95] * 3)
+
+
+
+class TestFractalTree(unittest.TestCase):
+    """Test array-backed node storage and incremental deltas"""
+
+    def test_nodes_are_views_over_arrays(self):
+        tree = FractalTree()
+        root = tree.add("root")
+        child = tree.add("child", parent=root.id)
+        self.assertEqual((root.id, child.id, child.depth, child.parent_id), (0, 1, 1, 0))
+        self.assertEqual(tree[0].children, [child])
+        child.score = 0.75
+        self.assertEqual(tree[1].score, 0.75)
+        self.assertIsNone(tree.get(5))
+        self.assertFalse(hasattr(child, "__dict__"))
+
+    def test_delta_sends_only_new_and_changed_nodes(self):
+        tree = FractalTree()
+        root = tree.add("root")
+        a = tree.add("a", parent=root.id)
+        self.assertEqual(tree.delta(), {"added": [[0, -1, 0.0, "pending", "root"], [1, 0, 0.0, "pending", "a"]],
+                                        "changed": []})
+        a.score = 0.8
+        a.status = NodeStatus.EVALUATED
+        tree.add("b", parent=root.id).score = 0.4
+        self.assertEqual(tree.delta(), {"added": [[2, 0, 0.4, "pending", "b"]],
+                                        "changed": [[1, 0.8, "evaluated"]]})
+        a.score = 0.8  # unchanged
+        self.assertEqual(tree.delta(), {"added": [], "changed": []})
+
+    def test_search_streams_deltas_per_level(self):
+        deltas = []
+
+        async def run():
+            engine = FractalEngine(FakeGroq(score=0.5), score_cache=CriticScoreCache())
+            root = engine.create_root("question")
+
+            async def on_update():
+                deltas.append(engine.to_delta())
+
+            path = await engine.search(root.id, max_calls=12, deadline=5.0, early_stop_score=1.1, on_update=on_update)
+            return engine, path
+
+        engine, path = asyncio.run(run())
+        self.assertEqual(len(deltas), 2)
+        self.assertEqual(len(deltas[0]["added"]), 4)  # root and its children
+        self.assertEqual(len(deltas[1]["added"]), 6)  # only the beam's children
+        self.assertEqual(sum(len(d["added"]) for d in deltas), len(engine.nodes))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Unit tests for the per-cell Open-Meteo history store
+
+Run with: python -m pytest test_history_store.py -v
+"""
+
+import asyncio
+import unittest
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import httpx
+
+import history_store
+from history_store import HistoryStore, snap_to_cell
+
+TODAY = date(2025, 11, 20)
+_RealAsyncClient = httpx.AsyncClient
+
+
+class FakeOpenMeteo:
+    """Serves deterministic daily values and records every requested range."""
+
+    def __init__(self):
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        start = date.fromisoformat(request.url.params["start_date"])
+        end = date.fromisoformat(request.url.params["end_date"])
+        self.requests.append((start, end))
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        return httpx.Response(200, json={"daily": {
+            "time": [d.isoformat() for d in days],
+            "temperature_2m_mean": [float(d.day) for d in days],
+            "precipitation_sum": [1.0 for _ in days],
+            "soil_moisture_0_to_7cm_mean": [None if d == TODAY else 0.3 for d in days]
+        }})
+
+    def client(self, *args, **kwargs):
+        return _RealAsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+class TestHistoryStore(unittest.TestCase):
+    """Test incremental fetching and serving from the cell arrays"""
+
+    def setUp(self):
+        self.upstream = FakeOpenMeteo()
+        self.today = TODAY
+        patches = [
+            patch.object(httpx, "AsyncClient", self.upstream.client),
+            patch.object(history_store, "nz_today", lambda: self.today)
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.store = HistoryStore(tail_ttl=3600)
+
+    def get(self, lat=-39.1, lon=174.1, days=14):
+        return asyncio.run(self.store.get_daily(lat, lon, days))
+
+    def test_snap_to_cell(self):
+        self.assertEqual(snap_to_cell(-39.104, 174.061), (-39.1, 174.1))
+        self.assertEqual(snap_to_cell(-39.104, 174.061), snap_to_cell(-39.07, 174.13))
+
+    def test_cold_fetch_returns_window(self):
+        rows = self.get(days=14)
+        self.assertEqual(len(rows), 15)
+        self.assertEqual(rows[0][0], (TODAY - timedelta(days=14)).strftime("%d %b"))
+        self.assertEqual(rows[-1], (TODAY.strftime("%d %b"), 20.0, 1.0, None))
+        self.assertEqual(self.upstream.requests, [(TODAY - timedelta(days=14), TODAY)])
+
+    def test_warm_cell_is_served_without_upstream(self):
+        self.get()
+        self.get(lat=-39.08, lon=174.12)
+        self.assertEqual(len(self.upstream.requests), 1)
+        self.assertEqual(self.store.stats()["hits"], 1)
+
+    def test_next_day_fetches_only_unsettled_tail(self):
+        self.get()
+        self.today = TODAY + timedelta(days=1)
+        rows = self.get()
+        self.assertEqual(self.upstream.requests[-1], (TODAY - timedelta(days=1), self.today))
+        self.assertEqual(len(rows), 15)
+
+    def test_wider_window_fetches_only_older_days(self):
+        self.get(days=14)
+        rows = self.get(days=30)
+        self.assertEqual(self.upstream.requests[1:],
+                         [(TODAY - timedelta(days=30), TODAY - timedelta(days=15))])
+        self.assertEqual(len(rows), 31)
+        self.assertEqual(rows[15][1], float((TODAY - timedelta(days=15)).day))
+
+    def test_wider_window_next_day_fetches_head_and_tail_separately(self):
+        self.get(days=14)
+        self.today = TODAY + timedelta(days=1)
+        rows = self.get(days=30)
+        self.assertEqual(self.upstream.requests[1:], [
+            (self.today - timedelta(days=30), TODAY - timedelta(days=15)),
+            (TODAY - timedelta(days=1), self.today)
+        ])
+        self.assertEqual(len(rows), 31)
+
+    def test_upstream_failure_serves_cached_days(self):
+        self.get()
+        self.today = TODAY + timedelta(days=1)
+        self.upstream.handler = lambda request: httpx.Response(503)
+        rows = self.get()
+        self.assertEqual(rows[-1][0], TODAY.strftime("%d %b"))
+
+    def test_days_out_of_range(self):
+        with self.assertRaises(ValueError):
+            self.get(days=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Unit tests for the conditional-GET (ETag / Last-Modified) middleware
+
+Run with: python -m pytest test_http_cache.py -v
+"""
+
+import unittest
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from http_cache import ConditionalGetMiddleware, cache_control_for, etag_matches
+
+
+def make_app():
+    app = FastAPI()
+    state = {"value": 1}
+
+    @app.api_route("/api/public/history", methods=["GET", "HEAD"])
+    async def history():
+        return [{"date": "01 Nov", "value": state["value"]}]
+
+    @app.get("/api/public/broken")
+    async def broken():
+        raise HTTPException(status_code=502, detail="Upstream down")
+
+    @app.get("/api/test")
+    async def private():
+        return {"ok": True}
+
+    app.add_middleware(ConditionalGetMiddleware)
+    return app, state
+
+
+class TestConditionalGet(unittest.TestCase):
+    """Test validators, 304 handling and Cache-Control policies"""
+
+    def setUp(self):
+        app, self.state = make_app()
+        self.client = TestClient(app)
+
+    def test_sets_validators(self):
+        response = self.client.get("/api/public/history")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["etag"].startswith('"'))
+        self.assertIn("last-modified", response.headers)
+        self.assertEqual(response.headers["cache-control"], "public, max-age=1800, stale-while-revalidate=3600")
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get("/api/public/history").headers["etag"]
+        response = self.client.get("/api/public/history", headers={"If-None-Match": f'W/{etag}, "other"'})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["etag"], etag)
+
+    def test_changed_body_gets_new_etag(self):
+        etag = self.client.get("/api/public/history").headers["etag"]
+        self.state["value"] = 2
+        response = self.client.get("/api/public/history", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["etag"], etag)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get("/api/public/history").headers["last-modified"]
+        response = self.client.get("/api/public/history", headers={"If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 304)
+
+    def test_head_gets_no_body_etag(self):
+        etag = self.client.get("/api/public/history").headers["etag"]
+        response = self.client.head("/api/public/history")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("etag", response.headers)
+        self.assertNotIn("last-modified", response.headers)
+        self.assertEqual(response.headers["cache-control"], "public, max-age=1800, stale-while-revalidate=3600")
+        self.assertEqual(self.client.get("/api/public/history", headers={"If-None-Match": etag}).status_code, 304)
+
+    def test_errors_and_private_routes_untouched(self):
+        self.assertNotIn("etag", self.client.get("/api/public/broken").headers)
+        self.assertNotIn("etag", self.client.get("/api/test").headers)
+
+    def test_helpers(self):
+        self.assertTrue(etag_matches("*", '"abc"'))
+        self.assertFalse(etag_matches('"abd"', '"abc"'))
+        self.assertEqual(cache_control_for("/api/public/unknown"), "no-cache, stale-while-revalidate=60")
+        self.assertTrue(cache_control_for("/api/public/hilltop/data").startswith("public, max-age=300"))
+
+
+if __name__ == "__main__":
+    unittest.main()
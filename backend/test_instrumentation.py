@@ -0,0 +1,131 @@
+"""
+Unit tests for the request and upstream instrumentation
+
+Run with: python -m pytest test_instrumentation.py -v
+"""
+
+import asyncio
+import time
+import unittest
+
+import httpx
+from fastapi import APIRouter, FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from bottleneck_optimizer import BellmanBottleneckOptimizer
+from instrumentation import InstrumentationMiddleware, InstrumentedTransport, track_dependency
+
+
+def make_app(optimizer):
+    app = FastAPI()
+    router = APIRouter()
+
+    @router.get("/public/history/{days}")
+    async def history(days: int):
+        return {"days": days}
+
+    app.include_router(router, prefix="/api")
+
+    @app.get("/api/public/hilltop/data")
+    async def data(site: str):
+        return {"site": site}
+
+    @app.get("/api/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/api/stream")
+    async def stream():
+        async def events():
+            yield "data: first\n\n"
+            await asyncio.sleep(0.3)
+            yield "data: second\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/api/broken")
+    async def broken():
+        raise HTTPException(status_code=502, detail="Upstream down")
+
+    app.add_middleware(InstrumentationMiddleware, optimizer=optimizer)
+    return app
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test route labelling, status/byte capture and upstream recording"""
+
+    def setUp(self):
+        self.optimizer = BellmanBottleneckOptimizer()
+
+    def _rows(self):
+        return {row["endpoint"]: row for row in self.optimizer.identify_bottlenecks()}
+
+    def test_requests_are_recorded_by_route_template(self):
+        client = TestClient(make_app(self.optimizer))
+        client.get("/api/items/1")
+        client.get("/api/items/2")
+        response = client.get("/api/public/hilltop/data", params={"site": "Patea at Skinner Rd"})
+        client.get("/api/broken")
+        client.get("/nowhere")
+
+        rows = self._rows()
+        self.assertEqual(set(rows), {"GET /api/items/{item_id}", "GET /api/public/hilltop/data",
+                                     "GET /api/broken", "GET unmatched"})
+        self.assertEqual(rows["GET /api/items/{item_id}"]["call_count"], 2)
+        self.assertEqual(rows["GET /api/public/hilltop/data"]["avg_response_bytes"], len(response.content))
+        self.assertEqual(rows["GET /api/broken"]["status_counts"], {"502": 1})
+        self.assertEqual(rows["GET /api/broken"]["failure_rate_pct"], 100.0)
+        self.assertEqual(rows["GET unmatched"]["failure_rate_pct"], 0.0)
+
+    def test_included_router_prefix_is_part_of_the_label(self):
+        client = TestClient(make_app(self.optimizer))
+        client.get("/api/public/history/30")
+        client.get("/api/public/history/90")
+
+        self.assertEqual(self._rows()["GET /api/public/history/{days}"]["call_count"], 2)
+
+    def test_event_streams_are_timed_to_the_first_event(self):
+        client = TestClient(make_app(self.optimizer))
+        started = time.perf_counter()
+        response = client.get("/api/stream")
+        self.assertGreaterEqual(time.perf_counter() - started, 0.3)
+
+        row = self._rows()["GET /api/stream"]
+        self.assertLess(row["p95_latency_ms"], 250)
+        self.assertEqual(row["avg_response_bytes"], len(response.content))
+
+    def test_transport_records_upstream_calls(self):
+        def handler(request):
+            if request.url.path == "/down":
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(200 if request.url.path == "/ok" else 503, content=b"x" * 10)
+
+        async def run():
+            transport = InstrumentedTransport("open-meteo", transport=httpx.MockTransport(handler),
+                                              optimizer=self.optimizer)
+            async with httpx.AsyncClient(transport=transport, base_url="http://upstream") as client:
+                await client.get("/ok")
+                await client.get("/busy")
+                with self.assertRaises(httpx.ConnectError):
+                    await client.get("/down")
+
+        asyncio.run(run())
+        row = self._rows()["upstream:open-meteo"]
+        self.assertEqual(row["call_count"], 3)
+        self.assertEqual(row["status_counts"], {"200": 1, "503": 1})
+        self.assertAlmostEqual(row["failure_rate_pct"], 66.67)
+        self.assertEqual(row["avg_response_bytes"], 7)
+
+    def test_track_dependency_records_exceptions_as_failures(self):
+        with track_dependency("sendgrid", optimizer=self.optimizer):
+            pass
+        with self.assertRaises(RuntimeError):
+            with track_dependency("sendgrid", optimizer=self.optimizer):
+                raise RuntimeError("401 Unauthorized")
+
+        row = self._rows()["upstream:sendgrid"]
+        self.assertEqual((row["call_count"], row["failure_rate_pct"]), (2, 50.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
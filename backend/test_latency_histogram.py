@@ -0,0 +1,83 @@
+"""
+Unit tests for the streaming latency histograms
+
+Run with: python -m pytest test_latency_histogram.py -v
+"""
+
+import json
+import random
+import unittest
+
+from bottleneck_optimizer import BellmanBottleneckOptimizer
+from latency_histogram import (
+    BUCKET_COUNT, MAX_LATENCY_US, EndpointLatency, LatencyHistogram, WindowedHistogram, bucket_bounds, bucket_index
+)
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Test bucket layout, percentile accuracy, window rotation and merging"""
+
+    def test_buckets_cover_the_range_in_order(self):
+        previous = -1
+        for value in list(range(0, 5000)) + [10 ** 6, 123456789, MAX_LATENCY_US, MAX_LATENCY_US * 10]:
+            index = bucket_index(value)
+            low, width = bucket_bounds(index)
+            self.assertTrue(low <= min(value, MAX_LATENCY_US) < low + width, value)
+            self.assertGreaterEqual(index, previous)
+            self.assertLess(index, BUCKET_COUNT)
+            previous = index
+
+    def test_percentiles_track_the_exact_values(self):
+        rng = random.Random(7)
+        values = sorted(rng.lognormvariate(4, 1.2) for _ in range(20000))
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+
+        for pct in (50, 95, 99, 99.9):
+            exact = values[int(len(values) * pct / 100) - 1]
+            self.assertAlmostEqual(histogram.value_at(pct) / exact, 1.0, delta=0.03)
+        self.assertEqual(histogram.summary()["max"], round(int(values[-1] * 1000) / 1000, 2))
+
+    def test_windows_expire_old_slots(self):
+        window = WindowedHistogram(60, 6)
+        window.record(100.0, now=1000.0)
+        window.record(200.0, now=1035.0)
+
+        self.assertEqual(window.snapshot(now=1040.0).count, 2)
+        # 1000.0 is in the slot starting at 1000, which leaves the window at 1060
+        self.assertEqual(window.snapshot(now=1065.0).count, 1)
+        self.assertEqual(window.snapshot(now=1100.0).count, 0)
+
+    def test_histograms_merge_across_workers(self):
+        now = 5000.0
+        worker_a, worker_b, combined = EndpointLatency(), EndpointLatency(), EndpointLatency()
+        for i in range(100):
+            worker_a.record(10.0 + i, now=now)
+            worker_b.record(500.0 + i, now=now - 600)   # outside 5m, inside 1h
+            combined.record(10.0 + i, now=now)
+            combined.record(500.0 + i, now=now - 600)
+
+        merged = EndpointLatency()
+        merged.merge(json.loads(json.dumps(worker_a.to_dict(now))), now)
+        merged.merge(json.loads(json.dumps(worker_b.to_dict(now))), now)
+
+        self.assertEqual(merged.percentiles("5m", now)["count"], 100)
+        self.assertEqual(merged.percentiles("1h", now), combined.percentiles("1h", now))
+        self.assertEqual(merged.percentiles(), combined.percentiles())
+
+    def test_optimizer_reports_windowed_percentiles(self):
+        optimizer = BellmanBottleneckOptimizer()
+        for i in range(1000):
+            optimizer.record_call("GET /api/public/history", 50.0 if i < 990 else 3000.0, True)
+
+        row = optimizer.identify_bottlenecks()[0]
+        self.assertEqual(set(row["latency_ms"]), {"1m", "5m", "1h"})
+        self.assertEqual(row["latency_ms"]["1m"]["count"], 1000)
+        self.assertAlmostEqual(row["latency_ms"]["1h"]["p50"], 50.0, delta=1.0)
+        self.assertAlmostEqual(row["latency_ms"]["1h"]["p999"], 3000.0, delta=60.0)
+        self.assertEqual(row["p95_latency_ms"], row["latency_ms"]["1h"]["p95"])
+
+
+if __name__ == "__main__":
+    unittest.main()
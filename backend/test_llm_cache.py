@@ -0,0 +1,79 @@
+"""
+Unit tests for the SQLite-backed LLM response cache
+
+Run with: python -m pytest test_llm_cache.py -v
+"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from llm_cache import LLMResponseCache, cache_key, context_version, normalise_message
+
+
+class TestKeys(unittest.TestCase):
+    """Test normalisation and key composition"""
+
+    def test_normalisation(self):
+        self.assertEqual(normalise_message("  What's the drought risk in   Taranaki?? "),
+                         "what's the drought risk in taranaki")
+
+    def test_key_components(self):
+        base = cache_key("system", "Risk in Taranaki?", "v1", "llama", 0.7)
+        self.assertEqual(base, cache_key("system", "risk in taranaki", "v1", "llama", 0.7))
+        self.assertNotEqual(base, cache_key("system", "risk in taranaki", "v2", "llama", 0.7))
+        self.assertNotEqual(base, cache_key("system", "risk in taranaki", "v1", "llama", 0.2))
+        self.assertNotEqual(base, cache_key("other", "risk in taranaki", "v1", "llama", 0.7))
+        self.assertEqual(context_version(None), "")
+        self.assertNotEqual(context_version("a"), context_version("b"))
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    """Test LRU/TTL bounds, persistence and metrics"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "llm_cache.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_hit_miss_and_stats(self):
+        cache = LLMResponseCache(self.path)
+        self.assertIsNone(cache.get("k"))
+        cache.put("k", "Kia ora")
+        self.assertEqual(cache.get("k"), "Kia ora")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["stores"]), (1, 1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_survives_restart(self):
+        LLMResponseCache(self.path).put("k", "Kia ora")
+        restarted = LLMResponseCache(self.path)
+        self.assertEqual(restarted.get("k"), "Kia ora")
+        self.assertEqual(restarted.stats()["disk_hits"], 1)
+
+    def test_ttl(self):
+        cache = LLMResponseCache(self.path, ttl=0.05)
+        cache.put("k", "old")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("k"))
+        self.assertIsNone(LLMResponseCache(self.path).get("k"))
+
+    def test_lru_bound(self):
+        cache = LLMResponseCache(self.path, max_entries=2, memory_entries=2)
+        cache.put("a", "1")
+        time.sleep(0.01)
+        cache.put("b", "2")
+        time.sleep(0.01)
+        cache.get("a")
+        cache.put("c", "3")  # evicts b, the least recently used
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "1")
+        self.assertEqual(cache.get("c"), "3")
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+"""
+Unit tests for the shared LLM gateway against a stub Groq server
+
+Run with: python -m pytest test_llm_gateway.py -v
+"""
+
+import asyncio
+import json
+import time
+import unittest
+from unittest.mock import patch
+
+import httpx
+from groq import AsyncGroq, BadRequestError
+
+from llm_gateway import LLMGateway, TokenBucket, estimate_tokens
+
+MESSAGES = [{"role": "user", "content": "How dry is Taranaki?"}]
+
+
+def completion_body(text="Kia ora"):
+    return {
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "stub",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+        "usage": {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15}
+    }
+
+
+def stream_body(parts):
+    events = []
+    for part in parts:
+        chunk = {"id": "c", "object": "chat.completion.chunk", "created": 0, "model": "stub",
+                 "choices": [{"index": 0, "delta": {"content": part}, "finish_reason": None}]}
+        events.append(f"data: {json.dumps(chunk)}\n\n")
+    events.append("data: [DONE]\n\n")
+    return "".join(events).encode()
+
+
+class TrackedStream(httpx.AsyncByteStream):
+    """Streaming response body that records whether it was closed."""
+
+    def __init__(self, body):
+        self.body = body
+        self.closed = False
+
+    async def __aiter__(self):
+        for line in self.body.splitlines(keepends=True):
+            yield line
+
+    async def aclose(self):
+        self.closed = True
+
+
+class StubGroq:
+    """Scripted Groq endpoint: pops (status, delay) per request, then answers 200."""
+
+    def __init__(self, script=(), delay=0.0):
+        self.script = list(script)
+        self.delay = delay
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self.streams = []
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            status = self.script.pop(0) if self.script else 200
+            if status != 200:
+                return httpx.Response(status, headers={"retry-after": "0"},
+                                      json={"error": {"message": f"stub {status}"}})
+            payload = json.loads(request.content)
+            if payload.get("stream"):
+                self.streams.append(TrackedStream(stream_body(["Kia ", "ora"])))
+                return httpx.Response(200, headers={"content-type": "text/event-stream"},
+                                      stream=self.streams[-1])
+            return httpx.Response(200, json=completion_body())
+        finally:
+            self.active -= 1
+
+    def gateway(self, **kwargs) -> LLMGateway:
+        client = AsyncGroq(api_key="test", base_url="http://stub-groq", max_retries=0,
+                           http_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handler)))
+        return LLMGateway(client=client, **kwargs)
+
+
+class TestLLMGateway(unittest.TestCase):
+    """Test retries, limits, streaming and metrics"""
+
+    def test_retries_rate_limits_and_server_errors(self):
+        stub = StubGroq(script=[429, 503])
+
+        async def run():
+            gateway = stub.gateway()
+            completion = await gateway.chat("chat", model="stub", messages=MESSAGES)
+            return completion, gateway.stats()["chat"]
+
+        completion, stats = asyncio.run(run())
+        self.assertEqual(completion.choices[0].message.content, "Kia ora")
+        self.assertEqual(stub.requests, 3)
+        self.assertEqual((stats["retries"], stats["rate_limited"], stats["errors"]), (2, 1, 0))
+        self.assertEqual((stats["prompt_tokens"], stats["completion_tokens"]), (12, 3))
+
+    def test_client_errors_are_not_retried(self):
+        stub = StubGroq(script=[400])
+
+        async def run():
+            gateway = stub.gateway()
+            with self.assertRaises(BadRequestError):
+                await gateway.chat("chat", model="stub", messages=MESSAGES)
+            return gateway.stats()["chat"]
+
+        self.assertEqual(asyncio.run(run())["errors"], 1)
+        self.assertEqual(stub.requests, 1)
+
+    def test_feature_concurrency_limit(self):
+        stub = StubGroq(delay=0.02)
+
+        async def run():
+            gateway = stub.gateway(feature_concurrency={"narrative": 2})
+            client = gateway.client_for("narrative")
+            await asyncio.gather(*(client.chat.completions.create(model="stub", messages=MESSAGES)
+                                   for _ in range(6)))
+
+        asyncio.run(run())
+        self.assertEqual(stub.max_active, 2)
+
+    def test_streaming_releases_permits(self):
+        stub = StubGroq()
+
+        async def run():
+            gateway = stub.gateway(feature_concurrency={"chat": 1})
+            stream = await gateway.chat("chat", model="stub", messages=MESSAGES, stream=True)
+            parts = [chunk.choices[0].delta.content async for chunk in stream]
+            # The single permit is free again for the next call
+            await asyncio.wait_for(gateway.chat("chat", model="stub", messages=MESSAGES), 1.0)
+            return parts
+
+        self.assertEqual(asyncio.run(run()), ["Kia ", "ora"])
+
+    def test_abandoned_stream_is_closed(self):
+        stub = StubGroq()
+
+        async def run():
+            gateway = stub.gateway()
+            stream = await gateway.chat("chat", model="stub", messages=MESSAGES, stream=True)
+            async for _ in stream:
+                break
+            await stream.aclose()
+            return gateway.stats()["chat"]
+
+        stats = asyncio.run(run())
+        self.assertTrue(stub.streams[0].closed)
+        self.assertEqual(stats["in_flight"], 0)
+
+    def test_retries_do_not_spend_the_token_budget_twice(self):
+        stub = StubGroq(script=[503, 503])
+
+        async def run():
+            # 10 tokens a second, 100 capacity; the estimate is 5 prompt + 10 completion tokens
+            gateway = stub.gateway(tokens_per_minute=600)
+            with patch("llm_gateway.backoff_delay", lambda attempt, retry_after=None: 0.0):
+                await gateway.chat("chat", model="stub", messages=MESSAGES, max_tokens=10)
+            gateway.tokens._refill()
+            return gateway.tokens._tokens
+
+        # Only the successful call is charged: its 15 reported tokens
+        self.assertAlmostEqual(asyncio.run(run()), 85, delta=1)
+        self.assertEqual(stub.requests, 3)
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test rate limiting and token estimates"""
+
+    def test_waits_for_refill(self):
+        async def run():
+            bucket = TokenBucket(rate=100.0, capacity=2.0)
+            start = time.perf_counter()
+            for _ in range(4):
+                await bucket.acquire()
+            return time.perf_counter() - start
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.015)
+
+    def test_estimate(self):
+        self.assertEqual(estimate_tokens({"messages": [{"content": "x" * 400}], "max_tokens": 100}), 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+"""
+Unit tests for the OpenMetrics exporter
+
+Run with: python -m pytest test_metrics_exporter.py -v
+"""
+
+import asyncio
+import re
+import unittest
+from unittest import mock
+
+from fastapi import Depends, FastAPI, Response
+from fastapi.testclient import TestClient
+
+import config
+from bottleneck_optimizer import BellmanBottleneckOptimizer
+from http_cache import conditional_stats
+from instrumentation import InstrumentationMiddleware
+from metrics_exporter import CONTENT_TYPE, MetricsWriter, render_metrics, require_internal_token
+from llm_gateway import llm_gateway
+from services.trigger_engine import TRIGGER_EVALUATION_LABEL, trigger_stats
+from tool_cache import ToolResultCache, tool_cache_stats
+
+_SAMPLE = re.compile(r'^(?P<name>[a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(?P<labels>.*)\})? (?P<value>\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse(text):
+    """{(sample name, frozenset of labels): value}, checking the exposition structure on the way."""
+    lines = text.rstrip("\n").split("\n")
+    assert lines[-1] == "# EOF", "exposition must end with # EOF"
+    families, samples = [], {}
+    for line in lines[:-1]:
+        if line.startswith("# TYPE "):
+            name = line.split()[2]
+            assert name not in families, f"family {name} declared twice"
+            families.append(name)
+            continue
+        if line.startswith("#"):
+            continue
+        match = _SAMPLE.match(line)
+        assert match, f"bad sample line: {line!r}"
+        name = match.group("name")
+        assert name.startswith(families[-1]), f"{name} outside its family {families[-1]}"
+        labels = frozenset(_LABEL.findall(match.group("labels") or ""))
+        samples[(name, labels)] = float(match.group("value"))
+    return samples
+
+
+def make_app(optimizer):
+    app = FastAPI()
+
+    @app.get("/api/public/history")
+    async def history(days: int = 90):
+        return [{"day": i} for i in range(days)]
+
+    @app.get("/metrics", dependencies=[Depends(require_internal_token)])
+    async def metrics():
+        return Response(render_metrics(optimizer), media_type=CONTENT_TYPE)
+
+    app.add_middleware(InstrumentationMiddleware, optimizer=optimizer)
+    return app
+
+
+class TestMetricsExporter(unittest.TestCase):
+    """Test exposition structure, route and upstream histograms and counters"""
+
+    def setUp(self):
+        self.optimizer = BellmanBottleneckOptimizer()
+        patcher = mock.patch.object(config, "INTERNAL_METRICS_TOKEN", "scrape-token")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_exposition_is_well_formed(self):
+        client = TestClient(make_app(self.optimizer))
+        client.get("/api/public/history", params={"days": 3})
+        response = client.get("/metrics", headers={"Authorization": "Bearer scrape-token"})
+
+        self.assertEqual(response.headers["content-type"], CONTENT_TYPE)
+        samples = parse(response.text)
+        self.assertIn(("ckcias_event_loop_lag_seconds_count", frozenset()), samples)
+        self.assertIn(("ckcias_risk_stream_subscribers", frozenset()), samples)
+        self.assertIn(("ckcias_db_connections_in_use", frozenset()), samples)
+
+    def test_route_histograms_are_cumulative_and_labelled_by_template(self):
+        for latency in (3.0, 40.0, 40.0, 700.0):
+            self.optimizer.record_call("GET /api/public/history", latency, True, status=200, response_bytes=100)
+        self.optimizer.record_call("GET /api/public/history", 20.0, False, status=502)
+
+        samples = parse(render_metrics(self.optimizer))
+        route = {("method", "GET"), ("route", "/api/public/history")}
+
+        def bucket(le):
+            return samples[("ckcias_http_request_duration_seconds_bucket", frozenset(route | {("le", le)}))]
+
+        self.assertEqual([bucket("0.005"), bucket("0.025"), bucket("0.05"), bucket("1.0"), bucket("+Inf")],
+                         [1, 2, 4, 5, 5])
+        self.assertEqual(samples[("ckcias_http_request_duration_seconds_count", frozenset(route))], 5)
+        self.assertAlmostEqual(samples[("ckcias_http_request_duration_seconds_sum", frozenset(route))], 0.803, 3)
+        self.assertEqual(samples[("ckcias_http_requests_total", frozenset(route | {("status", "2xx")}))], 4)
+        self.assertEqual(samples[("ckcias_http_requests_total", frozenset(route | {("status", "5xx")}))], 1)
+        self.assertEqual(samples[("ckcias_http_response_bytes_total", frozenset(route))], 400)
+
+    def test_upstreams_triggers_and_caches(self):
+        self.optimizer.record_call("upstream:open-meteo", 120.0, True, status=200)
+        self.optimizer.record_call("upstream:open-meteo", 9000.0, False)
+        self.optimizer.record_call(TRIGGER_EVALUATION_LABEL, 2.0, True)
+        before = dict(trigger_stats)
+        conditional_stats["not_modified"] += 3
+
+        samples = parse(render_metrics(self.optimizer))
+        dependency = frozenset({("dependency", "open-meteo")})
+        self.assertEqual(samples[("ckcias_upstream_requests_total", dependency)], 2)
+        self.assertEqual(samples[("ckcias_upstream_errors_total", dependency)], 1)
+        self.assertEqual(samples[("ckcias_trigger_evaluation_duration_seconds_count", frozenset())], 1)
+        self.assertEqual(samples[("ckcias_trigger_evaluations_total", frozenset({("outcome", "triggered")}))],
+                         before["triggered"])
+        cache = frozenset({("cache", "http_conditional")})
+        self.assertEqual(samples[("ckcias_cache_hits_total", cache)], conditional_stats["not_modified"])
+        self.assertGreater(samples[("ckcias_cache_hit_ratio", cache)], 0)
+        # Routes and upstreams stay in their own families
+        self.assertFalse([name for name, labels in samples if name.startswith("ckcias_http_request")
+                          and ("route", "open-meteo") in labels])
+
+    def test_session_tool_caches_llm_and_narratives(self):
+        async def lookups():
+            session_cache = ToolResultCache()
+
+            async def run():
+                return {"value": 1}
+
+            await session_cache.get_or_run("getPortfolioSummary:{}", 30.0, run)
+            await session_cache.get_or_run("getPortfolioSummary:{}", 30.0, run)
+
+        before = dict(tool_cache_stats)
+        asyncio.run(lookups())
+        llm_gateway._metrics_for("chat").retries += 2
+
+        samples = parse(render_metrics(self.optimizer))
+        tool = frozenset({("cache", "voice_tool")})
+        self.assertEqual(samples[("ckcias_cache_hits_total", tool)], before["hits"] + before["coalesced"] + 1)
+        self.assertEqual(samples[("ckcias_cache_misses_total", tool)], before["misses"] + 1)
+        self.assertGreaterEqual(samples[("ckcias_llm_retries_total", frozenset({("feature", "chat")}))], 2)
+        self.assertIn(("ckcias_llm_rate_limit_wait_seconds_total", frozenset({("feature", "chat")})), samples)
+        self.assertIn(("ckcias_narrative_runs_total", frozenset({("outcome", "generated")})), samples)
+
+    def test_endpoint_needs_the_configured_token(self):
+        client = TestClient(make_app(self.optimizer))
+        self.assertEqual(client.get("/metrics").status_code, 401)
+        self.assertEqual(client.get("/metrics", headers={"Authorization": "Bearer guess"}).status_code, 401)
+        with mock.patch.object(config, "INTERNAL_METRICS_TOKEN", ""):
+            # TestClient connects as "testclient", which is not a loopback address
+            self.assertEqual(client.get("/metrics", headers={"Authorization": "Bearer "}).status_code, 404)
+            local = TestClient(make_app(self.optimizer), client=("127.0.0.1", 50000))
+            self.assertEqual(local.get("/metrics").status_code, 200)
+            self.assertEqual(local.get("/metrics", headers={"X-Forwarded-For": "203.0.113.9"}).status_code, 404)
+
+    def test_label_values_are_escaped(self):
+        writer = MetricsWriter()
+        writer.family("test", "gauge", "Escaping.")
+        writer.sample("test", 1, {"route": 'a"b\\c\nd'})
+        self.assertIn('ckcias_test{route="a\\"b\\\\c\\nd"} 1', writer.render())
+
+
+if __name__ == "__main__":
+    unittest.main()
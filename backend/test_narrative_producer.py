@@ -0,0 +1,101 @@
+"""
+Unit tests for the background Kaitiaki Wai narrative producer
+
+Run with: python -m pytest test_narrative_producer.py -v
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+from narrative_producer import NarrativeProducer, NarrativeStore
+from risk_refresher import RiskRefresher
+
+
+class FakePipeline:
+    def __init__(self):
+        self.risk = {None: 30, "Taranaki": 60}
+        self.composed = []
+
+    async def gather(self, region):
+        if region == "Otago":
+            raise Exception("OpenWeather down")
+        return {"region": region, "risk": self.risk[region]}
+
+    def signature(self, inputs):
+        return "tension" if inputs["risk"] <= 50 else "acceleration"
+
+    async def compose(self, inputs):
+        self.composed.append(inputs["region"])
+        return {"narrative": f"{inputs['region']} at {inputs['risk']}", "mode": self.signature(inputs)}
+
+
+class TestNarrativeProducer(unittest.TestCase):
+    """Test signature-driven regeneration and persistence"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "narratives.db")
+        self.pipeline = FakePipeline()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_producer(self, **kwargs):
+        return NarrativeProducer(
+            store=NarrativeStore(self.path), regions=[None, "Taranaki", "Otago"], refresher=RiskRefresher([]),
+            gather=self.pipeline.gather, signature=self.pipeline.signature, compose=self.pipeline.compose, **kwargs
+        )
+
+    def test_regenerates_only_on_meaningful_change(self):
+        async def run():
+            producer = self.make_producer()
+            self.assertEqual(await producer.run_once(), 2)
+            self.assertEqual(producer.failures, 1)
+
+            self.pipeline.risk["Taranaki"] = 65  # same band
+            self.assertEqual(await producer.run_once(), 0)
+
+            self.pipeline.risk["Taranaki"] = 40  # band shift
+            self.assertEqual(await producer.run_once(), 1)
+            self.assertEqual(producer.get("Taranaki")["narrative"], "Taranaki at 40")
+            self.assertEqual(self.pipeline.composed, [None, "Taranaki", "Taranaki"])
+
+        asyncio.run(run())
+
+    def test_max_age_forces_regeneration(self):
+        async def run():
+            producer = self.make_producer(max_age=0)
+            await producer.run_once()
+            self.assertEqual(await producer.run_once(), 2)
+
+        asyncio.run(run())
+
+    def test_store_survives_restart_and_requests_are_single_flight(self):
+        async def run():
+            producer = self.make_producer()
+            first = producer.request("Taranaki")
+            self.assertIs(producer.request("Taranaki"), first)
+            await first
+            self.assertIsNone(producer.get("Otago"))
+
+        asyncio.run(run())
+        restarted = self.make_producer()
+        self.assertEqual(restarted.get("Taranaki")["mode"], "acceleration")
+
+    def test_only_known_regions_are_produced(self):
+        async def run():
+            producer = self.make_producer()
+            self.assertEqual(producer.resolve_region(" taranaki"), "Taranaki")
+            self.assertIsNone(producer.resolve_region(""))
+            with self.assertRaises(KeyError):
+                producer.request("Atlantis")
+            await producer.request("TARANAKI")
+            self.assertEqual(self.pipeline.composed, ["Taranaki"])
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Unit tests for the RSS news aggregator
+
+Run with: python -m pytest test_news_aggregator.py -v
+"""
+
+import asyncio
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from services import news_aggregator as news_module
+from services.news_aggregator import NewsAggregator, link_hash
+
+_RealAsyncClient = httpx.AsyncClient
+
+FEEDS = [
+    {"url": "https://feed-a.test/rss", "source": "Feed A"},
+    {"url": "https://feed-b.test/rss", "source": "Feed B"}
+]
+
+
+def rss(*items):
+    body = "".join(
+        f"<item><title>{title}</title><link>{link}</link></item>" for title, link in items
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>{body}</channel></rss>'.encode()
+
+
+class FakeFeeds:
+    """Serves two RSS feeds and honours If-None-Match."""
+
+    def __init__(self):
+        self.calls = []
+        self.bodies = {
+            "feed-a.test": rss(("Dry spell deepens", "https://news.test/1"), ("Rain relief", "https://news.test/2")),
+            "feed-b.test": rss(("Dry spell deepens (syndicated)", "https://news.test/1"), ("Aquifer levels", "https://news.test/3"))
+        }
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.calls.append((host, request.headers.get("If-None-Match")))
+        etag = f'"{host}-v1"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304)
+        return httpx.Response(200, content=self.bodies[host], headers={"ETag": etag})
+
+    def client(self, *args, **kwargs):
+        return _RealAsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+class TestNewsAggregator(unittest.TestCase):
+    """Test fetching, de-duplication and conditional refresh"""
+
+    def setUp(self):
+        self.upstream = FakeFeeds()
+        p = patch.object(news_module.httpx, "AsyncClient", self.upstream.client)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def test_merges_and_dedupes_by_link(self):
+        aggregator = NewsAggregator(feeds=FEEDS)
+        headlines = asyncio.run(aggregator.get_headlines())
+        self.assertEqual([h["link"] for h in headlines],
+                         ["https://news.test/1", "https://news.test/2", "https://news.test/3"])
+        self.assertEqual(headlines[0]["source"], "Feed A")
+
+    def test_cached_until_ttl(self):
+        async def scenario():
+            aggregator = NewsAggregator(feeds=FEEDS, ttl=3600)
+            await aggregator.get_headlines()
+            await aggregator.get_headlines()
+            return aggregator
+
+        aggregator = asyncio.run(scenario())
+        self.assertEqual(len(self.upstream.calls), 2)
+        self.assertEqual(aggregator.stats()["hits"], 1)
+
+    def test_stale_refresh_uses_conditional_get(self):
+        async def scenario():
+            aggregator = NewsAggregator(feeds=FEEDS, ttl=0)
+            first = await aggregator.get_headlines()
+            await aggregator.get_headlines()
+            await aggregator._refresh_task
+            return first, await aggregator.get_headlines()
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first, second)
+        self.assertIn(("feed-a.test", '"feed-a.test-v1"'), self.upstream.calls)
+
+    def test_failed_feed_keeps_other_entries(self):
+        self.upstream.bodies["feed-b.test"] = b"not found"
+        original = self.upstream.handler
+        self.upstream.handler = lambda r: httpx.Response(500) if r.url.host == "feed-b.test" else original(r)
+        headlines = asyncio.run(NewsAggregator(feeds=FEEDS).get_headlines())
+        self.assertEqual(len(headlines), 2)
+
+    def test_link_hash_normalises(self):
+        self.assertEqual(link_hash({"link": "https://x.test/A "}), link_hash({"link": "https://x.test/a"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
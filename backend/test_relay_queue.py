@@ -0,0 +1,111 @@
+"""
+Unit tests for the bounded relay queues
+
+Run with: python -m pytest test_relay_queue.py -v
+"""
+
+import asyncio
+import time
+import unittest
+
+from relay_queue import QueueClosed, RelayQueue, RelayStats, drain, run_until_first_exits
+
+
+class TestRelayQueue(unittest.TestCase):
+    """Test the drop policy, backpressure, lag metrics and relay loops"""
+
+    def test_full_queue_drops_oldest_audio_first(self):
+        async def run():
+            stats = RelayStats()
+            queue = RelayQueue("test", maxsize=3, stats=stats)
+            await queue.put("audio-1", droppable=True)
+            await queue.put("control-1")
+            await queue.put("audio-2", droppable=True)
+            await queue.put("control-2")           # evicts audio-1
+            await queue.put("audio-3", droppable=True)  # evicts audio-2
+            await queue.put("audio-4", droppable=True)  # evicts audio-3
+            queue.close()
+            frames = [frame async for frame in _frames(queue)]
+            return frames, stats.stats()["test"]
+
+        frames, stats = asyncio.run(run())
+        self.assertEqual(frames, ["control-1", "control-2", "audio-4"])
+        self.assertEqual((stats["dropped"], stats["forwarded"], stats["depth"], stats["max_depth"]), (3, 3, 0, 3))
+
+    def test_control_frames_wait_for_room(self):
+        async def run():
+            queue = RelayQueue("test", maxsize=1, stats=RelayStats())
+            await queue.put("control-1")
+            blocked = asyncio.create_task(queue.put("control-2"))
+            await asyncio.sleep(0.01)
+            self.assertFalse(blocked.done())
+            first = await queue.get()
+            await blocked
+            return first, await queue.get()
+
+        self.assertEqual(asyncio.run(run()), ("control-1", "control-2"))
+
+    def test_stale_audio_is_skipped_and_lag_recorded(self):
+        async def run():
+            stats = RelayStats()
+            queue = RelayQueue("test", stale_after=0.02, stats=stats)
+            await queue.put("old-audio", droppable=True)
+            await queue.put("control")
+            await asyncio.sleep(0.03)
+            frame = await queue.get()
+            return frame, stats.stats()["test"]
+
+        frame, stats = asyncio.run(run())
+        self.assertEqual(frame, "control")
+        self.assertEqual(stats["dropped"], 1)
+        self.assertGreaterEqual(stats["lag_ms_max"], 20)
+
+    def test_slow_writer_does_not_block_reader(self):
+        async def run():
+            queue = RelayQueue("test", maxsize=8, stats=RelayStats())
+            sent = []
+
+            async def slow_send(frame):
+                await asyncio.sleep(0.01)
+                sent.append(frame)
+
+            async def reader():
+                started = time.perf_counter()
+                for i in range(50):
+                    await queue.put(f"audio-{i}", droppable=True)
+                await queue.put("done")
+                return time.perf_counter() - started
+
+            writer = asyncio.create_task(drain(queue, slow_send))
+            elapsed = await reader()
+            while "done" not in sent:
+                await asyncio.sleep(0.005)
+            queue.close()
+            await writer
+            return elapsed, sent
+
+        elapsed, sent = asyncio.run(run())
+        self.assertLess(elapsed, 0.01)
+        self.assertEqual(sent[-1], "done")
+        self.assertEqual(sent[-2], "audio-49")
+        self.assertLess(len(sent), 12)
+
+    def test_first_exit_cancels_other_loops(self):
+        async def run():
+            forever = asyncio.Event()
+            await run_until_first_exits(asyncio.sleep(0.01), forever.wait())
+            return True
+
+        self.assertTrue(asyncio.run(asyncio.wait_for(run(), 1.0)))
+
+
+async def _frames(queue):
+    try:
+        while True:
+            yield await queue.get()
+    except QueueClosed:
+        return
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Unit tests for the negotiated compression middleware
+
+Run with: python -m pytest test_response_compression.py -v
+"""
+
+import unittest
+
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from http_cache import ConditionalGetMiddleware
+from response_compression import (
+    BROTLI_AVAILABLE,
+    CompressionMiddleware,
+    compression_stats,
+    negotiate_encoding
+)
+
+ROWS = [{"date": f"{i:02d} Nov", "risk_score": 40.0 + i, "soil_moisture": 60.0 - i} for i in range(90)]
+
+
+def make_app():
+    app = FastAPI()
+
+    @app.get("/api/public/history")
+    async def history():
+        return ROWS
+
+    @app.get("/api/public/tiny")
+    async def tiny():
+        return {"ok": True}
+
+    @app.get("/api/stream")
+    async def stream():
+        async def events():
+            yield "data: 1\n\n" * 500
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/api/image")
+    async def image():
+        return PlainTextResponse("x" * 5000, media_type="image/png")
+
+    app.add_middleware(ConditionalGetMiddleware)
+    app.add_middleware(CompressionMiddleware)
+    return app
+
+
+class TestNegotiation(unittest.TestCase):
+    """Test Accept-Encoding negotiation"""
+
+    def test_server_preference_on_ties(self):
+        self.assertEqual(negotiate_encoding("gzip, br", ["br", "gzip"]), "br")
+
+    def test_q_values(self):
+        self.assertEqual(negotiate_encoding("br;q=0.5, gzip", ["br", "gzip"]), "gzip")
+        self.assertIsNone(negotiate_encoding("gzip;q=0", ["gzip"]))
+        self.assertIsNone(negotiate_encoding("identity", ["br", "gzip"]))
+
+    def test_wildcard(self):
+        self.assertEqual(negotiate_encoding("*", ["gzip"]), "gzip")
+
+
+class TestCompressionMiddleware(unittest.TestCase):
+    """Test encoding, the compress-once cache and pass-through cases"""
+
+    def setUp(self):
+        self.client = TestClient(make_app())
+
+    def get(self, path, encoding="gzip", **headers):
+        return self.client.get(path, headers={"Accept-Encoding": encoding, **headers})
+
+    def test_gzip_round_trip(self):
+        response = self.get("/api/public/history")
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.json(), ROWS)
+        self.assertIn("Accept-Encoding", response.headers["vary"])
+        self.assertTrue(response.headers["etag"].endswith('-gzip"'))
+
+    @unittest.skipUnless(BROTLI_AVAILABLE, "brotli not installed")
+    def test_brotli_preferred(self):
+        response = self.get("/api/public/history", "gzip, deflate, br")
+        self.assertEqual(response.headers["content-encoding"], "br")
+        self.assertEqual(response.json(), ROWS)
+
+    def test_compresses_once(self):
+        self.get("/api/public/history")
+        misses = compression_stats["misses"]
+        hits = compression_stats["hits"]
+        self.get("/api/public/history")
+        self.assertEqual(compression_stats["misses"], misses)
+        self.assertEqual(compression_stats["hits"], hits + 1)
+
+    def test_encoded_etag_revalidates(self):
+        etag = self.get("/api/public/history").headers["etag"]
+        response = self.get("/api/public/history", **{"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["etag"], etag)
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+
+    def test_identity_etag_revalidates_unsuffixed(self):
+        etag = self.get("/api/public/tiny").headers["etag"]
+        response = self.get("/api/public/tiny", **{"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["etag"], etag)
+        self.assertIn("Accept-Encoding", response.headers["vary"])
+
+    def test_small_and_uncompressible_untouched(self):
+        self.assertNotIn("content-encoding", self.get("/api/public/tiny").headers)
+        self.assertNotIn("content-encoding", self.get("/api/image").headers)
+
+    def test_streams_pass_through(self):
+        response = self.get("/api/stream")
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertTrue(response.text.startswith("data: 1"))
+
+    def test_identity_client(self):
+        response = self.get("/api/public/history", "identity")
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.json(), ROWS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Unit tests for the columnar and binary series encoders
+
+Run with: python -m pytest test_response_formats.py -v
+"""
+
+import json
+import unittest
+
+from fastapi import HTTPException
+
+from response_formats import (
+    BINARY_MEDIA_TYPE,
+    check_series_format,
+    decode_binary,
+    encode_binary,
+    encode_json,
+    series_response,
+    to_columns
+)
+
+ROWS = [
+    {"date": "01 Nov", "risk_score": 40.0, "soil_moisture": 60.0, "temp": 14.2, "rain_probability": 10},
+    {"date": "02 Nov", "risk_score": 42.5, "soil_moisture": 57.5, "temp": 15.1, "rain_probability": 0},
+    {"date": "03 Nov", "risk_score": 45.0, "soil_moisture": None, "temp": 16.8, "rain_probability": 30},
+]
+
+
+class TestSeriesFormats(unittest.TestCase):
+    """Test columnar pivoting and the binary frame round-trip"""
+
+    def test_to_columns_preserves_order(self):
+        columns = to_columns(ROWS)
+        self.assertEqual(list(columns), ["date", "risk_score", "soil_moisture", "temp", "rain_probability"])
+        self.assertEqual(columns["date"], ["01 Nov", "02 Nov", "03 Nov"])
+        self.assertEqual(columns["soil_moisture"], [60.0, 57.5, None])
+
+    def test_to_columns_empty(self):
+        self.assertEqual(to_columns([]), {})
+
+    def test_binary_round_trip(self):
+        payload = encode_binary(to_columns(ROWS), meta={"site": "Patea at Skinner Rd"})
+        meta, columns = decode_binary(payload)
+        self.assertEqual(meta, {"site": "Patea at Skinner Rd"})
+        self.assertEqual(columns["date"], ["01 Nov", "02 Nov", "03 Nov"])
+        self.assertEqual(columns["temp"], [14.2, 15.1, 16.8])
+        self.assertEqual(columns["soil_moisture"], [60.0, 57.5, None])
+        self.assertEqual(columns["rain_probability"], [10.0, 0.0, 30.0])
+
+    def test_binary_keeps_non_numeric_columns_as_labels(self):
+        columns = {"flag": [True, False], "site": ["a", None], "value": [None, 2.5]}
+        _, decoded = decode_binary(encode_binary(columns))
+        self.assertEqual(decoded, columns)
+
+    def test_binary_smaller_than_columnar(self):
+        rows = [dict(row, date=f"{i % 28 + 1:02d} Nov") for i, row in enumerate(ROWS * 120)]
+        self.assertLess(len(encode_binary(to_columns(rows))), len(encode_json({"columns": to_columns(rows)})))
+
+    def test_binary_rejects_foreign_payload(self):
+        with self.assertRaises(ValueError):
+            decode_binary(b"XXXX" + bytes(16))
+
+    def test_columnar_response(self):
+        response = series_response(ROWS, "columnar", meta={"units": "m3/s"})
+        body = json.loads(response.body)
+        self.assertEqual(body["format"], "columnar")
+        self.assertEqual(body["count"], 3)
+        self.assertEqual(body["units"], "m3/s")
+        self.assertEqual(body["columns"]["risk_score"], [40.0, 42.5, 45.0])
+
+    def test_binary_response_media_type(self):
+        response = series_response(ROWS, "binary")
+        self.assertEqual(response.media_type, BINARY_MEDIA_TYPE)
+        self.assertEqual(decode_binary(response.body)[1]["temp"], [14.2, 15.1, 16.8])
+
+    def test_columnar_smaller_than_rows(self):
+        self.assertLess(len(encode_json(to_columns(ROWS * 100))), len(encode_json(ROWS * 100)))
+
+    def test_check_series_format(self):
+        self.assertEqual(check_series_format("COLUMNAR"), "columnar")
+        with self.assertRaises(HTTPException) as ctx:
+            check_series_format("arrow")
+        self.assertEqual(ctx.exception.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Unit tests for the background risk refresher and the SSE risk stream
+
+Run with: python -m pytest test_risk_refresher.py -v
+"""
+
+import asyncio
+import json
+import unittest
+
+from risk_refresher import RiskRefresher, Subscription, diff_risk
+from risk_stream import risk_events
+
+
+def risk(score, humidity=60, flow_rate=None, temperature=18.0):
+    factors = {"humidity": humidity, "humidity_risk": 0.0 if humidity >= 60 else 1.0,
+               "temperature": temperature, "trc_data_available": flow_rate is not None}
+    if flow_rate is not None:
+        factors["flow_rate"] = flow_rate
+    return {"risk_score": score, "risk_level": "Low" if score < 4 else "High", "factors": factors,
+            "timestamp": "ignored"}
+
+
+class FakeRequest:
+    async def is_disconnected(self):
+        return False
+
+
+def parse_sse(message: bytes):
+    lines = message.decode("utf-8").strip().split("\n")
+    return lines[0][len("event: "):], json.loads(lines[1][len("data: "):])
+
+
+class TestDiff(unittest.TestCase):
+    """Test change detection"""
+
+    def test_unchanged_is_empty(self):
+        self.assertEqual(diff_risk(risk(3.0), risk(3.0)), {})
+
+    def test_raw_readings_alone_are_not_a_change(self):
+        self.assertEqual(diff_risk(risk(3.0, humidity=70), risk(3.0, humidity=65, temperature=18.4)), {})
+
+    def test_only_changed_factors(self):
+        changes = diff_risk(risk(3.0, humidity=60), risk(3.0, humidity=55))
+        self.assertEqual(changes, {"factors": {"humidity": 55, "humidity_risk": 1.0}})
+
+    def test_hilltop_reading_and_removed_factor(self):
+        self.assertEqual(diff_risk(risk(3.0), risk(3.0, flow_rate=2.4)),
+                         {"factors": {"flow_rate": 2.4, "trc_data_available": True}})
+        self.assertEqual(diff_risk(risk(3.0, flow_rate=2.4), risk(3.0)),
+                         {"factors": {"flow_rate": None, "trc_data_available": False}})
+
+    def test_first_result_is_full_view(self):
+        self.assertEqual(set(diff_risk(None, risk(5.0))), {"risk_score", "risk_level", "factors"})
+
+
+class TestRiskRefresher(unittest.TestCase):
+    """Test refreshing, generations and subscriber fan-out"""
+
+    def test_refresh_publishes_only_changes(self):
+        results = {"Taranaki": risk(3.0), "Waikato": risk(2.0)}
+
+        async def fetch(region):
+            if region == "Otago":
+                raise Exception("OpenWeather down")
+            return results[region]
+
+        async def run():
+            refresher = RiskRefresher(["Taranaki", "Waikato", "Otago"], fetch=fetch)
+            sub = refresher.subscribe(["Taranaki"])
+            self.assertEqual(await refresher.refresh_once(), 2)
+            self.assertEqual(refresher.generation, 2)
+
+            # Drifting readings are cached but not published
+            results["Waikato"] = risk(2.0, humidity=75, temperature=18.6)
+            self.assertEqual(await refresher.refresh_once(), 0)
+            self.assertEqual(refresher.get("Waikato")["factors"]["humidity"], 75)
+            self.assertEqual(refresher.snapshot(["Waikato"])["Waikato"]["factors"]["humidity"], 60)
+
+            results["Taranaki"] = risk(6.0)
+            self.assertEqual(await refresher.refresh_once(), 1)
+            self.assertEqual(refresher.version("Taranaki"), 2)
+            self.assertEqual(refresher.version("Waikato"), 1)
+            self.assertIsNone(refresher.get("Otago"))
+
+            events = [sub.queue.get_nowait() for _ in range(sub.queue.qsize())]
+            self.assertEqual([e["region"] for e in events], ["Taranaki", "Taranaki"])
+            self.assertEqual(events[1]["changes"], {"risk_score": 6.0, "risk_level": "High"})
+
+        asyncio.run(run())
+
+    def test_slow_subscriber_resyncs(self):
+        async def run():
+            sub = Subscription(maxsize=2)
+            for i in range(5):
+                sub.offer({"type": "update", "region": "Taranaki", "version": i})
+            self.assertTrue(sub.needs_snapshot)
+            self.assertEqual(sub.queue.get_nowait(), {"type": "resync"})
+            self.assertTrue(sub.queue.empty())
+
+        asyncio.run(run())
+
+    def test_sse_stream(self):
+        async def run():
+            refresher = RiskRefresher(["Taranaki", "Waikato"])
+            refresher.update("Taranaki", risk(3.0))
+            refresher.update("Waikato", risk(2.0))
+            sub = refresher.subscribe(["Taranaki"])
+            stream = risk_events(FakeRequest(), sub, refresher, heartbeat=0.01)
+
+            event, data = parse_sse(await stream.__anext__())
+            self.assertEqual(event, "snapshot")
+            self.assertEqual(list(data["regions"]), ["Taranaki"])
+
+            self.assertEqual(await stream.__anext__(), b": ping\n\n")
+
+            refresher.update("Waikato", risk(8.0))
+            refresher.update("Taranaki", risk(3.0, flow_rate=1.2))
+            event, data = parse_sse(await stream.__anext__())
+            self.assertEqual(event, "update")
+            self.assertEqual(data["changes"], {"factors": {"flow_rate": 1.2, "trc_data_available": True}})
+
+            await stream.aclose()
+            self.assertEqual(refresher.subscriber_count, 0)
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+"""
+Unit tests for the semantic (near-duplicate) chat cache
+
+Run with: python -m pytest test_semantic_cache.py -v
+"""
+
+import time
+import unittest
+
+from semantic_cache import SemanticCache, guard_terms
+
+
+class TestSemanticCache(unittest.TestCase):
+    """Test paraphrase matching, guard rails, versions and bounds"""
+
+    def setUp(self):
+        self.cache = SemanticCache(threshold=0.6)
+        self.cache.add("What is the drought risk in Taranaki?", "v1", "Taranaki answer")
+        self.cache.add("How much rain fell in Canterbury this week?", "v1", "Rain answer")
+
+    def test_paraphrase_hits(self):
+        self.assertEqual(self.cache.lookup("Taranaki drought risk right now", "v1"), "Taranaki answer")
+        self.assertEqual(self.cache.lookup("how much rain did canterbury get this week", "v1"), "Rain answer")
+        self.assertEqual(self.cache.stats()["hits"], 2)
+
+    def test_different_region_or_number_misses(self):
+        self.assertIsNone(self.cache.lookup("What is the drought risk in Otago?", "v1"))
+        self.cache.add("What does a soil moisture deficit of 80mm mean?", "v1", "80")
+        self.assertIsNone(self.cache.lookup("What does a soil moisture deficit of 120mm mean?", "v1"))
+        self.assertEqual(guard_terms("rain in hawkes bay over 3 days")[0], frozenset({"Hawke's Bay"}))
+
+    def test_context_version_must_match(self):
+        self.assertIsNone(self.cache.lookup("What is the drought risk in Taranaki?", "v2"))
+
+    def test_unrelated_question_misses(self):
+        self.assertIsNone(self.cache.lookup("When should I destock my dairy herd?", "v1"))
+
+    def test_bounds(self):
+        cache = SemanticCache(threshold=0.6, max_entries=1, ttl=0.05)
+        cache.add("What is the drought risk in Taranaki?", "v1", "first")
+        cache.add("How much rain fell in Canterbury this week?", "v1", "second")
+        self.assertEqual(len(cache), 1)
+        self.assertIsNone(cache.lookup("What is the drought risk in Taranaki?", "v1"))
+        time.sleep(0.1)
+        self.assertIsNone(cache.lookup("How much rain fell in Canterbury this week?", "v1"))
+        self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
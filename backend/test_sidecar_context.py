@@ -0,0 +1,75 @@
+"""
+Unit tests for the token-budgeted sidecar conversation context
+
+Run with: python -m pytest test_sidecar_context.py -v
+"""
+
+import json
+import unittest
+
+from sidecar_context import SidecarContext, compact_json, count_tokens
+
+SYSTEM = "You are the Constitutional Validator."
+
+
+def long_session(context, turns, words=40):
+    for i in range(turns):
+        role = "user" if i % 2 == 0 else "assistant"
+        context.add(role, f"turn {i} " + " ".join(f"dairy{i}x{j}" for j in range(words)))
+
+
+class TestSidecarContext(unittest.TestCase):
+    """Test windowing, summarising and the prompt budget"""
+
+    def test_prompt_stays_flat_as_session_grows(self):
+        context = SidecarContext(recent_turns=4, budget=800, summary_budget=200)
+        sizes = []
+        for turns in (10, 100, 400):
+            long_session(context, turns)
+            sizes.append(count_tokens(context.render()))
+        self.assertLessEqual(max(sizes), 800)
+        self.assertLess(max(sizes) - min(sizes), 100)
+
+    def test_keeps_latest_turns_verbatim_and_summarises_older(self):
+        context = SidecarContext(recent_turns=2, budget=2000)
+        for text in ("first question", "first answer", "second question", "second answer"):
+            context.add("user" if "question" in text else "assistant", text)
+        rendered = context.render()
+        self.assertIn('Recent turns: [{"role":"user","content":"second question"},'
+                      '{"role":"assistant","content":"second answer"}]', rendered)
+        self.assertIn("Earlier conversation:\nuser: first question\nassistant: first answer", rendered)
+        self.assertNotIn("\n  ", rendered)
+
+    def test_latest_turn_survives_a_tight_budget(self):
+        context = SidecarContext(recent_turns=8, budget=120)
+        long_session(context, 8)
+        context.add("user", "Should I sell my Fonterra units?")
+        rendered = context.render()
+        self.assertIn("Should I sell my Fonterra units?", rendered)
+        self.assertIn("older turns omitted", rendered)
+
+    def test_assessment_and_latest_turn_are_capped_to_the_budget(self):
+        context = SidecarContext(recent_turns=8, budget=200)
+        context.record_assessment(json.dumps({"reasoning": " ".join(f"point{i}" for i in range(300))}))
+        long_session(context, 4)
+        context.add("user", " ".join(f"word{i}" for i in range(300)) + " final question")
+        rendered = context.render()
+        self.assertLessEqual(count_tokens(rendered), 200)
+        self.assertIn('Previous assessment: {"reasoning":"point0', rendered)
+        self.assertIn("final question", rendered)
+
+    def test_previous_assessment_is_carried_compactly(self):
+        context = SidecarContext()
+        context.record_assessment(json.dumps({"constitutionalScore": 0.8}, indent=2))
+        context.record_assessment("not json")
+        context.add("user", "hello")
+        self.assertIn('Previous assessment: {"constitutionalScore":0.8}', context.messages(SYSTEM)[1]["content"])
+
+    def test_token_estimate(self):
+        # "Taranaki" is 8 characters, so two tokens
+        self.assertEqual(count_tokens("How dry is Taranaki?"), 6)
+        self.assertEqual(compact_json({"a": [1, 2]}), '{"a":[1,2]}')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Unit tests for the latest-only sidecar analysis scheduler
+
+Run with: python -m pytest test_sidecar_scheduler.py -v
+"""
+
+import asyncio
+import unittest
+
+from sidecar_scheduler import SidecarScheduler
+
+
+class TestSidecarScheduler(unittest.TestCase):
+    """Test debouncing, cancellation and stale-result dropping"""
+
+    def test_burst_of_turns_runs_one_analysis(self):
+        async def run():
+            state = {"turn": 0, "runs": 0}
+            delivered = []
+
+            async def analyse():
+                state["runs"] += 1
+                return f"state after turn {state['turn']}"
+
+            async def deliver(seq, result):
+                delivered.append((seq, result))
+
+            scheduler = SidecarScheduler(analyse, deliver, debounce=0.02)
+            for _ in range(5):
+                state["turn"] += 1
+                scheduler.submit()
+                await asyncio.sleep(0.005)
+            await asyncio.sleep(0.05)
+            return state["runs"], delivered, scheduler.stats()
+
+        runs, delivered, stats = asyncio.run(run())
+        self.assertEqual(runs, 1)
+        self.assertEqual(delivered, [(5, "state after turn 5")])
+        self.assertEqual(stats["cancelled"], 4)
+
+    def test_newer_turn_cancels_in_flight_analysis(self):
+        async def run():
+            started = []
+            cancelled = []
+            delivered = []
+
+            async def analyse():
+                started.append(len(started) + 1)
+                try:
+                    await asyncio.sleep(0.05)
+                except asyncio.CancelledError:
+                    cancelled.append(started[-1])
+                    raise
+                return len(started)
+
+            async def deliver(seq, result):
+                delivered.append(seq)
+
+            scheduler = SidecarScheduler(analyse, deliver, debounce=0)
+            scheduler.submit()
+            await asyncio.sleep(0.01)
+            scheduler.submit()
+            await asyncio.sleep(0.1)
+            await scheduler.close()
+            return cancelled, delivered
+
+        cancelled, delivered = asyncio.run(run())
+        self.assertEqual(cancelled, [1])
+        self.assertEqual(delivered, [2])
+
+    def test_drops_results_older_than_delivered(self):
+        async def run():
+            delivered = []
+
+            async def analyse():
+                return "result"
+
+            async def deliver(seq, result):
+                delivered.append(seq)
+
+            scheduler = SidecarScheduler(analyse, deliver, debounce=0)
+            scheduler.delivered_seq = 3
+            scheduler.seq = 1
+            scheduler.submit()  # seq 2, finishing after 3 was delivered
+            await asyncio.sleep(0.01)
+            return delivered, scheduler.stats()["dropped"]
+
+        self.assertEqual(asyncio.run(run()), ([], 1))
+
+    def test_failed_analysis_is_logged_not_raised(self):
+        async def run():
+            async def analyse():
+                raise RuntimeError("groq down")
+
+            async def deliver(seq, result):
+                raise AssertionError("nothing to deliver")
+
+            scheduler = SidecarScheduler(analyse, deliver, debounce=0)
+            scheduler.submit()
+            await asyncio.sleep(0.01)
+            await scheduler.close()
+            return scheduler.stats()
+
+        self.assertEqual(asyncio.run(run())["completed"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
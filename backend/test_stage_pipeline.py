@@ -0,0 +1,114 @@
+"""
+Unit tests for the dependency-aware stage pipeline and narrative input gathering
+
+Run with: python -m pytest test_stage_pipeline.py -v
+"""
+
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+from bottleneck_optimizer import BellmanBottleneckOptimizer
+from stage_pipeline import Stage, StageError, run_stages
+
+
+def delayed(value, delay=0.05, error=None):
+    async def stage(**deps):
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return value(**deps) if callable(value) else value
+    return stage
+
+
+class TestRunStages(unittest.TestCase):
+    """Test concurrency, dependencies, deadlines and fallbacks"""
+
+    def test_independent_stages_overlap(self):
+        async def run():
+            start = time.perf_counter()
+            results, timings = await run_stages([
+                Stage("a", delayed(1)),
+                Stage("b", delayed(2)),
+                Stage("c", delayed(lambda a, b: a + b), deps=("a", "b"))
+            ])
+            return results, timings, time.perf_counter() - start
+
+        results, timings, elapsed = asyncio.run(run())
+        self.assertEqual(results, {"a": 1, "b": 2, "c": 3})
+        self.assertLess(elapsed, 0.14)  # critical path is two stages, not three
+        self.assertGreaterEqual(timings["c"]["start_ms"], 45)
+        self.assertEqual({t["status"] for t in timings.values()}, {"ok"})
+
+    def test_deadline_and_error_fallbacks(self):
+        results, timings = asyncio.run(run_stages([
+            Stage("slow", delayed("late", delay=1.0), deadline=0.02, fallback=[]),
+            Stage("broken", delayed(None, error=RuntimeError("down")), fallback="n/a"),
+        ]))
+        self.assertEqual(results, {"slow": [], "broken": "n/a"})
+        self.assertEqual(timings["slow"]["status"], "timeout")
+        self.assertEqual(timings["broken"]["status"], "error")
+
+    def test_required_stage_failure(self):
+        with self.assertRaises(StageError) as ctx:
+            asyncio.run(run_stages([
+                Stage("risk", delayed(None, error=RuntimeError("OpenWeather down"))),
+                Stage("history", delayed([]), deps=("risk",), fallback=[])
+            ]))
+        self.assertEqual(ctx.exception.stage, "risk")
+
+    def test_unknown_dependency(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(run_stages([Stage("history", delayed([]), deps=("risk",))]))
+
+
+class TestNarrativeInputs(unittest.TestCase):
+    """Test gather_narrative_inputs runs independent inputs concurrently"""
+
+    def test_critical_path(self):
+        import api_routes
+
+        risk = {"region": "Taranaki", "risk_score": 6.0, "factors": {}, "extended_metrics": {},
+                "coordinates": {"lat": -39.3, "lon": 174.1}}
+
+        async def headlines():
+            await asyncio.sleep(0.1)
+            return [{"title": "Dry spell"}]
+
+        async def risk_calc(region):
+            await asyncio.sleep(0.1)
+            return risk
+
+        async def history(lat, lon, days):
+            await asyncio.sleep(0.05)
+            return [{"risk_score": 50}, {"risk_score": 70}]
+
+        optimizer = BellmanBottleneckOptimizer()
+
+        async def run():
+            with patch.object(api_routes, "get_news_headlines", headlines), \
+                    patch.object(api_routes, "calculate_drought_risk", risk_calc), \
+                    patch.object(api_routes, "get_historical_data", history), \
+                    patch.object(api_routes.risk_refresher, "get", lambda region: None), \
+                    patch.object(api_routes, "get_optimizer", lambda: optimizer):
+                start = time.perf_counter()
+                inputs = await api_routes.gather_narrative_inputs("Taranaki")
+                return inputs, time.perf_counter() - start
+
+        inputs, elapsed = asyncio.run(run())
+        self.assertLess(elapsed, 0.22)  # serial would be 0.25s+
+        self.assertEqual(inputs["trajectory"]["direction"], "worsening")
+        self.assertEqual(inputs["current_data"]["risk_score"], 60.0)
+        self.assertEqual(set(inputs["timings"]), {"headlines", "council_alerts", "risk", "history"})
+        rows = {row["endpoint"]: row for row in optimizer.identify_bottlenecks()}
+        self.assertEqual(set(rows), {"narrative:headlines", "narrative:council_alerts", "narrative:risk",
+                                     "narrative:history"})
+        self.assertEqual(rows["narrative:risk"]["call_count"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Unit tests for the voice relay tool-result cache
+
+Run with: python -m pytest test_tool_cache.py -v
+"""
+
+import asyncio
+import json
+import unittest
+
+import tool_cache
+from tool_cache import ToolResultCache, cached_tool_call, tool_key
+
+
+class _CountingTool:
+    def __init__(self, result, delay: float = 0.0):
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.result
+
+
+class TestToolResultCache(unittest.TestCase):
+    """Test TTL expiry, coalescing, error handling and the per-tool policy"""
+
+    def setUp(self):
+        tool_cache.tool_cache = ToolResultCache()
+
+    def test_payload_is_cached_until_ttl_expires(self):
+        async def run():
+            cache = ToolResultCache()
+            tool = _CountingTool({"score": 0.78})
+            first = await cache.get_or_run("k", 0.05, tool)
+            second = await cache.get_or_run("k", 0.05, tool)
+            await asyncio.sleep(0.06)
+            third = await cache.get_or_run("k", 0.05, tool)
+            return first, second, third, tool.calls, cache.stats()
+
+        first, second, third, calls, stats = asyncio.run(run())
+        self.assertEqual(first, json.dumps({"score": 0.78}))
+        self.assertIs(first, second)
+        self.assertEqual(third, first)
+        self.assertEqual(calls, 2)
+        self.assertEqual((stats["hits"], stats["misses"], stats["expired"]), (1, 2, 1))
+
+    def test_concurrent_identical_calls_run_once(self):
+        async def run():
+            cache = ToolResultCache()
+            tool = _CountingTool(["headline"], delay=0.02)
+            results = await asyncio.gather(*(cache.get_or_run("k", 60, tool) for _ in range(5)))
+            return results, tool.calls, cache.stats()["coalesced"]
+
+        results, calls, coalesced = asyncio.run(run())
+        self.assertEqual(set(results), {'["headline"]'})
+        self.assertEqual((calls, coalesced), (1, 4))
+
+    def test_error_results_are_not_cached(self):
+        async def run():
+            cache = ToolResultCache()
+            tool = _CountingTool({"error": "Position not found"})
+            await cache.get_or_run("k", 60, tool)
+            await cache.get_or_run("k", 60, tool)
+            return tool.calls, len(cache)
+
+        self.assertEqual(asyncio.run(run()), (2, 0))
+
+    def test_policy_selects_cache_and_skips_trade_orders(self):
+        async def run():
+            session = ToolResultCache()
+            order = _CountingTool({"status": "prepared_for_review"})
+            portfolio = _CountingTool({"total_value_nzd": 1})
+            headlines = _CountingTool([])
+            for _ in range(2):
+                await cached_tool_call("prepareTradeOrder", {"symbol": "AAPL"}, order, session)
+                await cached_tool_call("getPortfolioSummary", {}, portfolio, session)
+                await cached_tool_call("getMarketHeadlines", {}, headlines, session)
+            # Session-scoped tools are not cached without a session cache
+            await cached_tool_call("getPortfolioSummary", {}, portfolio)
+            return order.calls, portfolio.calls, headlines.calls, len(session), len(tool_cache.tool_cache)
+
+        self.assertEqual(asyncio.run(run()), (2, 2, 1, 1, 1))
+
+    def test_key_ignores_argument_order(self):
+        self.assertEqual(tool_key("getPositionDetails", {"a": 1, "symbol": "AAPL"}),
+                         tool_key("getPositionDetails", {"symbol": "AAPL", "a": 1}))
+        self.assertNotEqual(tool_key("getPositionDetails", {"symbol": "AAPL"}),
+                            tool_key("getPositionDetails", {"symbol": "MSFT"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
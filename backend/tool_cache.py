@@ -0,0 +1,154 @@
+"""
+Tool-Result Cache for the Voice Relay
+Per-tool TTLs, pre-serialised JSON payloads and in-flight coalescing
+
+Every Realtime function call used to re-run its market_service function and
+json.dumps the result, although most tools return data that changes
+slowly (the portfolio, headlines) or not at all within a conversation. The
+model's function-call round-trip waits on that work, so results are kept as
+the JSON string that goes into the function_call_output item:
+
+- each tool has a TTL and a scope in TOOL_CACHE_POLICY; tools not listed
+  there (prepareTradeOrder in particular) are never cached
+- market-wide data is shared by all sessions through the global tool_cache;
+  portfolio data is per user, so it lives in a cache owned by the session
+- identical calls that arrive while the first is still running wait for
+  its result instead of running the tool again
+- error results are returned but never cached
+
+Usage:
+    session_cache = ToolResultCache(max_entries=SESSION_CACHE_ENTRIES)
+    payload = await cached_tool_call(name, args, run, session_cache)
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+GLOBAL = "global"
+SESSION = "session"
+
+# Tool name -> (scope, TTL in seconds)
+TOOL_CACHE_POLICY: Dict[str, Tuple[str, float]] = {
+    "getPortfolioSummary": (SESSION, 30.0),
+    "getPositionDetails": (SESSION, 30.0),
+    "getMarketHeadlines": (GLOBAL, 300.0),
+    "getConstitutionalScore": (GLOBAL, 10.0),
+    "getChaosState": (GLOBAL, 5.0),
+}
+
+GLOBAL_CACHE_ENTRIES = 256
+SESSION_CACHE_ENTRIES = 64
+
+# Lookups across every cache, global and per session, for monitoring
+tool_cache_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+
+def tool_key(name: str, args: Dict[str, Any]) -> str:
+    """Cache key for a call; argument order and whitespace do not matter."""
+    return name + ":" + json.dumps(args or {}, sort_keys=True, separators=(",", ":"))
+
+
+def _is_error(data: Any) -> bool:
+    return isinstance(data, dict) and "error" in data
+
+
+class ToolResultCache:
+    """
+    LRU map of tool-call key -> (expiry, serialised result).
+
+    Usage:
+        payload = await cache.get_or_run(tool_key(name, args), ttl, run)
+    """
+
+    def __init__(self, max_entries: int = GLOBAL_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+            "coalesced": self.coalesced, "expired": self.expired,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0
+        }
+
+    def get(self, key: str) -> Optional[str]:
+        """Fresh cached payload for key, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            self.expired += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: str, payload: str, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_run(self, key: str, ttl: float, run: Callable[[], Awaitable[Any]]) -> str:
+        """
+        Cached payload for key, or the JSON of `await run()`, cached for ttl
+        seconds unless it is an error result.
+        """
+        payload = self.get(key)
+        if payload is not None:
+            self.hits += 1
+            tool_cache_stats["hits"] += 1
+            return payload
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            tool_cache_stats["coalesced"] += 1
+        else:
+            self.misses += 1
+            tool_cache_stats["misses"] += 1
+            # Own task: a caller cancelled mid-call must not fail the others waiting on it
+            task = asyncio.create_task(self._fill(key, ttl, run))
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: str, ttl: float, run: Callable[[], Awaitable[Any]]) -> str:
+        try:
+            data = await run()
+            payload = json.dumps(data)
+            if not _is_error(data):
+                self.put(key, payload, ttl)
+            return payload
+        finally:
+            self._inflight.pop(key, None)
+
+
+async def cached_tool_call(name: str, args: Dict[str, Any], run: Callable[[], Awaitable[Any]],
+                           session_cache: Optional[ToolResultCache] = None) -> str:
+    """
+    JSON result of a tool call, served from the cache its policy selects.
+    Tools without a policy, or session-scoped tools without a session
+    cache, run every time.
+    """
+    policy = TOOL_CACHE_POLICY.get(name)
+    cache = None
+    if policy is not None:
+        cache = session_cache if policy[0] == SESSION else tool_cache
+    if cache is None:
+        return json.dumps(await run())
+    return await cache.get_or_run(tool_key(name, args), policy[1], run)
+
+
+# Global instance
+tool_cache = ToolResultCache()
@@ -6,9 +6,9 @@ import websockets
 from websockets.client import connect
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from dotenv import load_dotenv
-from groq import AsyncGroq
 from datetime import datetime
 from logger_config import logger
+from llm_gateway import llm_gateway
 
 # Import service functions
 from market_service import (
@@ -19,19 +19,33 @@ from market_service import (
     get_chaos_state,
     prepare_trade_order
 )
-from fractal_engine import FractalEngine
+from fractal_engine import FractalEngine, SEARCH_DEADLINE_SECONDS
+from audio_frames import append_frame, is_audio_append, is_audio_delta, receive_frame
+from relay_queue import RelayQueue, drain, run_until_first_exits
+from tool_cache import SESSION_CACHE_ENTRIES, ToolResultCache, cached_tool_call
 
 load_dotenv()
 
 router = APIRouter()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Overridable so load tests can point the relay at a local Realtime stub
+OPENAI_REALTIME_URL = os.getenv(
+    "OPENAI_REALTIME_URL",
+    "wss://api.openai.com/v1/realtime?model=gpt-4o-mini-realtime-preview-2024-12-17"
+)
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     logger.warning("GROQ_API_KEY environment variable is missing. Hybrid mode will be disabled.")
 
 GROQ_MODEL = "llama-3.3-70b-versatile"
 
+# Groq calls go through the shared LLM gateway; None disables hybrid mode
+groq_client = llm_gateway.client_for("voice") if GROQ_API_KEY else None
+
+# Hard ceiling for Deep Thought (search plus synthesis) before SATYA speaks
+VOICE_REASONING_SECONDS = 2.0
+
 # -----------------------------------------------------------------------------
 # SYSTEM PROMPT - SATYA (Constitutional Market Voice AI)
 # -----------------------------------------------------------------------------
@@ -157,39 +171,38 @@ TOOLS = [
 # -----------------------------------------------------------------------------
 # TOOL HANDLERS
 # -----------------------------------------------------------------------------
-async def handle_tool_call(name, args):
+async def run_tool(name, args):
+    """Runs a tool and returns its (unserialised) result."""
+    if name == "getPortfolioSummary":
+        return await get_portfolio_summary()
+
+    elif name == "getPositionDetails":
+        symbol = args.get("symbol")
+        return await get_position_details(symbol)
+
+    elif name == "getMarketHeadlines":
+        return await get_market_headlines()
+
+    elif name == "getConstitutionalScore":
+        return await get_constitutional_score()
+
+    elif name == "getChaosState":
+        return await get_chaos_state()
+
+    elif name == "prepareTradeOrder":
+        action = args.get("action")
+        symbol = args.get("symbol")
+        quantity = args.get("quantity")
+        return await prepare_trade_order(action, symbol, quantity)
+
+    logger.warning(f"Unknown tool called: {name}")
+    return {"error": "Unknown tool"}
+
+async def handle_tool_call(name, args, session_cache=None):
+    """JSON result of a tool call; cacheable tools are served from tool_cache or the session's cache."""
     logger.info(f"Executing tool {name} with args: {args}")
     try:
-        if name == "getPortfolioSummary":
-            data = await get_portfolio_summary()
-            return json.dumps(data)
-        
-        elif name == "getPositionDetails":
-            symbol = args.get("symbol")
-            data = await get_position_details(symbol)
-            return json.dumps(data)
-
-        elif name == "getMarketHeadlines":
-            data = await get_market_headlines()
-            return json.dumps(data)
-
-        elif name == "getConstitutionalScore":
-            data = await get_constitutional_score()
-            return json.dumps(data)
-            
-        elif name == "getChaosState":
-            data = await get_chaos_state()
-            return json.dumps(data)
-
-        elif name == "prepareTradeOrder":
-            action = args.get("action")
-            symbol = args.get("symbol")
-            quantity = args.get("quantity")
-            data = await prepare_trade_order(action, symbol, quantity)
-            return json.dumps(data)
-
-        logger.warning(f"Unknown tool called: {name}")
-        return json.dumps({"error": "Unknown tool"})
+        return await cached_tool_call(name, args, lambda: run_tool(name, args), session_cache)
     except Exception as e:
         logger.error(f"Error executing tool {name}: {e}", exc_info=True)
         return json.dumps({"error": str(e)})
@@ -202,7 +215,7 @@ async def voice_relay(websocket: WebSocket):
     await websocket.accept()
     logger.info("Client connected to SATYA Relay")
 
-    openai_url = "wss://api.openai.com/v1/realtime?model=gpt-4o-mini-realtime-preview-2024-12-17"
+    openai_url = OPENAI_REALTIME_URL
     headers = {
         "Authorization": f"Bearer {OPENAI_API_KEY}",
         "OpenAI-Beta": "realtime=v1"
@@ -213,53 +226,46 @@ async def voice_relay(websocket: WebSocket):
         "is_user_speaking": False,
         "is_assistant_speaking": False,
         "is_thinking": False,
-        "last_response_id": None
+        "last_response_id": None,
+        "reasoning_task": None
     }
 
+    # Per-direction bounded queues: readers never wait on the other socket's writes
+    upstream = RelayQueue("voice.upstream")      # client -> OpenAI
+    downstream = RelayQueue("voice.downstream")  # OpenAI -> client
+    # Tool calls in flight (reasoning is tracked in state["reasoning_task"])
+    background_tasks = set()
+    # Per-user tool results (portfolio); market-wide results use the global tool_cache
+    session_tool_cache = ToolResultCache(max_entries=SESSION_CACHE_ENTRIES)
+
     async def run_groq_reasoning(user_transcript):
         """Hybrid Mode: Use Fractal Engine for deep reasoning."""
         if not groq_client: return None
         
         logger.info(f"Starting Deep Thought on: {user_transcript}")
+        loop = asyncio.get_running_loop()
+        ends_at = loop.time() + VOICE_REASONING_SECONDS
         try:
             # Initialize Engine
-            engine = FractalEngine(groq_client, model=GROQ_MODEL)
+            engine = FractalEngine(llm_gateway.client_for("fractal"), model=GROQ_MODEL)
             root = engine.create_root(user_transcript)
-            
-            # Run 1-2 steps of expansion (keep it fast for voice ~2-3s)
-            # Step 1: Expand Root
-            await engine.run_step(root.id)
-            
-            # Check for barge-in
-            if state["is_user_speaking"]:
-                logger.info("Fractal Engine aborted due to barge-in")
-                return None
-            
-            # Step 2: Pick best child and expand (if high score)
-            best_child = max(root.children, key=lambda n: n.score) if root.children else None
-            if best_child and best_child.score > 0.7:
-                 await engine.run_step(best_child.id)
-
-            # Check for barge-in again
-            if state["is_user_speaking"]:
-                logger.info("Fractal Engine aborted due to barge-in")
-                return None
-
-            # Get Best Path
-            path = engine.get_best_path()
+
+            async def send_thought_delta(path=None):
+                """Sends only the nodes added or re-scored since the last update (Custom Event)."""
+                # A node with parent -1 in "added" is a new root: the client drops the previous tree
+                event = {"type": "fractal.thought_delta", **engine.to_delta()}
+                if path is not None:
+                    event["path"] = [n.id for n in path]
+                await downstream.put(json.dumps(event, separators=(",", ":")))
+
+            # Concurrent beam search, leaving the rest of the ceiling for synthesis.
+            # Barge-in cancels this whole coroutine, outstanding Groq calls included.
+            path = await engine.search(root.id, deadline=SEARCH_DEADLINE_SECONDS, on_update=send_thought_delta)
+            await send_thought_delta(path)
+
             thought_process = " -> ".join([n.content for n in path])
             logger.debug(f"Fractal Path: {thought_process}")
 
-            # Send thought process to client for visualization (Custom Event)
-            try:
-                await websocket.send_text(json.dumps({
-                    "type": "fractal.thought_update",
-                    "tree": engine.to_json(),
-                    "path": [n.id for n in path]
-                }))
-            except Exception as ws_e:
-                logger.warning(f"Failed to send visual update: {ws_e}")
-
             # Synthesize Final Answer
             synthesis_prompt = f"""
             You are SATYA. Synthesize the following thought process into a concise, spoken response for the user.
@@ -269,21 +275,76 @@ async def voice_relay(websocket: WebSocket):
             Keep it under 40 words. Be wise and reassuring.
             """
             
-            completion = await groq_client.chat.completions.create(
+            completion = await asyncio.wait_for(groq_client.chat.completions.create(
                 model=GROQ_MODEL,
                 messages=[{"role": "system", "content": synthesis_prompt}],
                 temperature=0.7,
                 max_tokens=100
-            )
-            
+            ), max(0.1, ends_at - loop.time()))
+
             answer = completion.choices[0].message.content
             logger.info(f"Fractal Answer Generated: {answer}")
             return answer
 
+        except asyncio.TimeoutError:
+            logger.warning(f"Fractal Engine missed the {VOICE_REASONING_SECONDS}s voice ceiling")
+            return None
         except Exception as e:
             logger.error(f"Fractal Engine Error: {e}", exc_info=True)
             return None
 
+    async def respond_with_reasoning(user_transcript):
+        """Speaks the Deep Thought answer, or lets the Realtime model answer if there is none."""
+        fractal_response = await run_groq_reasoning(user_transcript)
+
+        # Barge-in cancels this task; the check covers speech that started during the last send
+        if state["is_user_speaking"]:
+            return
+        # We are ready to speak. Disable thinking mode so we allow OUR response.
+        state["is_thinking"] = False
+
+        if fractal_response:
+            # Send to OpenAI to speak
+            await upstream.put(json.dumps({
+                "type": "conversation.item.create",
+                "item": {
+                    "type": "message",
+                    "role": "assistant",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": fractal_response
+                        }
+                    ]
+                }
+            }))
+        else:
+            logger.info("No Deep Thought answer in time, falling back to the Realtime response")
+        await upstream.put(json.dumps({"type": "response.create"}))
+
+    async def run_tool_call(call_id, name, args):
+        """Executes a tool off the relay loop and sends the result back to OpenAI."""
+        result = await handle_tool_call(name, args, session_tool_cache)
+
+        # Send Result back to OpenAI
+        await upstream.put(json.dumps({
+            "type": "conversation.item.create",
+            "item": {
+                "type": "function_call_output",
+                "call_id": call_id,
+                "output": result
+            }
+        }))
+        # Trigger response
+        await upstream.put(json.dumps({"type": "response.create"}))
+
+    def cancel_reasoning():
+        task = state["reasoning_task"]
+        if task is not None and not task.done():
+            task.cancel()
+            logger.info("Fractal Engine cancelled (barge-in or newer turn)")
+        state["reasoning_task"] = None
+
     try:
         async with connect(openai_url, extra_headers=headers) as openai_ws:
             logger.info("Connected to OpenAI Realtime")
@@ -315,15 +376,18 @@ async def voice_relay(websocket: WebSocket):
             async def client_to_openai():
                 try:
                     while True:
-                        data = await websocket.receive_text()
-                        msg = json.loads(data)
-                        
-                        # BLOCK AUDIO if assistant is speaking (Half-Duplex to prevent echo)
-                        if state["is_assistant_speaking"] and msg.get("type") == "input_audio_buffer.append":
+                        data = await receive_frame(websocket)
+
+                        # FAST PATH: audio frames are forwarded without a JSON round-trip
+                        if isinstance(data, bytes) or is_audio_append(data):
+                            # BLOCK AUDIO if assistant is speaking (Half-Duplex to prevent echo)
+                            if state["is_assistant_speaking"]:
+                                continue
+                            await upstream.put(append_frame(data) if isinstance(data, bytes) else data, droppable=True)
                             continue
 
-                        # Pass through client messages (audio buffer, etc.)
-                        await openai_ws.send(json.dumps(msg))
+                        # Pass through other client messages unchanged
+                        await upstream.put(data)
                 except WebSocketDisconnect:
                     logger.info("Client disconnected")
                 except Exception as e:
@@ -332,6 +396,14 @@ async def voice_relay(websocket: WebSocket):
             async def openai_to_client():
                 try:
                     async for message in openai_ws:
+                        # FAST PATH: audio deltas skip parsing (Half-Duplex Logic)
+                        if is_audio_delta(message):
+                            state["is_assistant_speaking"] = True
+                            # If we are thinking, DROP the audio (suppress Fast Brain)
+                            if not state["is_thinking"]:
+                                await downstream.put(message, droppable=True)
+                            continue
+
                         msg = json.loads(message)
                         
                         # Track Assistant Speaking State (Half-Duplex Logic)
@@ -349,6 +421,7 @@ async def voice_relay(websocket: WebSocket):
                             logger.info("User started speaking (Server VAD)")
                             state["is_user_speaking"] = True
                             state["is_thinking"] = False
+                            cancel_reasoning()
                         
                         elif msg.get("type") == "input_audio_buffer.speech_stopped":
                             logger.info("User stopped speaking (Server VAD)")
@@ -360,7 +433,7 @@ async def voice_relay(websocket: WebSocket):
                             # If we are in thinking mode, this is an unwanted auto-response
                             if state["is_thinking"]:
                                 logger.info("Suppressing Auto-Response (Fast Brain)")
-                                await openai_ws.send(json.dumps({"type": "response.cancel"}))
+                                await upstream.put(json.dumps({"type": "response.cancel"}))
 
                         # Handle Transcription (User Finished Speaking)
                         if msg.get("type") == "conversation.item.input_audio_transcription.completed":
@@ -368,29 +441,12 @@ async def voice_relay(websocket: WebSocket):
                             if transcript:
                                 logger.info(f"User Transcript: {transcript}")
                                 
-                                # Trigger Fractal Reasoning
-                                fractal_response = await run_groq_reasoning(transcript)
-                                
-                                # Only send if user hasn't started speaking again
-                                if fractal_response and not state["is_user_speaking"]:
-                                    # We are ready to speak. Disable thinking mode so we allow OUR response.
-                                    state["is_thinking"] = False
-                                    
-                                    # Send to OpenAI to speak
-                                    await openai_ws.send(json.dumps({
-                                        "type": "conversation.item.create",
-                                        "item": {
-                                            "type": "message",
-                                            "role": "assistant",
-                                            "content": [
-                                                {
-                                                    "type": "text",
-                                                    "text": fractal_response
-                                                }
-                                            ]
-                                        }
-                                    }))
-                                    await openai_ws.send(json.dumps({"type": "response.create"}))
+                                # Trigger Fractal Reasoning without blocking the relay loop,
+                                # so a speech_started event can cancel it mid-flight
+                                cancel_reasoning()
+                                state["reasoning_task"] = asyncio.create_task(
+                                    respond_with_reasoning(transcript)
+                                )
 
                         # Handle Tool Calls
                         if msg.get("type") == "response.function_call_arguments.done":
@@ -398,28 +454,30 @@ async def voice_relay(websocket: WebSocket):
                             name = msg["name"]
                             args = json.loads(msg["arguments"])
                             
-                            # Execute Tool
-                            result = await handle_tool_call(name, args)
-                            
-                            # Send Result back to OpenAI
-                            await openai_ws.send(json.dumps({
-                                "type": "conversation.item.create",
-                                "item": {
-                                    "type": "function_call_output",
-                                    "call_id": call_id,
-                                    "output": result
-                                }
-                            }))
-                            # Trigger response
-                            await openai_ws.send(json.dumps({"type": "response.create"}))
+                            # Execute Tool in its own task so audio keeps flowing meanwhile
+                            task = asyncio.create_task(run_tool_call(call_id, name, args))
+                            background_tasks.add(task)
+                            task.add_done_callback(background_tasks.discard)
 
                         # Forward to Client
-                        await websocket.send_text(message)
+                        await downstream.put(message, droppable=msg.get("type") == "response.audio.delta")
                 except Exception as e:
                     logger.error(f"OpenAI read error: {e}")
 
-            await asyncio.gather(client_to_openai(), openai_to_client())
+            # Readers enqueue, one writer per socket drains; the session ends when any loop exits
+            await run_until_first_exits(
+                client_to_openai(),
+                openai_to_client(),
+                drain(upstream, openai_ws.send),
+                drain(downstream, websocket.send_text)
+            )
 
     except Exception as e:
         logger.error(f"Connection error: {e}")
         await websocket.close()
+    finally:
+        cancel_reasoning()
+        for task in background_tasks:
+            task.cancel()
+        upstream.discard()
+        downstream.discard()
@@ -6,6 +6,8 @@ import os
 import httpx
 from dotenv import load_dotenv
 
+from instrumentation import upstream_client
+
 # Load environment variables from project root
 env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 load_dotenv(dotenv_path=env_path)
@@ -48,7 +50,7 @@ async def get_weather_data(location: str):
         params["q"] = location
 
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with upstream_client("openweather", timeout=10.0) as client:
             response = await client.get(OPENWEATHER_BASE_URL, params=params)
             response.raise_for_status()
 
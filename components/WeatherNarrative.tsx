@@ -18,6 +18,8 @@ const WeatherNarrative: React.FC = () => {
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
+    let retryTimeoutId: ReturnType<typeof setTimeout> | undefined;
+
     const loadNarrative = async () => {
       try {
         console.log('WeatherNarrative: Fetching narrative...');
@@ -31,6 +33,15 @@ const WeatherNarrative: React.FC = () => {
         });
         
         clearTimeout(timeoutId);
+
+        // Cold start: the narrative is still being produced, so retry soon
+        if (response.status === 503) {
+          const retryAfter = Number(response.headers.get('Retry-After')) || 10;
+          console.log(`WeatherNarrative: Narrative being prepared, retrying in ${retryAfter}s`);
+          clearTimeout(retryTimeoutId);
+          retryTimeoutId = setTimeout(loadNarrative, retryAfter * 1000);
+          return;
+        }
         
         if (!response.ok) {
           throw new Error(`HTTP error! status: ${response.status}`);
@@ -60,7 +71,10 @@ const WeatherNarrative: React.FC = () => {
 
     // Refresh every 30 minutes
     const interval = setInterval(loadNarrative, 30 * 60 * 1000);
-    return () => clearInterval(interval);
+    return () => {
+      clearInterval(interval);
+      clearTimeout(retryTimeoutId);
+    };
   }, []);
 
   // Show loading state while fetching narrative (no mock data fallback)
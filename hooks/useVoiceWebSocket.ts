@@ -45,12 +45,51 @@ const getVoiceRelayUrl = () => {
 
 const VOICE_RELAY_URL = getVoiceRelayUrl();
 
+// Fractal Engine trees arrive as deltas: only nodes added or re-scored since the last update
+interface FractalNodeRecord {
+  parent: number;
+  score: number;
+  status: string;
+  content: string;
+  children: number[];
+}
+
+const applyFractalDelta = (nodes: Map<number, FractalNodeRecord>, msg: any) => {
+  for (const [id, parent, score, status, content] of msg.added ?? []) {
+    // A new root (parent -1) starts a new tree
+    if (parent === -1) nodes.clear();
+    nodes.set(id, { parent, score, status, content, children: [] });
+    if (parent !== -1) nodes.get(parent)?.children.push(id);
+  }
+  for (const [id, score, status] of msg.changed ?? []) {
+    const node = nodes.get(id);
+    if (node) {
+      node.score = score;
+      node.status = status;
+    }
+  }
+};
+
+const buildFractalTree = (nodes: Map<number, FractalNodeRecord>, id = 0): any => {
+  const node = nodes.get(id);
+  if (!node) return null;
+  return {
+    id: String(id),
+    content: node.content,
+    score: node.score,
+    status: node.status,
+    children: node.children.map((child) => buildFractalTree(nodes, child)).filter(Boolean)
+  };
+};
+
 export function useVoiceWebSocket(): VoiceWebSocketReturn {
   const wsRef = useRef<WebSocket | null>(null);
   const transcriptionCallbackRef = useRef<((text: string, role: 'user' | 'assistant') => void) | null>(null);
   const audioOutputCallbackRef = useRef<((base64Audio: string) => void) | null>(null);
   const bargeInCallbackRef = useRef<(() => void) | null>(null);
   const fractalUpdateCallbackRef = useRef<((tree: any, path: string[]) => void) | null>(null);
+  const fractalNodesRef = useRef<Map<number, FractalNodeRecord>>(new Map());
+  const fractalPathRef = useRef<string[]>([]);
   
   const [isConnected, setIsConnected] = useState(false);
   const [error, setError] = useState<string | null>(null);
@@ -94,9 +133,15 @@ export function useVoiceWebSocket(): VoiceWebSocketReturn {
         
         switch (msg.type) {
           // Fractal Engine Events
-          case 'fractal.thought_update':
+          case 'fractal.thought_delta':
+            applyFractalDelta(fractalNodesRef.current, msg);
+            if (msg.path) {
+              fractalPathRef.current = msg.path.map(String);
+            } else if ((msg.added ?? []).some((node: any[]) => node[1] === -1)) {
+              fractalPathRef.current = [];
+            }
             if (fractalUpdateCallbackRef.current) {
-              fractalUpdateCallbackRef.current(msg.tree, msg.path);
+              fractalUpdateCallbackRef.current(buildFractalTree(fractalNodesRef.current), fractalPathRef.current);
             }
             break;
 